@@ -0,0 +1,189 @@
+"""
+Headless JSON API for MovieMind, an alternative entry point to app.py.
+
+    python api.py --port 8000 --workers 4
+
+Every worker process warms its own MovieRecommender at startup and runs the
+blocking recommender and favorites calls on a bounded thread pool, so API
+workers can be scaled independently of the Gradio UI.
+
+    POST   /recommend                     {"message": "...", "user_id": "..."}
+                                          (headers: X-Request-Id, X-MovieMind-Profile: 1)
+    GET    /favorites/{user_id}
+    POST   /favorites/{user_id}           {"title": "..."}
+    DELETE /favorites/{user_id}/{title}   the title may contain "/"
+    GET    /healthz                       process is up
+    GET    /readyz                        recommender is warmed up
+    POST   /admin/rebuild                 rebuild the catalog in the background
+                                          (header: X-Admin-Token = MOVIEMIND_ADMIN_TOKEN)
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import dotenv
+from fastapi import FastAPI, Header, HTTPException, Response
+from pydantic import BaseModel
+
+from catalog_index import add_rebuild_route
+from favorites import FavoritesStore, PREFERENCES_FILE
+from request_profiler import safe_request_id
+from metrics import configure_from_env
+
+
+DEFAULT_USER_ID = "demo_user"
+
+
+class RecommendRequest(BaseModel):
+    message: str
+    user_id: str = DEFAULT_USER_ID
+
+
+class FavoriteRequest(BaseModel):
+    title: str
+
+
+def _default_recommender_factory():
+    from recommendation_system import MovieRecommender
+    return MovieRecommender()
+
+
+def create_app(recommender_factory=None, favorites=None, request_timeout=None, max_workers=None):
+    """
+    Build the API app. `recommender_factory` is called once, on startup, in a
+    background thread; /recommend answers 503 until it has returned.
+    `request_timeout` (seconds) bounds every request and answers 504 past it.
+    """
+    recommender_factory = recommender_factory or _default_recommender_factory
+    favorites = favorites or FavoritesStore(os.environ.get("MOVIEMIND_PREFERENCES_FILE", PREFERENCES_FILE))
+    if request_timeout is None:
+        request_timeout = float(os.environ.get("MOVIEMIND_API_TIMEOUT", "35"))
+    if max_workers is None:
+        max_workers = int(os.environ.get("MOVIEMIND_API_THREADS", "8"))
+
+    state = {"recommender": None, "error": None}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api")
+
+    def warm_up():
+        try:
+            state["recommender"] = recommender_factory()
+        except Exception as e:
+            state["error"] = f"{type(e).__name__}: {e}"
+            print(f"Recommender failed to start: {state['error']}")
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Health checks answer while the recommender (and its model) loads
+        threading.Thread(target=warm_up, name="recommender-warmup", daemon=True).start()
+        yield
+        executor.shutdown(wait=False)
+
+    app = FastAPI(title="MovieMind API", lifespan=lifespan)
+    app.state.favorites = favorites
+
+    async def run_blocking(fn, *args):
+        """Run a blocking call on the API pool, answering 504 once request_timeout has passed"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(executor, fn, *args), request_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Request timed out")
+
+    def recommend(user_id, message, profile, request_id):
+        recommender = state["recommender"]
+        text, movies, posters = recommender.get_response_progressive(
+            user_id, message, profile=profile, request_id=request_id
+        )
+        poster_urls = dict(posters)
+        return {
+            "request_id": request_id,
+            "user_id": user_id,
+            "response": text,
+            "movies": [
+                {"title": title, "year": year, "poster_url": poster_urls.get(index)}
+                for index, (title, year) in enumerate(movies)
+            ],
+        }
+
+    @app.post("/recommend")
+    async def post_recommend(request: RecommendRequest,
+                             x_moviemind_profile: str = Header(default=""),
+                             x_request_id: str = Header(default="")):
+        if state["recommender"] is None:
+            raise HTTPException(status_code=503, detail="Recommender is still starting")
+        if not request.message.strip():
+            raise HTTPException(status_code=422, detail="message must not be empty")
+        # "X-MovieMind-Profile: 1" writes a profile of this request (see request_profiler)
+        profile = x_moviemind_profile.lower() in ("1", "true", "yes")
+        # The id names profile files, so anything but [A-Za-z0-9_-]{1,64} is replaced
+        request_id = safe_request_id(x_request_id)
+        return await run_blocking(recommend, request.user_id, request.message, profile, request_id)
+
+    @app.get("/favorites/{user_id}")
+    async def get_favorites(user_id: str):
+        return {"user_id": user_id, "favorites": await run_blocking(favorites.list, user_id)}
+
+    @app.post("/favorites/{user_id}", status_code=201)
+    async def add_favorite(user_id: str, request: FavoriteRequest, response: Response):
+        added = await run_blocking(favorites.add, user_id, request.title)
+        if not added:
+            # Already a favorite: nothing was created
+            response.status_code = 200
+        return {"user_id": user_id, "title": request.title, "added": added}
+
+    # Titles may contain "/" (e.g. "Face/Off"), so the title takes the rest of the path
+    @app.delete("/favorites/{user_id}/{title:path}")
+    async def delete_favorite(user_id: str, title: str):
+        if not await run_blocking(favorites.remove, user_id, title):
+            raise HTTPException(status_code=404, detail=f"'{title}' is not in favorites")
+        return {"user_id": user_id, "title": title, "removed": True}
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readyz():
+        if state["recommender"] is None:
+            detail = state["error"] or "Recommender is still starting"
+            raise HTTPException(status_code=503, detail=detail)
+        return {"status": "ready"}
+
+    # Other workers pick the new version up through the catalog pointer poll
+    add_rebuild_route(app, lambda: getattr(state["recommender"], "catalog_index", None))
+
+    return app
+
+
+def app_from_env():
+    """Factory used by uvicorn worker processes"""
+    dotenv.load_dotenv()
+    configure_from_env()
+    return create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="MovieMind JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes, each with its own warmed recommender")
+    parser.add_argument("--keep-alive", type=int, default=30, help="idle keep-alive timeout in seconds")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        "api:app_from_env",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_keep_alive=args.keep_alive,
+    )
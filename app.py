@@ -3,6 +3,35 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
-from gradio_interface import demo
+# The guard keeps spawned worker processes (sharded retrieval), which re-import this
+# file as __mp_main__, from building the UI, starting metrics or launching the app again
+if __name__ == "__main__":
+    import gradio as gr
+    import uvicorn
+    from fastapi import FastAPI
 
-demo.launch()
+    import gradio_interface
+    from gradio_interface import build_demo, get_recommender
+    from catalog_index import add_rebuild_route
+    from metrics import configure_from_env
+    from poster_cache import PosterCache, add_poster_route
+
+    # Optional metrics: MOVIEMIND_METRICS, MOVIEMIND_METRICS_LOG, MOVIEMIND_METRICS_PORT
+    configure_from_env()
+
+    # Build the recommender (and the movie database on first run) before serving requests
+    get_recommender()
+
+    # Serve resized posters from a local cache next to the Gradio UI
+    app = FastAPI()
+    gradio_interface.poster_cache = PosterCache.from_env()
+    add_poster_route(app, gradio_interface.poster_cache)
+    # POST /admin/rebuild swaps in a rebuilt catalog without a restart (needs MOVIEMIND_ADMIN_TOKEN)
+    add_rebuild_route(app, lambda: get_recommender().catalog_index)
+    app = gr.mount_gradio_app(app, build_demo(), path="/")
+
+    uvicorn.run(
+        app,
+        host=os.environ.get("GRADIO_SERVER_NAME", "127.0.0.1"),
+        port=int(os.environ.get("GRADIO_SERVER_PORT", "7860")),
+    )
@@ -0,0 +1,239 @@
+"""
+Offline stand-ins for the external services used by MovieRecommender:
+a deterministic chat model, a hashing embedding function, and local
+TMDB and OpenAI-compatible servers.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from langchain_core.language_models.chat_models import SimpleChatModel
+
+
+EMBEDDING_DIM = 384
+
+
+def fake_completion(prompt_text, max_movies=5):
+    """
+    Deterministic answer for a recommendation prompt: echoes the first movies listed
+    in the prompt in the format the real model is asked to use.
+    """
+    titles = re.findall(r"Title:\s*(.*?)\n", prompt_text)
+    years = re.findall(r"Year:\s*(.*?)\n", prompt_text)
+    genres = re.findall(r"Genre:\s*(.*?)\n", prompt_text)
+    if not titles:
+        return "Could you tell me a bit more about the kind of movie you are looking for?"
+
+    paragraphs = ["Here are some movies you might enjoy:"]
+    for title, year, genre in list(zip(titles, years, genres))[:max_movies]:
+        paragraphs.append(
+            f"Title: {title}\nYear: {year}\nGenre: {genre}\nDirector: Unknown\n"
+            f"Main actors: Unknown\nA solid pick from our catalogue.\n"
+            f"Reason: it matches what you asked for."
+        )
+    paragraphs.append("Would you like something more recent?")
+    return "\n\n".join(paragraphs)
+
+
+class FakeChatModel(SimpleChatModel):
+    """Chat model that answers instantly (or after `latency` seconds) without any network calls"""
+
+    latency: float = 0.0
+    calls: int = 0
+    seconds_in_model: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "fake-moviemind"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        start = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        text = fake_completion("\n".join(str(m.content) for m in messages))
+        self.calls += 1
+        self.seconds_in_model += time.perf_counter() - start
+        return text
+
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Deterministic bag-of-words embeddings so benchmarks do not download a model"""
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = np.zeros((len(input), self.dim), dtype=np.float32)
+        for row, text in enumerate(input):
+            for token in re.findall(r"[a-z0-9]+", text.lower()):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, bucket] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return list(vectors / norms)
+
+    @staticmethod
+    def name():
+        return "moviemind-hashing"
+
+    def get_config(self):
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashingEmbeddingFunction(config.get("dim", EMBEDDING_DIM))
+
+
+class _FakeTMDBHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if not parsed.path.endswith("/search/movie"):
+            self.send_error(404)
+            return
+        query = parse_qs(parsed.query).get("query", [""])[0]
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        slug = hashlib.md5(query.encode("utf-8")).hexdigest()[:16]
+        body = json.dumps({"results": [{
+            "id": int(slug[:6], 16),
+            "title": query,
+            "poster_path": f"/{slug}.jpg",
+            "overview": f"Overview of {query}.",
+            "release_date": "2000-01-01",
+        }]}).encode("utf-8")
+        with self.server.lock:
+            self.server.request_count += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _LocalServer:
+    """Threaded HTTP server running in a daemon thread"""
+
+    def __init__(self, handler_class, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.request_count = 0
+        self.httpd.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeTMDBServer(_LocalServer):
+    """Local HTTP server that mimics TMDB's /3/search/movie endpoint"""
+
+    def __init__(self, latency=0.0, host="127.0.0.1", port=0):
+        super().__init__(_FakeTMDBHandler, host, port)
+        self.httpd.latency = latency
+
+    @property
+    def base_url(self):
+        return f"{self.address}/3"
+
+
+class _FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+
+        latency = self.server.latency
+        if self.server.jitter:
+            latency += random.uniform(0, self.server.jitter)
+        if latency:
+            time.sleep(latency)
+
+        with self.server.lock:
+            self.server.request_count += 1
+            fail = self.server.error_rate and random.random() < self.server.error_rate
+        if fail:
+            self.send_error(500, "injected failure")
+            return
+
+        text = fake_completion(prompt)
+        body = json.dumps({
+            "id": f"chatcmpl-{self.server.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt.split()),
+                "completion_tokens": len(text.split()),
+                "total_tokens": len(prompt.split()) + len(text.split()),
+            },
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeOpenAIServer(_LocalServer):
+    """
+    Local OpenAI-compatible /v1/chat/completions endpoint with configurable
+    latency (plus uniform jitter) and an optional injected error rate.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, host="127.0.0.1", port=0):
+        super().__init__(_FakeOpenAIHandler, host, port)
+        self.httpd.latency = latency
+        self.httpd.jitter = jitter
+        self.httpd.error_rate = error_rate
+
+    @property
+    def base_url(self):
+        return f"{self.address}/v1"
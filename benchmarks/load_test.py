@@ -0,0 +1,313 @@
+"""
+Concurrent-session load generator for the Gradio app.
+
+Two parts, usually run together:
+
+    # Serve the Gradio demo on a synthetic catalog, with local stub LLM/TMDB servers
+    python -m benchmarks.load_test serve --port 7861 --llm-latency 1.5
+
+    # Drive it with 50 concurrent sessions following scripted conversations
+    python -m benchmarks.load_test run --url http://127.0.0.1:7861 --sessions 50
+
+    # Or both at once (serve runs in a subprocess so it does not share the GIL)
+    python -m benchmarks.load_test run --launch --sessions 50 --llm-latency 1.5
+
+`serve` only swaps out what cannot run offline: the catalog is synthetic with
+hashing embeddings, and the OpenAI/TMDB clients are pointed at local stubs
+through OPENAI_BASE_URL and TMDB_API_BASE_URL. The Gradio queue, the real
+ChatOpenAI client and the favorites file are exercised as in production.
+`run` can also target a real deployment with --url.
+
+Conversation scripts are JSON files of the form:
+
+    {"conversations": [
+        {"name": "browse", "steps": [
+            {"action": "chat", "message": "a dark sci-fi thriller"},
+            {"action": "think", "seconds": 2},
+            {"action": "save_favorite", "title": "Blade Runner"},
+            {"action": "list_favorites"}
+        ]}
+    ]}
+
+Sessions are assigned conversations round-robin. The report gives throughput,
+p50/p95/p99 latency, error rates per action and the largest queue depth seen.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from index_evaluation import latency_summary
+
+
+DEFAULT_SCRIPT = {
+    "conversations": [
+        {"name": "browse", "steps": [
+            {"action": "chat", "message": "action movies with high ratings"},
+            {"action": "think", "seconds": 1},
+            {"action": "chat", "message": "something darker, maybe a thriller"},
+            {"action": "save_favorite", "title": "Heat"},
+            {"action": "list_favorites"},
+        ]},
+        {"name": "curate", "steps": [
+            {"action": "list_favorites"},
+            {"action": "save_favorite", "title": "Alien"},
+            {"action": "chat", "message": "a space adventure for the weekend"},
+            {"action": "delete_favorite", "title": "Alien"},
+            {"action": "list_favorites"},
+        ]},
+    ]
+}
+
+
+# --- SERVER SIDE ---
+def serve(args):
+    """Launch the Gradio demo on a synthetic catalog with stub LLM and TMDB servers"""
+    from benchmarks.fakes import FakeOpenAIServer, FakeTMDBServer, HashingEmbeddingFunction
+    from benchmarks.synthetic_catalog import generate_catalog
+
+    llm_server = FakeOpenAIServer(
+        latency=args.llm_latency, jitter=args.llm_jitter, error_rate=args.llm_error_rate
+    ).start()
+    tmdb_server = FakeTMDBServer(latency=args.tmdb_latency).start()
+    os.environ.update({
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": llm_server.base_url,
+        "OPENAI_API_BASE": llm_server.base_url,
+        "TMDB_API_KEY": "stub",
+        "TMDB_API_BASE_URL": tmdb_server.base_url,
+    })
+
+    # The app keeps its data (favorites, embeddings) under ./data
+    workdir = tempfile.mkdtemp(prefix="moviemind-load-")
+    os.chdir(workdir)
+
+    import gradio_interface
+    from metrics import configure_from_env
+    from recommendation_system import MovieRecommender
+    from vector_database_setup import prepare_movie_descriptions, create_vector_database
+
+    embedding_function = HashingEmbeddingFunction()
+    catalog = prepare_movie_descriptions(generate_catalog(args.catalog_size))
+    collection = create_vector_database(catalog, embedding_function=embedding_function)
+    gradio_interface.recommender = MovieRecommender(
+        collection=collection, embedding_function=embedding_function
+    )
+
+    print(f"Stub LLM at {llm_server.base_url}, stub TMDB at {tmdb_server.base_url}, data in {workdir}")
+    configure_from_env()
+    demo = gradio_interface.build_demo()
+    demo.queue(default_concurrency_limit=args.concurrency_limit)
+    demo.launch(server_name="127.0.0.1", server_port=args.port)
+
+
+# --- CLIENT SIDE ---
+class SessionStats:
+    """Latency samples and errors per action, shared by all sessions"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.max_queue_size = 0
+        self._lock = threading.Lock()
+
+    def record(self, action, seconds=None, error=None):
+        with self._lock:
+            if error is None:
+                self.samples.setdefault(action, []).append(seconds)
+            else:
+                self.errors.setdefault(action, []).append(error)
+
+    def observe_queue(self, queue_size):
+        with self._lock:
+            self.max_queue_size = max(self.max_queue_size, queue_size)
+
+    def report(self, wall_seconds):
+        actions = {}
+        total_ok = total_errors = 0
+        for action in sorted(set(self.samples) | set(self.errors)):
+            samples = self.samples.get(action, [])
+            errors = self.errors.get(action, [])
+            total_ok += len(samples)
+            total_errors += len(errors)
+            entry = {
+                "requests": len(samples) + len(errors),
+                "errors": len(errors),
+                "error_rate": round(len(errors) / (len(samples) + len(errors)), 4),
+            }
+            if samples:
+                entry.update(latency_summary(samples, digits=1))
+            if errors:
+                entry["sample_errors"] = sorted(set(errors))[:3]
+            actions[action] = entry
+        return {
+            "wall_seconds": round(wall_seconds, 2),
+            "requests": total_ok + total_errors,
+            "throughput_rps": round((total_ok + total_errors) / wall_seconds, 2) if wall_seconds else None,
+            "error_rate": round(total_errors / max(1, total_ok + total_errors), 4),
+            "max_queue_size": self.max_queue_size,
+            "actions": actions,
+        }
+
+
+def _call_endpoint(client, stats, action, api_name, *inputs, poll_interval=0.05):
+    """Submit one request, tracking the queue depth reported while it waits"""
+    start = time.perf_counter()
+    try:
+        job = client.submit(*inputs, api_name=api_name)
+        while not job.done():
+            status = job.status()
+            if status is not None and status.queue_size:
+                stats.observe_queue(status.queue_size)
+            time.sleep(poll_interval)
+        result = job.result()
+    except Exception as e:
+        stats.record(action, error=f"{type(e).__name__}: {e}"[:200])
+        return None
+    stats.record(action, seconds=time.perf_counter() - start)
+    return result
+
+
+def run_session(url, steps, iterations, stats, start_delay):
+    from gradio_client import Client
+
+    time.sleep(start_delay)
+    try:
+        client = Client(url, verbose=False)
+    except Exception as e:
+        stats.record("connect", error=f"{type(e).__name__}: {e}"[:200])
+        return
+
+    history = []
+    for _ in range(iterations):
+        for step in steps:
+            action = step["action"]
+            if action == "think":
+                time.sleep(step.get("seconds", 1))
+            elif action == "chat":
+                history = history + [[step["message"], None]]
+                result = _call_endpoint(client, stats, action, "/chat", history)
+                if result:
+                    history = result[0]
+            elif action in ("save_favorite", "delete_favorite"):
+                _call_endpoint(client, stats, action, f"/{action}", step["title"])
+            elif action == "list_favorites":
+                _call_endpoint(client, stats, action, "/list_favorites")
+            else:
+                raise ValueError(f"Unknown action in conversation script: {action}")
+
+
+def _wait_until_ready(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return True
+        except Exception:
+            time.sleep(1)
+    return False
+
+
+def run(args):
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    conversations = script["conversations"]
+
+    server = None
+    url = args.url
+    if args.launch:
+        url = f"http://127.0.0.1:{args.port}/"
+        command = [
+            sys.executable, "-m", "benchmarks.load_test", "serve",
+            "--port", str(args.port), "--catalog-size", str(args.catalog_size),
+            "--llm-latency", str(args.llm_latency), "--llm-jitter", str(args.llm_jitter),
+            "--llm-error-rate", str(args.llm_error_rate), "--tmdb-latency", str(args.tmdb_latency),
+            "--concurrency-limit", str(args.concurrency_limit),
+        ]
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen(command, cwd=repo_root)
+        if not _wait_until_ready(url, args.startup_timeout):
+            server.terminate()
+            raise SystemExit(f"App did not come up at {url} within {args.startup_timeout}s")
+
+    stats = SessionStats()
+    threads = []
+    start = time.perf_counter()
+    try:
+        for i in range(args.sessions):
+            conversation = conversations[i % len(conversations)]
+            delay = args.ramp_up * i / max(1, args.sessions)
+            thread = threading.Thread(
+                target=run_session,
+                args=(url, conversation["steps"], args.iterations, stats, delay),
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = stats.report(time.perf_counter() - start)
+    report["config"] = {
+        "url": url, "sessions": args.sessions, "iterations": args.iterations,
+        "conversations": [c.get("name") for c in conversations],
+        "llm_latency": args.llm_latency if args.launch else None,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def _add_server_options(parser):
+    parser.add_argument("--port", type=int, default=7861)
+    parser.add_argument("--catalog-size", type=int, default=5000)
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="extra uniform random latency")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--tmdb-latency", type=float, default=0.05)
+    parser.add_argument("--concurrency-limit", type=int, default=1,
+                        help="Gradio queue concurrency per event (1 is Gradio's default)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load generator for MovieMind")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="serve the app against local stubs")
+    _add_server_options(serve_parser)
+
+    run_parser = subparsers.add_parser("run", help="drive the app with concurrent sessions")
+    _add_server_options(run_parser)
+    run_parser.add_argument("--url", default="http://127.0.0.1:7861/")
+    run_parser.add_argument("--launch", action="store_true", help="start `serve` in a subprocess first")
+    run_parser.add_argument("--sessions", type=int, default=50)
+    run_parser.add_argument("--iterations", type=int, default=1, help="times each session repeats its script")
+    run_parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which sessions start")
+    run_parser.add_argument("--script", help="JSON file with scripted conversations")
+    run_parser.add_argument("--startup-timeout", type=float, default=300)
+    run_parser.add_argument("--output", help="also write the report to this JSON file")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
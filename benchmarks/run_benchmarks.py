@@ -0,0 +1,233 @@
+"""
+Offline benchmark suite for the MovieMind hot paths.
+
+Runs against synthetic catalogs with a fake chat model, hashing embeddings and a
+local fake TMDB server, so no network access or API keys are needed:
+
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --sizes 10000 100000 1000000 --output bench-large.json
+    python -m benchmarks.run_benchmarks --sizes 10000 --compare bench.json
+
+Results are written as JSON; --compare prints the relative change of every
+metric against an earlier run so regressions can be spotted between commits.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from benchmarks.fakes import FakeChatModel, FakeTMDBServer, HashingEmbeddingFunction
+from benchmarks.synthetic_catalog import generate_catalog, write_movielens_archive, query_set
+from index_evaluation import latency_summary
+
+
+def throughput(rows, seconds):
+    return {"seconds": round(seconds, 4), "rows_per_second": round(rows / seconds, 1) if seconds else None}
+
+
+def bench_prepare_movielens(n_movies, workdir):
+    from movie_data_preparation import download_and_prepare_movielens
+
+    archive = write_movielens_archive(os.path.join(workdir, f"ml-{n_movies}.zip"), n_movies)
+    start = time.perf_counter()
+    download_and_prepare_movielens(archive_path=archive, data_dir=os.path.join(workdir, f"data-{n_movies}"))
+    return throughput(n_movies, time.perf_counter() - start)
+
+
+def bench_descriptions(catalog):
+    from vector_database_setup import prepare_movie_descriptions
+
+    start = time.perf_counter()
+    catalog = prepare_movie_descriptions(catalog)
+    return catalog, throughput(len(catalog), time.perf_counter() - start)
+
+
+def bench_vector_database(catalog, workdir, embedding_function):
+    from vector_database_setup import create_vector_database
+
+    start = time.perf_counter()
+    collection = create_vector_database(
+        catalog, path=os.path.join(workdir, f"embeddings-{len(catalog)}"),
+        embedding_function=embedding_function,
+    )
+    return collection, throughput(len(catalog), time.perf_counter() - start)
+
+
+def bench_queries(collection, embedding_function, queries, n_results=5):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        collection.query(query_embeddings=embedding_function([query]), n_results=n_results)
+        samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+
+class _TraceCapture(logging.Handler):
+    """Collects the per-request JSON lines emitted by the metrics module"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(json.loads(record.getMessage()))
+
+
+def bench_get_response(collection, embedding_function, queries, tmdb_server):
+    """
+    End-to-end get_response time with the (instant) fake model's own time
+    subtracted and the TMDB rate limit switched off
+    """
+    import metrics
+    from recommendation_system import MovieRecommender
+    from tmdb_api_helper import TMDBHelper
+
+    capture = _TraceCapture()
+    metrics.registry.logger.addHandler(capture)
+    metrics.registry.enable(json_logs=True)
+
+    tmdb_helper = TMDBHelper()
+    tmdb_helper.api_key = "benchmark"
+    tmdb_helper.base_url = tmdb_server.base_url
+    # The local fake server needs no rate limiting; the real limiter's 0.25 s slots
+    # would otherwise make up most of the measured overhead
+    tmdb_helper._rate_limit = lambda: None
+    llm = FakeChatModel()
+    recommender = MovieRecommender(
+        collection=collection, embedding_function=embedding_function,
+        llm=llm, tmdb_helper=tmdb_helper,
+    )
+
+    overheads = []
+    try:
+        for query in queries:
+            recommender.memory.clear()
+            model_seconds = llm.seconds_in_model
+            start = time.perf_counter()
+            recommender.get_response("benchmark_user", query)
+            elapsed = time.perf_counter() - start
+            overheads.append(elapsed - (llm.seconds_in_model - model_seconds))
+    finally:
+        metrics.registry.logger.removeHandler(capture)
+        metrics.registry.enabled = False
+        metrics.registry.json_logs = False
+
+    stages = {}
+    for record in capture.records:
+        for stage, ms in record["stages_ms"].items():
+            stages.setdefault(stage, []).append(ms / 1000)
+    return {
+        "overhead_excluding_llm": latency_summary(overheads),
+        "stages": {stage: latency_summary(samples) for stage, samples in stages.items()},
+        "tmdb_requests": tmdb_server.request_count,
+    }
+
+
+def run_size(n_movies, args, workdir, tmdb_server):
+    print(f"\n=== {n_movies} movies ===")
+    result = {"prepare_movielens": bench_prepare_movielens(n_movies, workdir)}
+
+    catalog = generate_catalog(n_movies)
+    catalog, result["prepare_movie_descriptions"] = bench_descriptions(catalog)
+
+    if n_movies > args.max_index_size:
+        result["skipped"] = f"index benchmarks skipped above --max-index-size={args.max_index_size}"
+        return result
+
+    embedding_function = HashingEmbeddingFunction()
+    collection, result["create_vector_database"] = bench_vector_database(catalog, workdir, embedding_function)
+    queries = query_set(args.queries)
+    result["query_latency"] = bench_queries(collection, embedding_function, queries)
+    result["get_response"] = bench_get_response(
+        collection, embedding_function, queries[:args.e2e_queries], tmdb_server
+    )
+    return result
+
+
+def _flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current, previous_path):
+    """Print the relative change of every numeric metric against an earlier run"""
+    with open(previous_path) as f:
+        previous = _flatten(json.load(f)["results"])
+    print(f"\nComparison with {previous_path}:")
+    for name, value in sorted(_flatten(current["results"]).items()):
+        if name in previous and previous[name]:
+            change = (value - previous[name]) / previous[name] * 100
+            print(f"  {name}: {previous[name]} -> {value} ({change:+.1f}%)")
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline MovieMind benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="catalog sizes to benchmark (pass larger ones explicitly, 1M takes a long time)")
+    parser.add_argument("--queries", type=int, default=200, help="queries for the latency percentiles")
+    parser.add_argument("--e2e-queries", type=int, default=20, help="queries for the get_response benchmark")
+    parser.add_argument("--max-index-size", type=int, default=100000,
+                        help="largest catalog to embed and index (building 1M entries takes a long time)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    output_path = os.path.abspath(args.output)
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": {},
+    }
+
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="moviemind-bench-") as workdir, FakeTMDBServer() as tmdb_server:
+        # MovieRecommender keeps its preferences under ./data, so run inside the scratch directory
+        os.chdir(workdir)
+        try:
+            for n_movies in args.sizes:
+                report["results"][str(n_movies)] = run_size(n_movies, args, workdir, tmdb_server)
+        finally:
+            os.chdir(previous_cwd)
+
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output_path}")
+
+    if compare_path:
+        compare(report, compare_path)
+    return report
+
+
+if __name__ == "__main__":
+    main()
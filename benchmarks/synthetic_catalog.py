@@ -0,0 +1,119 @@
+"""
+Synthetic MovieLens-shaped data for benchmarks: catalogs in the
+processed_movies.csv schema and zip archives laid out like ml-latest-small.
+"""
+import io
+import os
+from zipfile import ZipFile, ZIP_DEFLATED
+
+import numpy as np
+import pandas as pd
+
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary",
+    "Drama", "Fantasy", "Film-Noir", "Horror", "IMAX", "Musical", "Mystery",
+    "Romance", "Sci-Fi", "Thriller", "War", "Western",
+]
+WORDS = [
+    "night", "city", "love", "war", "return", "last", "dark", "star", "river", "ghost",
+    "king", "summer", "secret", "road", "house", "dream", "storm", "blood", "island",
+    "game", "heart", "shadow", "fire", "winter", "story", "man", "woman", "girl", "boy",
+    "world", "time", "space", "dead", "lost", "golden", "silent", "wild", "red", "blue",
+]
+QUERIES = [
+    "action movies with high ratings", "a romantic comedy for a rainy evening",
+    "dark sci-fi thriller", "animated film for children", "classic western",
+    "scary horror movie from the 80s", "war drama based on a true story",
+    "mystery with a twist ending", "feel-good musical", "space adventure",
+]
+
+
+def _random_titles(rng, n_movies):
+    words = np.array(WORDS)
+    first = words[rng.integers(0, len(words), n_movies)]
+    second = words[rng.integers(0, len(words), n_movies)]
+    # Suffix with the row number so titles stay unique at any catalog size
+    return [f"The {a.title()} {b.title()} {i}" for i, (a, b) in enumerate(zip(first, second))]
+
+
+def _random_genres(rng, n_movies):
+    counts = rng.integers(1, 4, n_movies)
+    picks = rng.integers(0, len(GENRES), (n_movies, 3))
+    return [[GENRES[g] for g in dict.fromkeys(row[:count])] for row, count in zip(picks, counts)]
+
+
+def generate_movies(n_movies, seed=42):
+    """Raw movies.csv rows: movieId, title "Name (Year)", genres "A|B" """
+    rng = np.random.default_rng(seed)
+    years = rng.integers(1930, 2024, n_movies)
+    titles = _random_titles(rng, n_movies)
+    genres = _random_genres(rng, n_movies)
+    return pd.DataFrame({
+        "movieId": np.arange(1, n_movies + 1),
+        "title": [f"{t} ({y})" for t, y in zip(titles, years)],
+        "genres": ["|".join(g) for g in genres],
+    })
+
+
+def generate_ratings(n_movies, ratings_per_movie=5, n_users=1000, seed=42):
+    """Raw ratings.csv rows with half-star ratings between 0.5 and 5"""
+    rng = np.random.default_rng(seed + 1)
+    n_ratings = n_movies * ratings_per_movie
+    return pd.DataFrame({
+        "userId": rng.integers(1, n_users + 1, n_ratings),
+        "movieId": rng.integers(1, n_movies + 1, n_ratings),
+        "rating": rng.integers(1, 11, n_ratings) / 2.0,
+        "timestamp": rng.integers(800_000_000, 1_700_000_000, n_ratings),
+    })
+
+
+def generate_tags(n_movies, tags_per_movie=3, n_users=1000, seed=42):
+    """Raw tags.csv rows, free-text tags drawn from the title vocabulary"""
+    rng = np.random.default_rng(seed + 3)
+    n_tags = n_movies * tags_per_movie
+    return pd.DataFrame({
+        "userId": rng.integers(1, n_users + 1, n_tags),
+        "movieId": rng.integers(1, n_movies + 1, n_tags),
+        "tag": np.array(WORDS)[rng.integers(0, len(WORDS), n_tags)],
+        "timestamp": rng.integers(800_000_000, 1_700_000_000, n_tags),
+    })
+
+
+def generate_catalog(n_movies, seed=42):
+    """A catalog in the processed_movies.csv schema, genres already split into lists"""
+    rng = np.random.default_rng(seed)
+    movies_df = generate_movies(n_movies, seed)
+    movies_df["year"] = movies_df["title"].str.extract(r"\((\d{4})\)$")
+    movies_df["clean_title"] = movies_df["title"].str.replace(r"\s*\(\d{4}\)$", "", regex=True)
+    movies_df["genres"] = movies_df["genres"].str.split("|")
+    movies_df["avg_rating"] = np.round(rng.uniform(0.5, 5.0, n_movies), 2)
+    movies_df["rating_count"] = rng.integers(0, 500, n_movies).astype(float)
+    return movies_df
+
+
+def write_movielens_archive(path, n_movies, ratings_per_movie=5, seed=42, tags_per_movie=3):
+    """Write a zip laid out like ml-latest-small.zip (movies.csv, ratings.csv, tags.csv)"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    members = {
+        "ml-latest-small/movies.csv": generate_movies(n_movies, seed),
+        "ml-latest-small/ratings.csv": generate_ratings(n_movies, ratings_per_movie, seed=seed),
+        "ml-latest-small/tags.csv": generate_tags(n_movies, tags_per_movie, seed=seed),
+    }
+    with ZipFile(path, "w", compression=ZIP_DEFLATED) as zip_file:
+        for name, df in members.items():
+            buffer = io.StringIO()
+            df.to_csv(buffer, index=False)
+            zip_file.writestr(name, buffer.getvalue())
+    return path
+
+
+def query_set(n_queries, seed=42):
+    """Natural-language queries mixing the fixed phrases with catalog vocabulary"""
+    rng = np.random.default_rng(seed + 2)
+    queries = []
+    for i in range(n_queries):
+        base = QUERIES[i % len(QUERIES)]
+        extra = " ".join(rng.choice(WORDS, 2))
+        queries.append(f"{base} {extra}")
+    return queries
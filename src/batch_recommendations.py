@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def read_requests(input_path):
+    """Yield (row, user_id, query) for every non-empty line of the input JSONL"""
+    with open(input_path, 'r') as f:
+        row = 0
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield row, record['user_id'], record['query']
+            row += 1
+
+
+def load_checkpoint(output_path):
+    """
+    Return the rows already written to the output file.
+    A line cut short by a crash is dropped so the file can be appended to safely,
+    and so are fallback answers (LLM unavailable or timed out) so a resume retries them.
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    completed = set()
+    valid_lines = []
+    with open(output_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('source') == "fallback":
+                continue
+            if record.get('row') is not None:
+                completed.add(record['row'])
+            valid_lines.append(json.dumps(record) + "\n")
+
+    # Rewrite atomically without the damaged line(s)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.writelines(valid_lines)
+    os.replace(tmp_path, output_path)
+    return completed
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def retrieve_batch(recommender, queries, n_results=5):
+    """
+    Embed all queries in one call and search them with a single multi-query request,
+    through the recommender's own retrieval (live catalog version, any backend, MMR)
+    """
+    query_embeddings = recommender.embedding_function(queries)
+    retrieved = []
+    for rows in recommender.retrieve(query_embeddings, n_results):
+        movie_infos = []
+        movies = []
+        for movie_id, document, distance in zip(rows["ids"], rows["documents"], rows["distances"]):
+            parsed = recommender.parse_movie_results([document])
+            if not parsed:
+                continue
+            movie_infos.append(parsed[0])
+            movies.append({
+                "id": movie_id,
+                "title": parsed[0].get("title"),
+                "year": parsed[0].get("year"),
+                "genre": parsed[0].get("genre"),
+                "distance": round(float(distance), 6),
+            })
+        retrieved.append((movie_infos, movies))
+    return retrieved
+
+
+def run_batch(recommender, input_path, output_path, batch_size=256, n_results=5,
+              use_llm=True, llm_concurrency=4):
+    """
+    Produce recommendations for every (user_id, query) pair in input_path and append
+    them to output_path as JSONL. Rows already present in output_path are skipped,
+    so a crashed run can simply be started again.
+    llm_concurrency may not exceed the recommender's LLM pool (MovieRecommender's
+    llm_workers): calls beyond it would wait in line and spend their row's timeout there.
+    """
+    if use_llm and llm_concurrency > recommender.llm_workers:
+        raise ValueError(
+            f"llm_concurrency={llm_concurrency} exceeds the recommender's {recommender.llm_workers} LLM workers"
+        )
+
+    completed = load_checkpoint(output_path)
+    if completed:
+        print(f"Resuming: {len(completed)} rows already done")
+
+    pending = (r for r in read_requests(input_path) if r[0] not in completed)
+    processed = 0
+    start = time.time()
+
+    executor = ThreadPoolExecutor(max_workers=llm_concurrency) if use_llm else None
+    try:
+        with open(output_path, 'a') as out:
+            for chunk in _chunks(pending, batch_size):
+                retrieved = retrieve_batch(recommender, [query for _, _, query in chunk], n_results)
+
+                # Optional LLM step, at most llm_concurrency calls in flight
+                if executor is not None:
+                    responses = executor.map(
+                        recommender.recommend_stateless,
+                        [user_id for _, user_id, _ in chunk],
+                        [query for _, _, query in chunk],
+                        [movie_infos for movie_infos, _ in retrieved],
+                    )
+                else:
+                    responses = [(None, "retrieval")] * len(chunk)
+
+                # Rows are written as soon as their LLM call returns
+                for (row, user_id, query), (_, movies), (text, source) in zip(chunk, retrieved, responses):
+                    out.write(json.dumps({
+                        "row": row,
+                        "user_id": user_id,
+                        "query": query,
+                        "movies": movies,
+                        "response": text,
+                        "source": source,
+                    }) + "\n")
+                    out.flush()
+
+                # Checkpoint: the chunk is on disk before the next one starts
+                os.fsync(out.fileno())
+                processed += len(chunk)
+                print(f"Processed {processed} rows ({processed / (time.time() - start):.1f} rows/s)")
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    print(f"Batch finished: {processed} new rows written to {output_path}")
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch movie recommendations from a JSONL of (user_id, query)")
+    parser.add_argument("input", help="JSONL file with one {\"user_id\": ..., \"query\": ...} per line")
+    parser.add_argument("output", help="JSONL file to write (appended to when resuming)")
+    parser.add_argument("--batch-size", type=int, default=256, help="queries embedded and searched per call")
+    parser.add_argument("--n-results", type=int, default=5)
+    parser.add_argument("--skip-llm", action="store_true", help="only retrieve, no LLM write-up")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="LLM calls in flight")
+    args = parser.parse_args()
+
+    from recommendation_system import MovieRecommender
+
+    run_batch(
+        # Size the LLM pool for the batch so no call waits for a worker
+        MovieRecommender(llm_workers=max(8, args.llm_concurrency)),
+        args.input,
+        args.output,
+        batch_size=args.batch_size,
+        n_results=args.n_results,
+        use_llm=not args.skip_llm,
+        llm_concurrency=args.llm_concurrency,
+    )
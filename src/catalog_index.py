@@ -0,0 +1,342 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: derived copies are not guarded across processes
+    fcntl = None
+
+
+DEFAULT_COLLECTION_NAME = "movie_collection"
+ACTIVE_INDEX_FILE = "active_collection.json"
+SMOKE_QUERIES = [
+    "action movies with high ratings",
+    "a romantic comedy",
+    "animated film for the whole family",
+]
+
+
+class IndexValidationError(Exception):
+    """Raised when a freshly built collection fails its smoke checks"""
+
+
+class IndexHandle:
+    """One version of the retrieval collection, with a count of the requests using it"""
+
+    def __init__(self, version, collection):
+        self.version = version
+        self.collection = collection
+        self.active_requests = 0
+        self.retired = False
+        self.delete_when_idle = False
+
+
+def collection_fingerprint(collection, page_size=5000):
+    """
+    Digest of every id and document of a collection, in storage order. Copies
+    derived from a collection (shards, compact vectors) record it and rebuild
+    when it changes, which a name and row count miss when documents are
+    re-prepared under the same collection name.
+    """
+    digest = hashlib.sha256()
+    for offset in range(0, collection.count(), page_size):
+        page = collection.get(include=["documents"], limit=page_size, offset=offset)
+        for movie_id, document in zip(page["ids"], page["documents"]):
+            digest.update(f"{movie_id}\0{document}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@contextmanager
+def build_lock(path):
+    """
+    Exclusive file lock for a derived copy's directory, held on `<path>.lock` next
+    to it so the directory itself can be replaced. Every API worker checks the
+    copy at startup; the first one rebuilds it while holding the lock and the
+    others wait, then find it current and only attach.
+    """
+    path = os.path.normpath(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_active_version(path):
+    """Name of the collection currently marked live in the embeddings directory"""
+    pointer = os.path.join(path, ACTIVE_INDEX_FILE)
+    if os.path.exists(pointer):
+        with open(pointer, 'r') as f:
+            return json.load(f).get("collection", DEFAULT_COLLECTION_NAME)
+    return DEFAULT_COLLECTION_NAME
+
+
+def write_active_version(path, version):
+    """Atomically mark a collection as the live one"""
+    os.makedirs(path, exist_ok=True)
+    pointer = os.path.join(path, ACTIVE_INDEX_FILE)
+    tmp_pointer = pointer + ".tmp"
+    with open(tmp_pointer, 'w') as f:
+        json.dump({"collection": version, "activated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+    os.replace(tmp_pointer, pointer)
+
+
+def validate_collection(collection, expected_count=None, smoke_queries=SMOKE_QUERIES):
+    """Check a candidate collection before it goes live"""
+    count = collection.count()
+    if expected_count is not None and count != expected_count:
+        raise IndexValidationError(f"expected {expected_count} movies, found {count}")
+    if count == 0:
+        raise IndexValidationError("collection is empty")
+
+    for query in smoke_queries:
+        results = collection.query(query_texts=[query], n_results=min(5, count))
+        documents = results.get("documents", [[]])[0]
+        if not documents:
+            raise IndexValidationError(f"no results for smoke query {query!r}")
+        for document in documents:
+            try:
+                if not json.loads(document).get("title"):
+                    raise IndexValidationError(f"document without a title for {query!r}")
+            except (TypeError, json.JSONDecodeError):
+                raise IndexValidationError(f"unreadable document for {query!r}")
+
+
+class CatalogIndex:
+    """
+    Versioned handle to the retrieval collection.
+
+    Requests take the current version with acquire(); a rebuild writes a new
+    collection next to the live one, validates it and swaps the handle. Requests
+    already running finish on the old version. Rebuilds run inside the serving
+    process (POST /admin/rebuild, see add_rebuild_route), since Chroma does not
+    support several processes writing one store. Other serving processes on the
+    same store (API workers) follow the active_collection.json pointer from a
+    background poll (start_polling), never on a request thread.
+
+    Only the process that activated a version deletes the one it replaced: once
+    its own requests have released it and `retire_grace` seconds more have
+    passed, which covers the other workers' poll interval and the retrievals
+    they still have in flight. Followers never delete, and neither does a
+    process created with drop_retired=False.
+    """
+
+    def __init__(self, chroma_client, embedding_function, collection, version=DEFAULT_COLLECTION_NAME,
+                 path="data/embeddings", poll_interval=5.0, drop_retired=True, retire_grace=60.0):
+        self.chroma_client = chroma_client
+        self.embedding_function = embedding_function
+        self.path = path
+        self.poll_interval = poll_interval
+        self.drop_retired = drop_retired
+        self.retire_grace = retire_grace
+        self._handle = IndexHandle(version, collection)
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._poll_thread = None
+        self._stop_polling = threading.Event()
+
+    @property
+    def version(self):
+        return self._handle.version
+
+    def current(self):
+        return self._handle
+
+    @contextmanager
+    def acquire(self):
+        """Pin the current version for the duration of a request"""
+        with self._lock:
+            handle = self._handle
+            handle.active_requests += 1
+        try:
+            yield handle
+        finally:
+            with self._lock:
+                handle.active_requests -= 1
+                drop = handle.retired and handle.delete_when_idle and handle.active_requests == 0
+            if drop:
+                self._drop(handle)
+
+    def swap(self, version, collection, drop_old=True):
+        """
+        Make `collection` the live version. With drop_old (this process activated
+        it) the old version is deleted once idle, see the class docstring;
+        following another process's swap passes drop_old=False.
+        """
+        with self._lock:
+            old = self._handle
+            if old.version == version:
+                return
+            self._handle = IndexHandle(version, collection)
+            old.retired = True
+            old.delete_when_idle = drop_old
+            drop = drop_old and old.active_requests == 0
+        if self.chroma_client is not None:
+            write_active_version(self.path, version)
+        print(f"Catalog index swapped: {old.version} -> {version}")
+        if drop:
+            self._drop(old)
+
+    def rebuild(self, movies_df, smoke_queries=SMOKE_QUERIES):
+        """Build, validate and swap in a new version from prepared movies (blocking)"""
+        from vector_database_setup import create_vector_database
+
+        with self._rebuild_lock:
+            version = f"{DEFAULT_COLLECTION_NAME}_v{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+            collection = create_vector_database(
+                movies_df, path=self.path, embedding_function=self.embedding_function,
+                collection_name=version,
+            )
+            try:
+                validate_collection(collection, len(movies_df), smoke_queries)
+            except IndexValidationError:
+                self._delete_collection(version)
+                raise
+            self.swap(version, collection)
+            return version
+
+    def rebuilding(self):
+        return self._rebuild_lock.locked()
+
+    def rebuild_async(self, movies, smoke_queries=SMOKE_QUERIES):
+        """
+        Run rebuild() in a background thread; requests keep using the live version
+        meanwhile. `movies` is the prepared DataFrame or a function returning it,
+        which is then also called on the background thread.
+        """
+        def run():
+            try:
+                movies_df = movies() if callable(movies) else movies
+                self.rebuild(movies_df, smoke_queries)
+            except Exception as e:
+                print(f"Catalog rebuild failed, keeping {self.version}: {e}")
+
+        thread = threading.Thread(target=run, name="catalog-rebuild", daemon=True)
+        thread.start()
+        return thread
+
+    def start_polling(self):
+        """Follow versions activated by other processes, checking every poll_interval seconds"""
+        if self.chroma_client is None or self._poll_thread is not None:
+            return
+
+        def run():
+            while not self._stop_polling.wait(self.poll_interval):
+                self.follow_pointer()
+
+        self._poll_thread = threading.Thread(target=run, name="catalog-poll", daemon=True)
+        self._poll_thread.start()
+
+    def stop_polling(self):
+        self._stop_polling.set()
+
+    def follow_pointer(self):
+        """Swap to the version marked live in active_collection.json, if it changed"""
+        if self.chroma_client is None:
+            return
+        version = read_active_version(self.path)
+        if version == self._handle.version:
+            return
+        try:
+            collection = self.chroma_client.get_collection(
+                name=version, embedding_function=self.embedding_function
+            )
+        except Exception as e:
+            print(f"Could not open catalog version {version}: {e}")
+            return
+        # The process that activated the version owns deleting the old one
+        self.swap(version, collection, drop_old=False)
+
+    def _drop(self, handle):
+        if not self.drop_retired or self.chroma_client is None:
+            return
+        if self.retire_grace > 0:
+            timer = threading.Timer(self.retire_grace, self._delete_retired, args=(handle.version,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._delete_retired(handle.version)
+
+    def _delete_retired(self, version):
+        # Never delete the version that is marked live on disk
+        if version == read_active_version(self.path):
+            return
+        self._delete_collection(version)
+
+    def _delete_collection(self, version):
+        try:
+            self.chroma_client.delete_collection(version)
+            print(f"Deleted old catalog version {version}")
+        except Exception as e:
+            print(f"Could not delete catalog version {version}: {e}")
+
+
+def load_prepared_movies(catalog_csv="data/processed_movies.csv"):
+    """The prepared catalog (see movie_data_preparation) with its documents built"""
+    import ast
+    import pandas as pd
+    from vector_database_setup import prepare_movie_descriptions
+
+    movies_df = pd.read_csv(catalog_csv)
+    movies_df['genres'] = movies_df['genres'].apply(ast.literal_eval)
+    return prepare_movie_descriptions(movies_df)
+
+
+def add_rebuild_route(app, get_catalog_index, token=None, load_movies=load_prepared_movies):
+    """
+    POST /admin/rebuild on a FastAPI app: rebuild the catalog in this process, in
+    the background, from data/processed_movies.csv. Requires the X-Admin-Token
+    header to match `token` (default MOVIEMIND_ADMIN_TOKEN); without a token set
+    the route answers 403. `get_catalog_index` returns the live CatalogIndex or
+    None while the app is still starting.
+    """
+    from fastapi import Header, HTTPException
+
+    token = token or os.environ.get("MOVIEMIND_ADMIN_TOKEN")
+
+    @app.post("/admin/rebuild", status_code=202)
+    def rebuild_catalog(x_admin_token: str = Header(default="")):
+        if not token or not hmac.compare_digest(x_admin_token, token):
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+        index = get_catalog_index()
+        if index is None:
+            raise HTTPException(status_code=503, detail="Recommender is still starting")
+        if index.chroma_client is None:
+            raise HTTPException(status_code=409, detail="This catalog is not served from Chroma and cannot be rebuilt")
+        if index.rebuilding():
+            raise HTTPException(status_code=409, detail="A rebuild is already running")
+        index.rebuild_async(load_movies)
+        return {"status": "rebuilding", "live_version": index.version}
+
+
+if __name__ == "__main__":
+    # Ask a running app (app.py or api.py) to rebuild its catalog; the rebuild runs
+    # in that process because Chroma does not support a second process writing the store
+    import argparse
+    import urllib.error
+    import urllib.request
+
+    parser = argparse.ArgumentParser(description="Rebuild the movie catalog of a running MovieMind app")
+    parser.add_argument("--url", default="http://127.0.0.1:7860", help="base URL of app.py or api.py")
+    parser.add_argument("--token", default=os.environ.get("MOVIEMIND_ADMIN_TOKEN", ""))
+    args = parser.parse_args()
+
+    request = urllib.request.Request(
+        args.url.rstrip("/") + "/admin/rebuild", method="POST", headers={"X-Admin-Token": args.token}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            print(json.loads(response.read()))
+    except urllib.error.HTTPError as e:
+        raise SystemExit(f"Rebuild refused ({e.code}): {e.read().decode('utf-8', 'replace')}")
@@ -0,0 +1,399 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from catalog_index import build_lock, collection_fingerprint
+from index_evaluation import chunked_top_k, distances, exact_neighbors, latency_summary, recall_at_k, sample_queries
+
+
+COMPACT_DTYPES = ("int8", "float16")
+PAGE_SIZE = 5000
+SCAN_CHUNK_SIZE = 65536
+# Catalogs from this size up get an inverted-file (IVF) coarse index: the rows are
+# clustered into ~sqrt(N) lists and a query only scans the `n_probe` nearest lists.
+# Smaller catalogs are scanned in full, which is already cheap.
+IVF_MIN_ROWS = 50000
+DEFAULT_N_PROBE = 32
+IVF_TRAINING_ROWS = 64
+IVF_ITERATIONS = 10
+IVF_ASSIGN_CHUNK = 8192
+
+
+def quantize_int8(matrix):
+    """Symmetric per-vector int8 codes: row ~= codes * scale, scale = max|row| / 127"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes, scales):
+    return codes.astype(np.float32) * scales[:, None]
+
+
+def assign_lists(vectors, centroids, space):
+    """Nearest centroid of every row, in chunks so the distance matrix stays small"""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), IVF_ASSIGN_CHUNK):
+        chunk = np.asarray(vectors[start:start + IVF_ASSIGN_CHUNK], dtype=np.float32)
+        assignment[start:start + len(chunk)] = distances(chunk, centroids, space).argmin(axis=1)
+    return assignment
+
+
+def train_ivf(sample, n_lists, space, iterations=IVF_ITERATIONS, seed=0):
+    """k-means centroids for the IVF lists, assigning rows with the store's own distance"""
+    rng = np.random.default_rng(seed)
+    sample = np.asarray(sample, dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = assign_lists(sample, centroids, space)
+        counts = np.bincount(assignment, minlength=n_lists)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Empty lists restart from a random row
+        centroids[~filled] = sample[rng.choice(len(sample), int((~filled).sum()))]
+    return centroids
+
+
+class CompactVectorStore:
+    """
+    Retrieval over compact copies of the catalog embeddings.
+
+    The int8 codes (with one float32 scale per vector) or float16 copies live in
+    memory and are scanned first; the best `k * overfetch` candidates are then
+    re-scored exactly against the float32 matrix, which stays on disk as a
+    memory-mapped .npy and is only touched for those rows. int8 rows are scored
+    without decoding them: q . (codes * scale) = scale * (q . codes), with the
+    scales and exact norms precomputed at build time.
+
+    Large catalogs also get an IVF coarse index (see IVF_MIN_ROWS), so the
+    compact scan only covers the rows of the `n_probe` lists nearest the query
+    instead of the whole catalog. query() returns the same layout as chromadb
+    Collection.query; documents and metadata are read from the source
+    collection for the final ids only.
+    """
+
+    def __init__(self, path, dtype="int8", collection=None, overfetch=4, embedding_function=None,
+                 n_probe=DEFAULT_N_PROBE):
+        if dtype not in COMPACT_DTYPES:
+            raise ValueError(f"dtype must be one of {COMPACT_DTYPES}, got {dtype!r}")
+        self.path = path
+        self.dtype = dtype
+        self.collection = collection
+        self.overfetch = overfetch
+        self.embedding_function = embedding_function
+        self.n_probe = n_probe
+
+        with open(os.path.join(path, "manifest.json"), 'r') as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(path, "ids.json"), 'r') as f:
+            self.ids = json.load(f)
+        self.space = self.manifest.get("space", "l2")
+        self.name = f"{self.manifest['source']}_{dtype}"
+
+        self.full = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.norms = np.load(os.path.join(path, "norms.npy"))
+        self.compact = np.load(os.path.join(path, f"compact_{dtype}.npy"))
+        self.scales = np.load(os.path.join(path, "scales.npy")) if dtype == "int8" else None
+        self.centroids = self.ivf_order = self.ivf_offsets = None
+        if self.manifest.get("ivf_lists"):
+            self.centroids = np.load(os.path.join(path, "ivf_centroids.npy"))
+            self.ivf_order = np.load(os.path.join(path, "ivf_order.npy"))
+            self.ivf_offsets = np.load(os.path.join(path, "ivf_offsets.npy"))
+
+    def count(self):
+        return len(self.ids)
+
+    def memory_report(self):
+        """
+        Resident bytes of the compact index versus keeping every vector in float32.
+        The ids list is counted on both sides, since either store has to hold it.
+        """
+        ids_bytes = sys.getsizeof(self.ids) + sum(sys.getsizeof(movie_id) for movie_id in self.ids)
+        compact_bytes = ids_bytes + self.compact.nbytes + self.norms.nbytes
+        if self.scales is not None:
+            compact_bytes += self.scales.nbytes
+        if self.centroids is not None:
+            compact_bytes += self.centroids.nbytes + self.ivf_order.nbytes + self.ivf_offsets.nbytes
+        float32_bytes = ids_bytes + self.full.shape[0] * self.full.shape[1] * 4
+        return {
+            "dtype": self.dtype,
+            "vectors": int(self.full.shape[0]),
+            "dim": int(self.full.shape[1]),
+            "ids_bytes": int(ids_bytes),
+            "float32_bytes": int(float32_bytes),
+            "compact_bytes": int(compact_bytes),
+            "saved_bytes": int(float32_bytes - compact_bytes),
+            "ratio": round(compact_bytes / float32_bytes, 4),
+        }
+
+    def _approximate_distances(self, queries, rows):
+        """Distances to the compact copies of `rows` (a slice or an index array)"""
+        scales = self.scales[rows] if self.scales is not None else None
+        return distances(queries, self.compact[rows], self.space, self.norms[rows], scales)
+
+    def _probe(self, query, n_candidates):
+        """Rows of the IVF lists nearest the query: n_probe lists, more if they hold too few rows"""
+        order = np.argsort(distances(query[None, :], self.centroids, self.space)[0])
+        sizes = np.diff(self.ivf_offsets)[order]
+        needed = max(self.n_probe, int(np.searchsorted(np.cumsum(sizes), n_candidates)) + 1)
+        return np.concatenate([
+            self.ivf_order[self.ivf_offsets[lst]:self.ivf_offsets[lst + 1]] for lst in order[:needed]
+        ])
+
+    def _first_pass(self, queries, n_candidates):
+        """Approximate distances over the compact vectors; returns candidate rows per query"""
+        if self.centroids is not None:
+            candidates = []
+            for query in queries:
+                rows = self._probe(query, n_candidates)
+                row_distances = self._approximate_distances(query[None, :], rows)[0]
+                keep = min(n_candidates, len(rows))
+                candidates.append(rows[np.argpartition(row_distances, keep - 1)[:keep]])
+            return candidates
+
+        _, best_rows = chunked_top_k(
+            len(queries), len(self.compact), n_candidates,
+            lambda start, stop: self._approximate_distances(queries, slice(start, stop)),
+            SCAN_CHUNK_SIZE,
+        )
+        return best_rows
+
+    def search(self, query_embeddings, k=10):
+        """(rows, distances) of the exact-rescored top-k for every query, nearest first"""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        k = min(k, self.count())
+        candidates = self._first_pass(queries, min(self.count(), k * self.overfetch))
+
+        rows_out, distances_out = [], []
+        for query, rows in zip(queries, candidates):
+            # Sorted reads keep the memory-mapped access sequential
+            rows = np.sort(rows)
+            exact = distances(query[None, :], np.asarray(self.full[rows], dtype=np.float32),
+                              self.space, self.norms[rows])[0]
+            order = np.argsort(exact, kind="stable")[:k]
+            rows_out.append(rows[order])
+            distances_out.append(exact[order])
+        return rows_out, distances_out
+
+    def query(self, query_embeddings=None, query_texts=None, n_results=10,
+              include=("documents", "metadatas", "distances")):
+        """Same call shape and result layout as chromadb Collection.query"""
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(query_texts)
+        rows, row_distances = self.search(query_embeddings, n_results)
+
+        result = {"ids": [[self.ids[row] for row in query_rows] for query_rows in rows]}
+        if "distances" in include:
+            result["distances"] = [d.tolist() for d in row_distances]
+        if "embeddings" in include:
+            result["embeddings"] = [np.asarray(self.full[query_rows]) for query_rows in rows]
+        wanted = [key for key in ("documents", "metadatas") if key in include]
+        if wanted:
+            for key in wanted:
+                result[key] = []
+            for query_ids in result["ids"]:
+                fetched = self.collection.get(ids=query_ids, include=wanted)
+                by_id = {
+                    movie_id: position for position, movie_id in enumerate(fetched["ids"])
+                }
+                for key in wanted:
+                    result[key].append([fetched[key][by_id[movie_id]] for movie_id in query_ids])
+        return result
+
+    @classmethod
+    def build(cls, collection, path, page_size=PAGE_SIZE, fingerprint=None, ivf_lists=None):
+        """
+        Write the float32 matrix (as a memory-mappable .npy), exact norms, and both
+        compact encodings for a collection. Rows are streamed so memory stays bounded.
+        ivf_lists defaults to sqrt(N) lists from IVF_MIN_ROWS rows up, 0 (no IVF) below.
+
+        Everything is written to a staging directory that then replaces `path`, so
+        a reader sees either the old files or the new ones, never a mix. Processes
+        sharing `path` should build under build_lock(path), as from_collection does.
+        """
+        start = time.time()
+        path = os.path.normpath(path)
+        staging = f"{path}.building-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            count = cls._write(collection, staging, page_size, fingerprint, ivf_lists)
+            # Stores already open keep their memory maps of the old files
+            retired = f"{path}.old-{os.getpid()}"
+            if os.path.exists(path):
+                os.replace(path, retired)
+            os.replace(staging, path)
+            shutil.rmtree(retired, ignore_errors=True)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        print(f"Compact vectors for {count} movies written to {path} in {time.time() - start:.1f}s")
+
+    @classmethod
+    def _write(cls, collection, path, page_size, fingerprint, ivf_lists):
+        """Write every file of the store into `path`; returns the number of rows"""
+        count = collection.count()
+        ids = []
+        full = codes = scales = half = None
+        for offset in range(0, count, page_size):
+            page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            if full is None:
+                shape = (count, embeddings.shape[1])
+                full = np.lib.format.open_memmap(os.path.join(path, "embeddings.npy"), "w+", np.float32, shape)
+                codes = np.lib.format.open_memmap(os.path.join(path, "compact_int8.npy"), "w+", np.int8, shape)
+                half = np.lib.format.open_memmap(os.path.join(path, "compact_float16.npy"), "w+", np.float16, shape)
+                scales = np.empty(count, dtype=np.float32)
+                norms = np.empty(count, dtype=np.float32)
+            rows = slice(offset, offset + len(embeddings))
+            full[rows] = embeddings
+            codes[rows], scales[rows] = quantize_int8(embeddings)
+            half[rows] = embeddings.astype(np.float16)
+            norms[rows] = np.einsum("ij,ij->i", embeddings, embeddings)
+            ids.extend(page["ids"])
+
+        if full is None:
+            raise ValueError("collection is empty, nothing to compact")
+        for matrix in (full, codes, half):
+            matrix.flush()
+        np.save(os.path.join(path, "scales.npy"), scales)
+        np.save(os.path.join(path, "norms.npy"), norms)
+        with open(os.path.join(path, "ids.json"), 'w') as f:
+            json.dump(ids, f)
+
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        if ivf_lists is None:
+            ivf_lists = int(np.sqrt(count)) if count >= IVF_MIN_ROWS else 0
+        ivf_lists = min(ivf_lists, count)
+        if ivf_lists:
+            cls._build_ivf(path, full, space, ivf_lists)
+        if fingerprint is None:
+            fingerprint = collection_fingerprint(collection, page_size)
+        with open(os.path.join(path, "manifest.json"), 'w') as f:
+            json.dump({
+                "source": collection.name,
+                "count": count,
+                "dim": int(full.shape[1]),
+                "space": space,
+                "fingerprint": fingerprint,
+                "ivf_lists": ivf_lists,
+            }, f)
+        return count
+
+    @staticmethod
+    def _build_ivf(path, full, space, ivf_lists):
+        """Train IVF_TRAINING_ROWS rows per list worth of centroids, then file every row under its nearest"""
+        rng = np.random.default_rng(0)
+        sample_size = min(len(full), ivf_lists * IVF_TRAINING_ROWS)
+        sample = np.asarray(full[np.sort(rng.choice(len(full), sample_size, replace=False))], dtype=np.float32)
+        centroids = train_ivf(sample, ivf_lists, space)
+
+        assignment = assign_lists(full, centroids, space)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=ivf_lists))])
+
+        np.save(os.path.join(path, "ivf_centroids.npy"), centroids)
+        np.save(os.path.join(path, "ivf_order.npy"), order)
+        np.save(os.path.join(path, "ivf_offsets.npy"), offsets)
+
+    @classmethod
+    def from_collection(cls, collection, path="data/compact", dtype="int8", overfetch=4, embedding_function=None,
+                        n_probe=DEFAULT_N_PROBE):
+        """
+        Open the compact store for `collection`, building it first if it is missing
+        or stale (another collection, or other contents per collection_fingerprint).
+        The check and the build run under build_lock, so of several API workers
+        sharing `path` only the first builds and the rest open its files.
+        """
+        fingerprint = collection_fingerprint(collection)
+        with build_lock(path):
+            manifest_path = os.path.join(path, "manifest.json")
+            manifest = {}
+            if os.path.exists(manifest_path):
+                with open(manifest_path, 'r') as f:
+                    manifest = json.load(f)
+            if (manifest.get("source") != collection.name or manifest.get("count") != collection.count()
+                    or manifest.get("fingerprint") != fingerprint):
+                cls.build(collection, path, fingerprint=fingerprint)
+            return cls(path, dtype, collection, overfetch, embedding_function, n_probe)
+
+
+def evaluate(store, queries, k=10, collection=None):
+    """
+    Recall@k of the compact store against exact float32 brute force (and, when a
+    collection is given, against the collection's own HNSW results), with latency.
+    """
+    exact = exact_neighbors(store.full, queries, k, store.space)
+    found, latencies = [], []
+    for query in queries:
+        query_start = time.perf_counter()
+        rows, _ = store.search(query[None, :], k)
+        latencies.append(time.perf_counter() - query_start)
+        found.append(rows[0].tolist())
+
+    report = store.memory_report()
+    report.update({
+        "k": k,
+        "overfetch": store.overfetch,
+        "ivf_lists": int(len(store.centroids)) if store.centroids is not None else 0,
+        "n_probe": store.n_probe,
+        "recall_vs_exact": round(recall_at_k(found, exact, k), 4),
+    })
+    report.update(latency_summary(latencies))
+
+    if collection is not None:
+        row_of = {movie_id: row for row, movie_id in enumerate(store.ids)}
+        collection_rows, collection_latencies = [], []
+        for query in queries:
+            query_start = time.perf_counter()
+            results = collection.query(query_embeddings=[query], n_results=k, include=[])
+            collection_latencies.append(time.perf_counter() - query_start)
+            collection_rows.append([row_of[movie_id] for movie_id in results["ids"][0]])
+        report["collection_recall_vs_exact"] = round(recall_at_k(collection_rows, exact, k), 4)
+        report["recall_vs_collection"] = round(recall_at_k(found, collection_rows, k), 4)
+        report["collection_p50_ms"] = latency_summary(collection_latencies)["p50_ms"]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build compact (int8/float16) vectors for the live collection "
+                                                 "and report memory saved and recall impact")
+    parser.add_argument("--path", default="data/compact")
+    parser.add_argument("--dtype", nargs="+", default=list(COMPACT_DTYPES), choices=COMPACT_DTYPES)
+    parser.add_argument("--overfetch", nargs="+", type=int, default=[2, 4, 8])
+    parser.add_argument("--n-probe", type=int, default=DEFAULT_N_PROBE, help="IVF lists scanned per query")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--sample-queries", type=int, default=500)
+    parser.add_argument("--output", default="compact_vectors_report.json")
+    args = parser.parse_args()
+
+    import chromadb
+    from catalog_index import read_active_version
+
+    live_version = read_active_version("data/embeddings")
+    live_collection = chromadb.PersistentClient(path="data/embeddings").get_collection(name=live_version)
+    CompactVectorStore.from_collection(live_collection, args.path)
+
+    reports = []
+    for dtype in args.dtype:
+        for overfetch in args.overfetch:
+            store = CompactVectorStore(args.path, dtype, live_collection, overfetch, n_probe=args.n_probe)
+            queries = sample_queries(store.full, args.sample_queries)
+            report = evaluate(store, queries, args.k, live_collection)
+            print(f"{dtype} overfetch={overfetch}: {report['compact_bytes'] / 2**20:.1f} MiB "
+                  f"(float32 {report['float32_bytes'] / 2**20:.1f} MiB), "
+                  f"recall@{args.k}={report['recall_vs_exact']:.3f} vs exact, "
+                  f"{report['recall_vs_collection']:.3f} vs collection, p50={report['p50_ms']:.2f}ms")
+            reports.append(report)
+
+    with open(args.output, "w") as f:
+        json.dump({"source": live_version, "results": reports}, f, indent=2)
+    print(f"Report written to {args.output}")
@@ -0,0 +1,47 @@
+import threading
+from collections import OrderedDict, deque
+
+
+DEFAULT_MAX_TURNS = 10
+DEFAULT_MAX_USERS = 1000
+
+
+class ConversationMemory:
+    """
+    Recent chat turns per user, formatted for the prompts' {chat_history}.
+
+    Every user keeps only their last `max_turns` exchanges, and only the
+    `max_users` most recently active users are kept at all, so the history of a
+    long-running server stays bounded and one user's messages never reach
+    another user's prompt.
+    """
+
+    def __init__(self, max_turns=DEFAULT_MAX_TURNS, max_users=DEFAULT_MAX_USERS):
+        self.max_turns = max_turns
+        self.max_users = max_users
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def buffer(self, user_id):
+        """The user's history as "Human: ...\\nAI: ..." lines, oldest first"""
+        with self._lock:
+            turns = list(self._histories.get(user_id, ()))
+        return "\n".join(f"Human: {message}\nAI: {response}" for message, response in turns)
+
+    def save(self, user_id, message, response):
+        with self._lock:
+            history = self._histories.get(user_id)
+            if history is None:
+                history = self._histories[user_id] = deque(maxlen=self.max_turns)
+            history.append((message, response))
+            self._histories.move_to_end(user_id)
+            while len(self._histories) > self.max_users:
+                self._histories.popitem(last=False)
+
+    def clear(self, user_id=None):
+        """Forget one user's history, or everyone's"""
+        with self._lock:
+            if user_id is None:
+                self._histories.clear()
+            else:
+                self._histories.pop(user_id, None)
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+
+PREFERENCES_FILE = "data/user_preferences.json"
+
+
+class FavoritesStore:
+    """
+    Favorite movies per user, kept in the user preferences JSON file.
+    Shared by the Gradio UI and the JSON API: every change is a locked
+    read-modify-write (a thread lock plus a file lock, so several API worker
+    processes can share the file) followed by an atomic replace.
+    """
+
+    def __init__(self, path=PREFERENCES_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                return json.load(f)
+        return {}
+
+    def _write(self, prefs):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(prefs, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path + ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def list(self, user_id):
+        with self._locked():
+            return list(self._read().get(user_id, {}).get("favorites", []))
+
+    def add(self, user_id, title):
+        """Add a favorite; returns False if it was already there"""
+        with self._locked():
+            prefs = self._read()
+            favorites = prefs.setdefault(user_id, {}).setdefault("favorites", [])
+            if title in favorites:
+                return False
+            favorites.append(title)
+            self._write(prefs)
+            return True
+
+    def remove(self, user_id, title):
+        """Remove a favorite; returns False if it was not there"""
+        with self._locked():
+            prefs = self._read()
+            favorites = prefs.get(user_id, {}).get("favorites", [])
+            if title not in favorites:
+                return False
+            favorites.remove(title)
+            self._write(prefs)
+            return True
@@ -0,0 +1,241 @@
+import argparse
+import itertools
+import json
+import time
+import uuid
+
+import numpy as np
+
+
+EXACT_CHUNK_SIZE = 4096
+
+
+def collection_embeddings(collection, page_size=5000):
+    """Read (ids, float32 matrix) out of a collection page by page"""
+    count = collection.count()
+    ids = []
+    matrix = None
+    for offset in range(0, count, page_size):
+        page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+        page_embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+        if matrix is None:
+            matrix = np.empty((count, page_embeddings.shape[1]), dtype=np.float32)
+        matrix[offset:offset + len(page_embeddings)] = page_embeddings
+        ids.extend(page["ids"])
+    return ids, matrix
+
+
+def distances(queries, vectors, space, vector_norms=None, scales=None):
+    """
+    Chroma's distance for each space (squared l2, 1 - cosine, 1 - dot) between every
+    query and every vector, in float32. `vectors` may also be compact copies: float16,
+    or int8 codes with one scale per row (row ~= codes * scale), scored against the
+    exact squared `vector_norms` of the rows they encode.
+    """
+    if space not in ("l2", "cosine", "ip"):
+        raise ValueError(f"Unsupported distance space: {space}")
+    queries = np.asarray(queries, dtype=np.float32)
+    dots = queries @ vectors.T
+    if scales is not None:
+        dots *= scales[None, :]
+    if space == "ip":
+        return 1 - dots
+    if vector_norms is None:
+        vector_norms = np.einsum("ij,ij->i", vectors, vectors)
+    query_norms = np.einsum("ij,ij->i", queries, queries)
+    if space == "l2":
+        return query_norms[:, None] - 2 * dots + vector_norms[None, :]
+    norms = np.sqrt(np.maximum(query_norms, 1e-24))[:, None] * np.sqrt(np.maximum(vector_norms, 1e-24))[None, :]
+    return 1 - dots / norms
+
+
+def chunked_top_k(num_queries, num_rows, k, chunk_distances, chunk_size=EXACT_CHUNK_SIZE):
+    """
+    Running top-k over the rows in chunks: chunk_distances(start, stop) gives the
+    distances of every query to rows start..stop, which are merged with the best
+    rows so far, so no more than num_queries x (k + chunk_size) values are held.
+    Returns (distances, rows) of the k nearest rows per query, in no particular order.
+    """
+    best_distances = np.full((num_queries, 0), np.inf, dtype=np.float32)
+    best_rows = np.empty((num_queries, 0), dtype=np.int64)
+    for start in range(0, num_rows, chunk_size):
+        stop = min(start + chunk_size, num_rows)
+        merged_distances = np.concatenate([best_distances, chunk_distances(start, stop)], axis=1)
+        merged_rows = np.concatenate(
+            [best_rows, np.broadcast_to(np.arange(start, stop), (num_queries, stop - start))], axis=1
+        )
+        keep = min(k, merged_distances.shape[1])
+        top = np.argpartition(merged_distances, keep - 1, axis=1)[:, :keep]
+        best_distances = np.take_along_axis(merged_distances, top, axis=1)
+        best_rows = np.take_along_axis(merged_rows, top, axis=1)
+    return best_distances, best_rows
+
+
+def exact_neighbors(corpus, queries, k, space="l2", chunk_size=EXACT_CHUNK_SIZE):
+    """
+    Brute-force top-k row indices of `corpus` for every query, nearest first,
+    scanning the corpus in chunks (see chunked_top_k).
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    k = min(k, len(corpus))
+    best_distances, best_indices = chunked_top_k(
+        len(queries), len(corpus), k,
+        lambda start, stop: distances(queries, np.asarray(corpus[start:stop], dtype=np.float32), space),
+        chunk_size,
+    )
+    order = np.argsort(best_distances, axis=1, kind="stable")
+    return np.take_along_axis(best_indices, order, axis=1)
+
+
+def recall_at_k(approximate, exact, k):
+    """Mean fraction of the exact top-k that the approximate top-k recovered"""
+    hits = [
+        len(set(found[:k]) & set(truth[:k])) / len(truth[:k])
+        for found, truth in zip(approximate, exact)
+        if len(truth)
+    ]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def latency_summary(seconds, digits=3):
+    """
+    Count, p50/p95/p99, mean and max of latencies given in seconds, in milliseconds.
+    Shared by the index evaluations and the benchmarks so they report alike.
+    """
+    ms = np.asarray(seconds, dtype=float) * 1000
+    return {
+        "count": int(ms.size),
+        "p50_ms": round(float(np.percentile(ms, 50)), digits),
+        "p95_ms": round(float(np.percentile(ms, 95)), digits),
+        "p99_ms": round(float(np.percentile(ms, 99)), digits),
+        "mean_ms": round(float(ms.mean()), digits),
+        "max_ms": round(float(ms.max()), digits),
+    }
+
+
+def parameter_grid(spaces, ms, construction_efs, search_efs):
+    """Every combination of the swept HNSW settings as index configs"""
+    return [
+        {"space": space, "M": m, "construction_ef": construction_ef, "search_ef": search_ef}
+        for space, m, construction_ef, search_ef in itertools.product(spaces, ms, construction_efs, search_efs)
+    ]
+
+
+def evaluate_config(chroma_client, corpus, queries, exact, index_config, k=10, batch_size=5000):
+    """
+    Build a throwaway collection with `index_config`, run every query one at a
+    time (as a chat request does) and report recall@k, latency and build time.
+    """
+    from vector_database_setup import hnsw_metadata
+
+    name = f"hnsw_eval_{uuid.uuid4().hex[:12]}"
+    collection = chroma_client.create_collection(
+        name=name, embedding_function=None, metadata=hnsw_metadata(index_config)
+    )
+    try:
+        build_start = time.perf_counter()
+        batch_size = min(batch_size, chroma_client.get_max_batch_size())
+        for start in range(0, len(corpus), batch_size):
+            collection.add(
+                ids=[str(i) for i in range(start, min(start + batch_size, len(corpus)))],
+                embeddings=np.asarray(corpus[start:start + batch_size], dtype=np.float32),
+            )
+        build_seconds = time.perf_counter() - build_start
+
+        found = []
+        latencies = []
+        for query in queries:
+            query_start = time.perf_counter()
+            results = collection.query(query_embeddings=[query], n_results=k, include=[])
+            latencies.append(time.perf_counter() - query_start)
+            found.append([int(i) for i in results["ids"][0]])
+    finally:
+        chroma_client.delete_collection(name)
+
+    result = dict(index_config)
+    result.update({
+        "k": k,
+        "recall_at_k": round(recall_at_k(found, exact, k), 4),
+        "build_seconds": round(build_seconds, 3),
+    })
+    result.update(latency_summary(latencies))
+    return result
+
+
+def sweep(corpus, queries, configs, k=10, chroma_client=None):
+    """Evaluate every config against exact neighbours computed once per distance space"""
+    import chromadb
+
+    chroma_client = chroma_client or chromadb.EphemeralClient()
+    exact_by_space = {}
+    results = []
+    for config in configs:
+        space = config.get("space") or "l2"
+        if space not in exact_by_space:
+            exact_start = time.perf_counter()
+            exact_by_space[space] = exact_neighbors(corpus, queries, k, space)
+            print(f"Exact neighbours ({space}) in {time.perf_counter() - exact_start:.2f}s")
+        result = evaluate_config(chroma_client, corpus, queries, exact_by_space[space], config, k)
+        print(f"space={space} M={config.get('M')} construction_ef={config.get('construction_ef')} "
+              f"search_ef={config.get('search_ef')}: recall@{k}={result['recall_at_k']:.3f} "
+              f"p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms build={result['build_seconds']:.1f}s")
+        results.append(result)
+    return results
+
+
+def sample_queries(corpus, n, noise=0.05, seed=0):
+    """Perturbed catalogue vectors to use as queries when no query file is given"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(corpus), size=min(n, len(corpus)), replace=False)
+    queries = np.asarray(corpus[rows], dtype=np.float32)
+    scale = noise * np.linalg.norm(queries, axis=1, keepdims=True) / np.sqrt(queries.shape[1])
+    return queries + rng.standard_normal(queries.shape).astype(np.float32) * scale
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure HNSW recall@k and query latency over a parameter sweep")
+    parser.add_argument("--snapshot", help="index snapshot .tar to evaluate (default: the live collection)")
+    parser.add_argument("--queries", help="text file with one query per line (embedded with all-MiniLM-L6-v2)")
+    parser.add_argument("--sample-queries", type=int, default=500,
+                        help="without --queries, use this many perturbed catalogue vectors as queries")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--space", nargs="+", default=["l2"], choices=["l2", "cosine", "ip"])
+    parser.add_argument("--M", nargs="+", type=int, default=[16])
+    parser.add_argument("--construction-ef", nargs="+", type=int, default=[100])
+    parser.add_argument("--search-ef", nargs="+", type=int, default=[10, 50, 100])
+    parser.add_argument("--output", default="hnsw_evaluation.json")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        from index_snapshot import extract_snapshot, load_embeddings
+        manifest, snapshot_dir = extract_snapshot(args.snapshot)
+        corpus = load_embeddings(snapshot_dir)
+        source = f"snapshot {manifest['version']}"
+    else:
+        import chromadb
+        from catalog_index import read_active_version
+        live_version = read_active_version("data/embeddings")
+        live_collection = chromadb.PersistentClient(path="data/embeddings").get_collection(name=live_version)
+        _, corpus = collection_embeddings(live_collection)
+        source = f"collection {live_version}"
+
+    if args.queries:
+        from chromadb.utils import embedding_functions
+        with open(args.queries) as f:
+            texts = [line.strip() for line in f if line.strip()]
+        embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(model_name='all-MiniLM-L6-v2')
+        query_vectors = np.asarray(embedding_function(texts), dtype=np.float32)
+    else:
+        query_vectors = sample_queries(corpus, args.sample_queries)
+
+    print(f"Evaluating {source}: {len(corpus)} vectors, {len(query_vectors)} queries")
+    configs = parameter_grid(args.space, args.M, args.construction_ef, args.search_ef)
+    report = {
+        "source": source,
+        "corpus_size": len(corpus),
+        "queries": len(query_vectors),
+        "results": sweep(corpus, query_vectors, configs, args.k),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+
+import numpy as np
+
+from catalog_index import read_active_version, write_active_version
+
+
+SNAPSHOT_FORMAT = "moviemind-index-snapshot"
+SNAPSHOT_FORMAT_VERSION = 1
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+PAGE_SIZE = 5000
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot artifact is malformed or fails its checksums"""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_snapshot(collection, artifact_path, version=None, catalog_csv="data/processed_movies.csv"):
+    """
+    Pack a collection into a single uncompressed tar:
+      manifest.json   format, version, counts, dims and a sha256 per file
+      embeddings.npy  float32 (count x dim) matrix, memory-mappable once extracted
+      records.jsonl   id, document and metadata per row, in embedding order
+      catalog.csv     the prepared catalog (processed_movies.csv), when available
+    Rows are streamed page by page so memory stays bounded for large catalogs.
+    The embedding model is not packed, only its name (see import_snapshot).
+    """
+    version = version or f"{collection.name}-{time.strftime('%Y%m%d%H%M%S')}"
+    count = collection.count()
+
+    with tempfile.TemporaryDirectory(prefix="moviemind-snapshot-") as staging:
+        embeddings_path = os.path.join(staging, "embeddings.npy")
+        records_path = os.path.join(staging, "records.jsonl")
+        matrix = None
+
+        with open(records_path, 'w') as records:
+            for offset in range(0, count, PAGE_SIZE):
+                page = collection.get(
+                    include=["embeddings", "documents", "metadatas"],
+                    limit=PAGE_SIZE,
+                    offset=offset,
+                )
+                page_embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+                if matrix is None:
+                    matrix = np.lib.format.open_memmap(
+                        embeddings_path, mode="w+", dtype=np.float32,
+                        shape=(count, page_embeddings.shape[1]),
+                    )
+                matrix[offset:offset + len(page_embeddings)] = page_embeddings
+                for movie_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    records.write(json.dumps({"id": movie_id, "document": document, "metadata": metadata}) + "\n")
+
+        if matrix is None:
+            raise SnapshotError("collection is empty, nothing to export")
+        dim = matrix.shape[1]
+        matrix.flush()
+        del matrix
+
+        members = ["embeddings.npy", "records.jsonl"]
+        if catalog_csv and os.path.exists(catalog_csv):
+            shutil.copy(catalog_csv, os.path.join(staging, "catalog.csv"))
+            members.append("catalog.csv")
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "version": version,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "source_collection": collection.name,
+            "collection_metadata": collection.metadata or {},
+            "embedding_model": EMBEDDING_MODEL,
+            "count": count,
+            "dim": dim,
+            "dtype": "float32",
+            "files": {
+                name: {
+                    "sha256": _sha256(os.path.join(staging, name)),
+                    "bytes": os.path.getsize(os.path.join(staging, name)),
+                }
+                for name in members
+            },
+        }
+        with open(os.path.join(staging, "manifest.json"), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Uncompressed so import is a plain copy and the matrix stays mmap-friendly
+        os.makedirs(os.path.dirname(os.path.abspath(artifact_path)), exist_ok=True)
+        with tarfile.open(artifact_path, "w") as tar:
+            for name in ["manifest.json"] + members:
+                tar.add(os.path.join(staging, name), arcname=name)
+
+    print(f"Exported {count} movies ({dim}-d) as snapshot {version} to {artifact_path}")
+    return manifest
+
+
+def extract_snapshot(artifact_path, snapshots_dir="data/snapshots"):
+    """Unpack and verify an artifact; returns (manifest, directory)"""
+    with tarfile.open(artifact_path, "r") as tar:
+        manifest_member = tar.extractfile("manifest.json")
+        if manifest_member is None:
+            raise SnapshotError("artifact has no manifest.json")
+        manifest = json.load(manifest_member)
+        if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotError(f"unsupported snapshot format {manifest.get('format')} v{manifest.get('format_version')}")
+
+        target = os.path.join(snapshots_dir, re.sub(r"[^a-zA-Z0-9._-]", "-", str(manifest["version"])))
+        os.makedirs(target, exist_ok=True)
+        expected = set(manifest["files"]) | {"manifest.json"}
+        for member in tar.getmembers():
+            # Only the files listed in the manifest, never paths outside the target
+            if member.name not in expected or not member.isfile():
+                raise SnapshotError(f"unexpected member {member.name!r} in artifact")
+            tar.extract(member, target)
+
+    for name, info in manifest["files"].items():
+        if _sha256(os.path.join(target, name)) != info["sha256"]:
+            raise SnapshotError(f"checksum mismatch for {name}")
+    return manifest, target
+
+
+def load_embeddings(snapshot_dir):
+    """Memory-map the embedding matrix of an extracted snapshot"""
+    return np.load(os.path.join(snapshot_dir, "embeddings.npy"), mmap_mode="r")
+
+
+def import_snapshot(artifact_path, path="data/embeddings", snapshots_dir="data/snapshots",
+                    embedding_function=None, activate=True):
+    """
+    Load a snapshot into a new collection without re-embedding anything and,
+    by default, mark it as the live catalog version (see catalog_index).
+    Returns the new collection.
+
+    The snapshot holds the catalog vectors only, not the embedding model.
+    Queries are still embedded with manifest["embedding_model"]
+    (all-MiniLM-L6-v2), so an offline host needs that model in its
+    sentence-transformers cache (SENTENCE_TRANSFORMERS_HOME, or HF_HOME for
+    the Hugging Face cache) before serving. Otherwise the first chat turn
+    tries to download it.
+    """
+    import chromadb
+
+    start = time.time()
+    manifest, snapshot_dir = extract_snapshot(artifact_path, snapshots_dir)
+    embeddings = load_embeddings(snapshot_dir)
+    if embeddings.shape != (manifest["count"], manifest["dim"]):
+        raise SnapshotError(f"embedding matrix has shape {embeddings.shape}, manifest says "
+                            f"({manifest['count']}, {manifest['dim']})")
+
+    chroma_client = chromadb.PersistentClient(path=path)
+    collection_name = re.sub(r"[^a-zA-Z0-9._-]", "-", f"movie_collection_snap_{manifest['version']}")
+    try:
+        chroma_client.delete_collection(collection_name)
+    except Exception:
+        pass
+    collection = chroma_client.create_collection(
+        name=collection_name,
+        embedding_function=embedding_function,
+        metadata=manifest.get("collection_metadata") or None,
+    )
+
+    batch_size = min(PAGE_SIZE, chroma_client.get_max_batch_size())
+    with open(os.path.join(snapshot_dir, "records.jsonl"), 'r') as records:
+        offset = 0
+        while True:
+            batch = [json.loads(line) for _, line in zip(range(batch_size), records)]
+            if not batch:
+                break
+            collection.add(
+                ids=[r["id"] for r in batch],
+                embeddings=np.asarray(embeddings[offset:offset + len(batch)]),
+                documents=[r["document"] for r in batch],
+                metadatas=[r["metadata"] for r in batch],
+            )
+            offset += len(batch)
+
+    catalog_path = os.path.join(snapshot_dir, "catalog.csv")
+    if os.path.exists(catalog_path):
+        shutil.copy(catalog_path, os.path.join(os.path.dirname(os.path.abspath(path)), "processed_movies.csv"))
+
+    if activate:
+        write_active_version(path, collection_name)
+    print(f"Imported snapshot {manifest['version']} ({offset} movies) in {time.time() - start:.1f}s "
+          f"as {collection_name}")
+    return collection
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import a prebuilt movie index snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="pack the live collection into an artifact")
+    export_parser.add_argument("artifact", help="output .tar file")
+    export_parser.add_argument("--version", help="snapshot version label (default: collection name + timestamp)")
+
+    import_parser = subparsers.add_parser("import", help="load an artifact and make it the live catalog")
+    import_parser.add_argument("artifact", help="snapshot .tar file")
+    import_parser.add_argument("--no-activate", action="store_true", help="load without switching the live version")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        import chromadb
+        chroma_client = chromadb.PersistentClient(path="data/embeddings")
+        live_collection = chroma_client.get_collection(name=read_active_version("data/embeddings"))
+        export_snapshot(live_collection, args.artifact, version=args.version)
+    else:
+        import_snapshot(args.artifact, activate=not args.no_activate)
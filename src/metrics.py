@@ -0,0 +1,298 @@
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Buckets (seconds) for stage latencies and (tokens) for prompt/completion sizes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+_NULL_CONTEXT = nullcontext()
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = [f'{name}="{_escape_label(value)}"' for name, value in pairs]
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self.values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self.series.get(key)
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), series[:-1]):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, ("le", bound))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them for the /metrics endpoint"""
+
+    def __init__(self, enabled=False, json_logs=False):
+        self.enabled = enabled or json_logs
+        self.json_logs = json_logs
+        self.metrics = []
+        self.logger = logging.getLogger("moviemind.metrics")
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(self, name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(self, name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def enable(self, json_logs=None):
+        self.enabled = True
+        if json_logs is not None:
+            self.json_logs = json_logs
+        if self.json_logs:
+            self.logger.setLevel(logging.INFO)
+            if not self.logger.handlers:
+                handler = logging.StreamHandler(sys.stderr)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self.logger.addHandler(handler)
+                self.logger.propagate = False
+
+
+registry = MetricsRegistry()
+
+# --- METRICS RECORDED BY THE APP ---
+STAGE_SECONDS = registry.histogram(
+    "moviemind_stage_seconds", "Time spent in each stage of a chat turn", ("stage",)
+)
+REQUEST_SECONDS = registry.histogram(
+    "moviemind_request_seconds", "End-to-end time of a chat turn", ("source",)
+)
+LLM_TOKENS = registry.histogram(
+    "moviemind_llm_tokens", "Prompt and completion tokens per chat turn", ("kind",), TOKEN_BUCKETS
+)
+RESPONSES = registry.counter(
+    "moviemind_responses_total", "Chat turns by how the answer was produced", ("source",)
+)
+TMDB_CACHE_LOOKUPS = registry.counter(
+    "moviemind_tmdb_cache_lookups_total", "TMDB search cache lookups", ("result",)
+)
+TMDB_API_CALLS = registry.counter(
+    "moviemind_tmdb_api_calls_total", "Requests sent to the TMDB API", ("status",)
+)
+POSTER_PREFETCH = registry.counter(
+    "moviemind_poster_prefetch_total", "Speculative poster lookups by outcome", ("outcome",)
+)
+
+
+class RequestTrace:
+    """Per-request stage timings and token counts, published when the request finishes"""
+
+    enabled = True
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.start_time = time.perf_counter()
+        self.stages = {}
+        self.tokens = {}
+        self.tags = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def record_tokens(self, prompt_tokens=0, completion_tokens=0):
+        self.tokens["prompt"] = self.tokens.get("prompt", 0) + prompt_tokens
+        self.tokens["completion"] = self.tokens.get("completion", 0) + completion_tokens
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+    def finish(self):
+        total = time.perf_counter() - self.start_time
+        source = self.tags.get("source", "unknown")
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+        for kind, count in self.tokens.items():
+            LLM_TOKENS.observe(count, kind=kind)
+        REQUEST_SECONDS.observe(total, source=source)
+        RESPONSES.inc(source=source)
+
+        if registry.json_logs:
+            registry.logger.info(json.dumps({
+                "event": "chat_turn",
+                "request_id": self.request_id,
+                "total_ms": round(total * 1000, 2),
+                "stages_ms": {name: round(s * 1000, 2) for name, s in self.stages.items()},
+                "tokens": self.tokens,
+                **self.tags,
+            }))
+        return total
+
+
+class _NullTrace:
+    """Stand-in used while metrics are disabled; every method is a no-op"""
+
+    enabled = False
+    request_id = None
+    stages = {}
+
+    def stage(self, name):
+        return _NULL_CONTEXT
+
+    def record_tokens(self, prompt_tokens=0, completion_tokens=0):
+        pass
+
+    def tag(self, **tags):
+        pass
+
+    def finish(self):
+        return None
+
+
+NULL_TRACE = _NullTrace()
+
+
+def start_request(request_id=None, force=False):
+    """
+    Start timing a chat turn; returns a no-op trace when metrics are disabled,
+    unless `force` asks for stage timings anyway (e.g. for a request profile).
+    """
+    if not registry.enabled and not force:
+        return NULL_TRACE
+    return RequestTrace(request_id)
+
+
+# --- PROMETHEUS ENDPOINT ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics in a background thread and enable metric collection"""
+    registry.enable()
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    print(f"Metrics available at http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def configure_from_env():
+    """
+    Turn metrics on from the environment:
+    MOVIEMIND_METRICS=1 collects metrics, MOVIEMIND_METRICS_LOG=1 also logs one
+    JSON line per chat turn, MOVIEMIND_METRICS_PORT serves them for Prometheus.
+    """
+    json_logs = _env_flag("MOVIEMIND_METRICS_LOG")
+    if _env_flag("MOVIEMIND_METRICS") or json_logs:
+        registry.enable(json_logs=json_logs)
+
+    port = os.environ.get("MOVIEMIND_METRICS_PORT")
+    if port:
+        return start_metrics_server(int(port), os.environ.get("MOVIEMIND_METRICS_HOST", "127.0.0.1"))
+    return None
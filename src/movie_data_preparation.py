@@ -5,28 +5,108 @@ from io import BytesIO
 from zipfile import ZipFile
 
 
-def download_and_prepare_movielens():
+# Rows per chunk when streaming tags.csv / genome-scores.csv (ml-25m has ~15M genome rows)
+TAG_CHUNK_SIZE = 500_000
+TOP_USER_TAGS = 5
+# Running user-tag counts keep this many times TOP_USER_TAGS candidates per movie
+USER_TAG_MARGIN = 10
+TOP_GENOME_TAGS = 8
+
+
+def _top_k_per_movie(df, score_column, top_k):
+    """Keep the top_k highest-scoring rows per movieId (ties broken by tag), vectorized"""
+    df = df.sort_values(['movieId', score_column, 'tag'], ascending=[True, False, True])
+    return df.groupby('movieId', sort=False).head(top_k)
+
+
+def _tags_by_movie(top_df):
+    """movieId -> list of tags, in rank order"""
+    return top_df.groupby('movieId', sort=False)['tag'].agg(list)
+
+
+def aggregate_user_tags(tags_path, top_k=TOP_USER_TAGS, chunksize=TAG_CHUNK_SIZE, margin=USER_TAG_MARGIN):
     """
-    Downloads the MovieLens Small dataset and prepares it for use
+    Most frequent user tags per movie from tags.csv, read in chunks.
+    After each chunk the running (movieId, tag) counts are cut to the
+    top_k * margin most frequent tags per movie, so memory stays bounded by
+    movies * top_k * margin plus one chunk, however many distinct tags users
+    wrote. The result is approximate only for a tag dropped early that would
+    later have climbed into the top_k from outside the margin.
+    Returns a Series movieId -> list of tags.
+    """
+    counts = None
+    for chunk in pd.read_csv(tags_path, usecols=['movieId', 'tag'], chunksize=chunksize):
+        # Normalize so "Dark", " dark" and "dark" count as one tag
+        chunk['tag'] = chunk['tag'].astype(str).str.strip().str.lower()
+        chunk = chunk[chunk['tag'] != '']
+        chunk_counts = chunk.groupby(['movieId', 'tag']).size().rename('count').reset_index()
+        if counts is not None:
+            chunk_counts = pd.concat([counts, chunk_counts]).groupby(['movieId', 'tag'], as_index=False)['count'].sum()
+        counts = _top_k_per_movie(chunk_counts, 'count', top_k * margin)
+
+    if counts is None or counts.empty:
+        return pd.Series(dtype=object)
+    return _tags_by_movie(_top_k_per_movie(counts, 'count', top_k))
+
+
+def aggregate_genome_tags(scores_path, genome_tags_path, top_k=TOP_GENOME_TAGS, chunksize=TAG_CHUNK_SIZE):
+    """
+    Most relevant genome tags per movie from genome-scores.csv, read in chunks.
+    Each chunk is cut to its own top_k per movie and merged with the running
+    top_k, so memory stays bounded by movies * top_k however large the file is.
+    Returns a Series movieId -> list of tags.
+    """
+    tag_names = pd.read_csv(genome_tags_path).set_index('tagId')['tag']
+    best = None
+    for chunk in pd.read_csv(scores_path, chunksize=chunksize,
+                             dtype={'movieId': 'int32', 'tagId': 'int32', 'relevance': 'float32'}):
+        chunk = chunk.assign(tag=chunk['tagId'].map(tag_names)).dropna(subset=['tag'])
+        candidates = chunk if best is None else pd.concat([best, chunk], ignore_index=True)
+        best = _top_k_per_movie(candidates, 'relevance', top_k)
+
+    if best is None or best.empty:
+        return pd.Series(dtype=object)
+    return _tags_by_movie(best)
+
+
+def _attach_tags(movies_df, column, tags_by_movie):
+    """Add a list-valued column, [] for movies without tags"""
+    tags = movies_df['movieId'].map(tags_by_movie)
+    movies_df[column] = [value if isinstance(value, list) else [] for value in tags]
+    return movies_df
+
+
+def download_and_prepare_movielens(archive_path=None, data_dir='data', dataset='ml-latest-small'):
+    """
+    Downloads the MovieLens Small dataset and prepares it for use.
+    Pass archive_path to use an already downloaded zip instead (offline runs, benchmarks),
+    or dataset to use a larger release (e.g. 'ml-25m', which also ships the tag genome).
     """
-    print("Downloading MovieLens dataset...")
-    
     # Create data directory if it doesn't exist
-    if not os.path.exists('data'):
-        os.makedirs('data')
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
     
-    # Download the dataset
-    url = 'https://files.grouplens.org/datasets/movielens/ml-latest-small.zip'
-    response = requests.get(url, timeout=60)
-    response.raise_for_status()
+    if archive_path:
+        print(f"Using local MovieLens archive {archive_path}...")
+        zip_source = archive_path
+    else:
+        print("Downloading MovieLens dataset...")
+
+        # Download the dataset
+        url = f'https://files.grouplens.org/datasets/movielens/{dataset}.zip'
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        zip_source = BytesIO(response.content)
 
     # Extract the dataset
-    with ZipFile(BytesIO(response.content)) as zip_file:
-        zip_file.extractall('data')
+    with ZipFile(zip_source) as zip_file:
+        zip_file.extractall(data_dir)
+        members = set(zip_file.namelist())
 
     # Load the movies and ratings data
-    movies_df = pd.read_csv('data/ml-latest-small/movies.csv')
-    ratings_df = pd.read_csv('data/ml-latest-small/ratings.csv')
+    dataset_dir = os.path.join(data_dir, dataset)
+    movies_df = pd.read_csv(os.path.join(dataset_dir, 'movies.csv'))
+    ratings_df = pd.read_csv(os.path.join(dataset_dir, 'ratings.csv'))
     
     # Process the data
     # Extract year from title and create a clean title column
@@ -51,9 +131,25 @@ def download_and_prepare_movielens():
     # Fill NaN values
     movies_df['avg_rating'] = movies_df['avg_rating'].fillna(0)
     movies_df['rating_count'] = movies_df['rating_count'].fillna(0)
+
+    # Fold in user tags and, for releases that ship it, the tag genome
+    user_tags = pd.Series(dtype=object)
+    if f'{dataset}/tags.csv' in members:
+        print("Aggregating user tags...")
+        user_tags = aggregate_user_tags(os.path.join(dataset_dir, 'tags.csv'))
+    movies_df = _attach_tags(movies_df, 'tags', user_tags)
+
+    genome_tags = pd.Series(dtype=object)
+    if {f'{dataset}/genome-scores.csv', f'{dataset}/genome-tags.csv'} <= members:
+        print("Aggregating genome tags...")
+        genome_tags = aggregate_genome_tags(
+            os.path.join(dataset_dir, 'genome-scores.csv'),
+            os.path.join(dataset_dir, 'genome-tags.csv'),
+        )
+    movies_df = _attach_tags(movies_df, 'genome_tags', genome_tags)
     
     # Save the processed data
-    movies_df.to_csv('data/processed_movies.csv', index=False)
+    movies_df.to_csv(os.path.join(data_dir, 'processed_movies.csv'), index=False)
     
     print(f"Data prepared successfully! Total movies: {len(movies_df)}")
     return movies_df
@@ -0,0 +1,203 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import requests
+from PIL import Image
+
+
+POSTER_ROUTE = "/posters"
+DEFAULT_SOURCE_URL = "https://image.tmdb.org/t/p/w500"
+DEFAULT_CACHE_DIR = "data/posters"
+DEFAULT_MAX_MB = 200
+# Cards are shown at most 200px wide and 300px high
+THUMBNAIL_SIZE = (200, 300)
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+POSTER_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+\.(jpg|jpeg|png|webp)$")
+
+
+class PosterCache:
+    """
+    Local cache of resized TMDB posters.
+
+    Posters are addressed by their TMDB file name (e.g. kqjL17yufvn9OVLyXYpvtyrFfak.jpg),
+    which never changes for a given image, so the app can serve them with a
+    year-long Cache-Control header. Each poster is downloaded from `source_url`
+    once, shrunk to THUMBNAIL_SIZE and stored as JPEG; the least recently served
+    files are deleted once the directory grows past `max_bytes`.
+
+    Several worker processes may share one cache directory. Each keeps its own
+    LRU order and byte count, so after every download the directory is re-read
+    before evicting, which counts the files the other processes wrote too.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024,
+                 source_url=DEFAULT_SOURCE_URL, thumbnail_size=THUMBNAIL_SIZE, timeout=5):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.source_url = source_url.rstrip("/")
+        self.thumbnail_size = thumbnail_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        self.total_bytes = 0
+
+        # Rebuild the LRU order from the files already on disk, oldest access first
+        os.makedirs(cache_dir, exist_ok=True)
+        self._entries = OrderedDict(self._scan())
+        self.total_bytes = sum(self._entries.values())
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured by MOVIEMIND_POSTER_CACHE_DIR / _CACHE_MB / _SOURCE_URL"""
+        return cls(
+            cache_dir=os.environ.get("MOVIEMIND_POSTER_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(float(os.environ.get("MOVIEMIND_POSTER_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+            source_url=os.environ.get("MOVIEMIND_POSTER_SOURCE_URL", DEFAULT_SOURCE_URL),
+        )
+
+    def local_url(self, poster_url):
+        """App URL for a TMDB poster URL; other URLs are returned unchanged"""
+        if not poster_url:
+            return poster_url
+        name = poster_url.rsplit("/", 1)[-1]
+        if not poster_url.startswith(self.source_url + "/") or not POSTER_NAME_PATTERN.match(name):
+            return poster_url
+        return f"{POSTER_ROUTE}/{name}"
+
+    def get(self, name):
+        """
+        Path of the cached thumbnail for a poster file name, fetching it on first use.
+        Raises ValueError for names that are not TMDB poster files and returns
+        None when the image cannot be downloaded.
+        """
+        if not POSTER_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid poster name: {name!r}")
+        # Entries are keyed by the thumbnail's file name, which is always .jpg
+        key = os.path.splitext(name)[0] + ".jpg"
+        path = os.path.join(self.cache_dir, key)
+
+        with self._lock:
+            if key in self._entries and os.path.exists(path):
+                self._entries.move_to_end(key)
+                return path
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+
+        # One download per poster, however many requests ask for it at once
+        with fetch_lock:
+            with self._lock:
+                if key in self._entries and os.path.exists(path):
+                    self._entries.move_to_end(key)
+                    return path
+            size = None
+            try:
+                size = self._fetch(name, path)
+            finally:
+                with self._lock:
+                    self._fetch_locks.pop(key, None)
+                    if size is not None:
+                        self.total_bytes += size - self._entries.pop(key, 0)
+                        self._entries[key] = size
+                        self._evict()
+        return path if size is not None else None
+
+    def read(self, name):
+        """
+        Bytes of the cached thumbnail for a poster file name, like get(). A file
+        evicted by another request between get() and the read is fetched again.
+        """
+        for _ in range(2):
+            path = self.get(name)
+            if path is None:
+                return None
+            try:
+                with open(path, 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _scan(self):
+        """(name, size) of the thumbnails on disk, least recently accessed first"""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and POSTER_NAME_PATTERN.match(entry.name):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_atime, entry.name, stat.st_size))
+        return [(name, size) for _, name, size in sorted(files)]
+
+    def _resync(self):
+        """
+        Bring the entries in line with the directory, which other processes also
+        write to and evict from (lock held). Their files go first in the LRU order,
+        since this process has never served them.
+        """
+        on_disk = OrderedDict(self._scan())
+        entries = OrderedDict((name, size) for name, size in on_disk.items() if name not in self._entries)
+        for name in self._entries:
+            if name in on_disk:
+                entries[name] = on_disk[name]
+        self._entries = entries
+        self.total_bytes = sum(entries.values())
+
+    def _fetch(self, name, path):
+        """Download, shrink and store one poster; returns its size on disk or None"""
+        try:
+            response = requests.get(f"{self.source_url}/{name}", timeout=self.timeout)
+            response.raise_for_status()
+            image = Image.open(BytesIO(response.content)).convert("RGB")
+        except Exception as e:
+            print(f"Error fetching poster {name}: {e}")
+            return None
+
+        image.thumbnail(self.thumbnail_size)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            image.save(tmp_path, "JPEG", quality=85, optimize=True)
+            os.replace(tmp_path, path)
+            return os.path.getsize(path)
+        except OSError as e:
+            print(f"Error storing poster {name}: {e}")
+            return None
+        finally:
+            # Only left behind when saving failed
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict(self):
+        """Drop least recently served posters until the cache fits its budget (lock held)"""
+        # One directory scan per downloaded poster, which costs far less than the download
+        self._resync()
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def add_poster_route(app, cache):
+    """Serve cached posters from a FastAPI app at /posters/{name}"""
+    from fastapi import HTTPException
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import Response
+
+    @app.get(POSTER_ROUTE + "/{name}")
+    async def poster(name: str):
+        # Thumbnails are small; reading them up front means eviction cannot pull
+        # the file away while the response is being streamed
+        try:
+            content = await run_in_threadpool(cache.read, name)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Unknown poster")
+        if content is None:
+            raise HTTPException(status_code=502, detail="Poster unavailable")
+        return Response(content, media_type="image/jpeg", headers={"Cache-Control": CACHE_CONTROL})
+
+    return poster
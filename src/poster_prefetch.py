@@ -0,0 +1,80 @@
+import re
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from metrics import POSTER_PREFETCH
+
+
+def normalize_title(title):
+    """Lowercase a title and drop punctuation, a trailing "(1995)" and extra spaces"""
+    title = re.sub(r"\s*\(\d{4}\)\s*$", "", str(title or ""))
+    title = re.sub(r"[^\w\s]", " ", title.lower())
+    return " ".join(title.split())
+
+
+def _normalize_year(year):
+    year = str(year or "").strip()
+    return year[:4] if year[:4].isdigit() else None
+
+
+class PosterPrefetch:
+    """
+    Poster lookups started for the retrieved candidates as soon as retrieval
+    returns, so they run while the LLM is still writing its answer. The movies
+    the answer mentions are matched back by normalized title (and year when
+    both sides have one); anything else is looked up as before.
+
+    Counted in moviemind_poster_prefetch_total by outcome: hit (answer used a
+    prefetched poster), miss (answer mentioned a movie that was not prefetched),
+    wasted (prefetched but never used) and cancelled (unused and never started).
+    """
+
+    def __init__(self, executor, lookup, movies):
+        self._executor = executor
+        self._lookup = lookup
+        self._futures = {}
+        for title, year in movies:
+            key = normalize_title(title)
+            if key and key not in self._futures:
+                self._futures[key] = (_normalize_year(year), executor.submit(lookup, title, year))
+        self._used = set()
+
+    def __len__(self):
+        return len(self._futures)
+
+    def take(self, title, year=None):
+        """The prefetched lookup for a movie in the answer, or None on a miss"""
+        key = normalize_title(title)
+        entry = self._futures.get(key)
+        year = _normalize_year(year)
+        if entry is None or (year and entry[0] and year != entry[0]):
+            POSTER_PREFETCH.inc(outcome="miss")
+            return None
+        POSTER_PREFETCH.inc(outcome="hit")
+        self._used.add(key)
+        return entry[1]
+
+    def result(self, title, year=None, timeout=None):
+        """
+        Poster URL for a movie in the answer: the prefetched result when there is
+        one, otherwise a lookup started now. Either way it waits at most `timeout`
+        seconds, so a miss cannot run past the poster budget.
+        """
+        future = self.take(title, year)
+        if future is None:
+            future = self._executor.submit(self._lookup, title, year)
+        try:
+            return future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            future.cancel()
+            return None
+        except Exception as e:
+            print(f"Error getting poster URL: {e}")
+            return None
+
+    def finish(self):
+        """Cancel the prefetches nobody used and count them"""
+        for key, (_, future) in self._futures.items():
+            if key in self._used:
+                continue
+            POSTER_PREFETCH.inc(outcome="cancelled" if future.cancel() else "wasted")
+        self._used = set(self._futures)
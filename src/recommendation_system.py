@@ -3,59 +3,206 @@ from chromadb.utils import embedding_functions
 import json
 import os
 import re
+import threading
+import time
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
-from langchain.memory import ConversationBufferMemory
+from langchain_core.callbacks import BaseCallbackHandler
 from tmdb_api_helper import TMDBHelper
+from resilience import LatencyBudget, CircuitBreaker, BoundedExecutor, call_with_timeout, DEFAULT_STAGE_SHARES
+from metrics import start_request, NULL_TRACE
+from request_profiler import should_profile, profile_request
+from poster_prefetch import PosterPrefetch
+from diversity import diversity_config_from_env, mmr_select
+from catalog_index import CatalogIndex, read_active_version, write_active_version
+from conversation_memory import ConversationMemory
+from favorites import FavoritesStore
+
+
+# Movies handed to the LLM per turn
+N_RESULTS = 5
+
+FALLBACK_APOLOGY = "I'm having trouble generating a recommendation right now. Could you try again or ask in a different way?"
+
+
+class PosterStream:
+    """
+    The (index, poster_url) iterator returned by get_response_progressive. The
+    request stays open, timing its "posters" stage, until every poster has been
+    yielded or the stream is closed (or dropped); then `request`, an ExitStack
+    holding the request's profile and trace, is closed.
+    """
+
+    def __init__(self, posters, trace, request, profiler=None):
+        self._posters = posters
+        self._profiler = profiler
+        self._open = request
+        self._open.enter_context(trace.stage("posters"))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._profiler is not None:
+            self._profiler.follow(threading.get_ident())
+        try:
+            return next(self._posters)
+        except BaseException:
+            # Exhausted (StopIteration) or failed: either way the request is over
+            self.close()
+            raise
 
+    def close(self):
+        self._posters.close()
+        self._open.close()
 
-class MovieRecommender:
-    def __init__(self):
-        # Initialize ChromaDB client
-        self.chroma_client = chromadb.PersistentClient(path="data/embeddings")
+    def __del__(self):
+        self.close()
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Adds the token counts reported by the OpenAI client to a request trace"""
 
-        embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name='all-MiniLM-L6-v2'
+    def __init__(self, trace):
+        self.trace = trace
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.trace.record_tokens(
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
         )
-        try:
-            self.collection = self.chroma_client.get_collection(
-                name="movie_collection",
-                embedding_function=embedding_function,
+
+
+class MovieRecommender:
+    def __init__(self, request_timeout=30.0, llm_failure_threshold=3, llm_reset_timeout=60.0,
+                 collection=None, embedding_function=None, llm=None, tmdb_helper=None, llm_workers=8):
+        """
+        The collection, embedding function, LLM and TMDB helper are built from the
+        defaults below unless passed in (offline benchmarks and load tests use stubs).
+        llm_workers bounds the LLM calls in flight at once.
+        """
+        if embedding_function is None:
+            embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+                model_name='all-MiniLM-L6-v2'
             )
-        except Exception:
-            self._initialize_database()
-            self.collection = self.chroma_client.get_collection(
-                name="movie_collection",
-                embedding_function=embedding_function,
+        self.embedding_function = embedding_function
+
+        if collection is not None:
+            self.chroma_client = None
+            self.catalog_index = CatalogIndex(None, embedding_function, collection)
+        else:
+            # Initialize ChromaDB client and open the live catalog version
+            self.chroma_client = chromadb.PersistentClient(path="data/embeddings")
+            version = read_active_version("data/embeddings")
+            try:
+                collection = self.chroma_client.get_collection(
+                    name=version,
+                    embedding_function=embedding_function,
+                )
+            except Exception:
+                version = self._initialize_database()
+                write_active_version("data/embeddings", version)
+                collection = self.chroma_client.get_collection(
+                    name=version,
+                    embedding_function=embedding_function,
+                )
+            shards = int(os.environ.get("MOVIEMIND_SHARDS", "0"))
+            compact_dtype = os.environ.get("MOVIEMIND_COMPACT_VECTORS")
+            if shards > 1:
+                # Fan retrieval out over shard worker processes; the shards are built from
+                # the live version, so a catalog swap takes effect on the next restart
+                from sharded_index import ShardedIndex
+                collection = ShardedIndex.from_collection(collection, "data/shards", shards, embedding_function)
+                self.catalog_index = CatalogIndex(None, embedding_function, collection, version)
+            elif compact_dtype:
+                # Search int8/float16 copies in memory and re-score from the float32 file on disk
+                from compact_vectors import CompactVectorStore
+                collection = CompactVectorStore.from_collection(
+                    collection, "data/compact", compact_dtype, embedding_function=embedding_function
+                )
+                self.catalog_index = CatalogIndex(None, embedding_function, collection, version)
+            else:
+                self.catalog_index = CatalogIndex(self.chroma_client, embedding_function, collection, version)
+                self.catalog_index.start_polling()
+
+        # Each user's recent turns, capped per user and in the number of users kept
+        self.memory = ConversationMemory()
+        # Latency budget per chat turn; the LLM client never waits longer than its share
+        self.request_timeout = request_timeout
+        if llm is None:
+            llm_timeout = request_timeout * DEFAULT_STAGE_SHARES["llm"]
+            llm = ChatOpenAI(
+                model="gpt-3.5-turbo",
+                temperature=0.7,
+                max_tokens=1024,
+                timeout=llm_timeout,
+                # Retries would keep a timed-out call's worker busy long after the
+                # turn fell back; the circuit breaker decides when to try again
+                max_retries=0,
             )
+        self.llm = llm
 
-        # Initialize the language model and memory
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            input_key="human_input"
+        # Stop calling the LLM for a while after repeated failures or timeouts
+        self.llm_breaker = CircuitBreaker(
+            failure_threshold=llm_failure_threshold,
+            reset_timeout=llm_reset_timeout,
         )
-        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7, max_tokens=1024)
-
+        # LLM calls never queue: a timed-out call keeps its worker until the client
+        # gives up, and a turn that finds every worker busy falls back right away
+        self.llm_workers = llm_workers
+        self._llm_executor = BoundedExecutor(max_workers=llm_workers, thread_name_prefix="llm")
+        # Poster lookups for the progressive UI run concurrently (TMDBHelper still rate-limits)
+        self._poster_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="posters")
+        # Start poster lookups for the retrieved movies while the LLM answers (MOVIEMIND_POSTER_PREFETCH=0 turns it off)
+        self.poster_prefetch = os.environ.get("MOVIEMIND_POSTER_PREFETCH", "1") != "0"
+        # Over-fetch this many candidates and pick the final N_RESULTS by MMR (see diversity.py)
+        self.diversity_pool, self.diversity_lambda = diversity_config_from_env()
 
         # User preferences storage
         self.user_preferences_file = "data/user_preferences.json"
-        self.user_preferences = self._load_user_preferences()
+        # Favorites are read from the file on every turn, so the ones saved through
+        # the UI or the API (possibly another worker process) count right away
+        self.favorites = FavoritesStore(self.user_preferences_file)
         
         # Initialize TMDB helper
-        self.tmdb_helper = TMDBHelper()
+        self.tmdb_helper = tmdb_helper if tmdb_helper is not None else TMDBHelper()
 
         # Setup prompt templates
         self._setup_prompts()
 
+    @property
+    def collection(self):
+        """The live version of the movie collection"""
+        return self.catalog_index.current().collection
+
+    @collection.setter
+    def collection(self, collection):
+        self.catalog_index = CatalogIndex(None, self.embedding_function, collection)
+
     def _initialize_database(self):
-        """Download MovieLens data and build the ChromaDB collection on first run."""
-        print("First run: downloading data and building movie database (this takes a few minutes)...")
+        """
+        Build the ChromaDB collection on first run and return its name.
+        If MOVIEMIND_INDEX_SNAPSHOT points to a snapshot artifact it is imported
+        (seconds, no re-embedding; the query embedding model must still be cached,
+        see index_snapshot.import_snapshot); otherwise MovieLens is downloaded and embedded.
+        """
         import os
         sys_path_entry = os.path.dirname(__file__)
         import sys
         if sys_path_entry not in sys.path:
             sys.path.insert(0, sys_path_entry)
+
+        snapshot_path = os.environ.get("MOVIEMIND_INDEX_SNAPSHOT")
+        if snapshot_path:
+            from index_snapshot import import_snapshot
+            print(f"First run: importing prebuilt index snapshot {snapshot_path}...")
+            return import_snapshot(snapshot_path).name
+
+        print("First run: downloading data and building movie database (this takes a few minutes)...")
         from movie_data_preparation import download_and_prepare_movielens
         from vector_database_setup import prepare_movie_descriptions, create_vector_database
         import ast
@@ -67,6 +214,7 @@ class MovieRecommender:
         movies_df = prepare_movie_descriptions(movies_df)
         create_vector_database(movies_df)
         print("Movie database ready.")
+        return "movie_collection"
 
     def _setup_prompts(self):
         self.recommendation_template = """
@@ -110,7 +258,6 @@ class MovieRecommender:
                 input_variables=["chat_history", "human_input", "movie_results", "user_preferences"],
                 template=self.recommendation_template
             ),
-            memory=self.memory,
             verbose=False
         )
 
@@ -135,25 +282,18 @@ class MovieRecommender:
                 input_variables=["chat_history", "human_input"],
                 template=self.general_template
             ),
-            memory=self.memory,
             verbose=False
         )
 
-    def _load_user_preferences(self):
-        """Load user preferences from file"""
-        if os.path.exists(self.user_preferences_file):
-            with open(self.user_preferences_file, 'r') as f:
-                return json.load(f)
-        else:
-            os.makedirs('data', exist_ok=True)
-            with open(self.user_preferences_file, 'w') as f:
-                json.dump({}, f)
-            return {}
-
-    def _save_user_preferences(self):
-        """Save user preferences to file"""
-        with open(self.user_preferences_file, 'w') as f:
-            json.dump(self.user_preferences, f, indent=2)
+        # Same recommendation prompt without conversation memory, for one-shot batch requests
+        self.stateless_chain = LLMChain(
+            llm=self.llm,
+            prompt=PromptTemplate(
+                input_variables=["chat_history", "human_input", "movie_results", "user_preferences"],
+                template=self.recommendation_template
+            ),
+            verbose=False
+        )
 
     """"
     def update_preferences(self, user_id, movie_id, liked=True):
@@ -166,18 +306,174 @@ class MovieRecommender:
         self._save_user_preferences()
         """
 
-    def get_response(self, user_id, message):
-        """Generate a recommendation or general response based on user input"""
+    def get_response(self, user_id, message, profile=False, request_id=None):
+        """
+        Generate a recommendation or general response based on user input.
+        With profile=True (or when picked by MOVIEMIND_PROFILE_SAMPLE_RATE) the
+        turn is profiled and written to data/profiles, see request_profiler.
+        """
+        budget = LatencyBudget(self.request_timeout)
+        profile = should_profile(profile)
+        trace = start_request(request_id, force=profile)
+
+        try:
+            with profile_request(trace, profile):
+                response, prefetch = self._text_response(user_id, message, budget, trace)
+
+                # Step 5: Process the response to add poster data
+                try:
+                    with trace.stage("posters"):
+                        processed_response = self.process_response_with_posters(
+                            response, deadline=budget.deadline, prefetch=prefetch
+                        )
+                finally:
+                    if prefetch is not None:
+                        prefetch.finish()
+        except Exception:
+            trace.tag(source="error")
+            raise
+        finally:
+            # Failed turns are counted too
+            trace.finish()
+        return processed_response
+
+    def get_response_progressive(self, user_id, message, profile=False, request_id=None):
+        """
+        Two-phase variant of get_response for the UI. Returns (text, movies, posters)
+        as soon as the text is ready: `movies` are the (title, year) pairs mentioned
+        in the text and `posters` yields (index, poster_url) as each lookup completes.
+        The turn, and its profile if any, is only recorded once `posters` is
+        exhausted or closed (see PosterStream), so both cover the poster lookups.
+        """
+        budget = LatencyBudget(self.request_timeout)
+        profile = should_profile(profile)
+        trace = start_request(request_id, force=profile)
+
+        # Closed in reverse: the profile is saved (with every stage) before the trace is published
+        request = ExitStack()
+        request.callback(trace.finish)
+        try:
+            profiler = request.enter_context(profile_request(trace, profile))
+            response, prefetch = self._text_response(user_id, message, budget, trace)
+            movies = self.extract_movie_titles(response)
+        except Exception:
+            trace.tag(source="error")
+            request.close()
+            raise
+        if profiler is not None:
+            # cProfile stays with this thread; the stack sampler follows the posters' consumer
+            profiler.stop_cprofile()
+        posters = self.iter_posters(movies, deadline=budget.deadline, prefetch=prefetch)
+        return response, movies, PosterStream(posters, trace, request, profiler)
+
+    def _text_response(self, user_id, message, budget, trace):
+        """
+        Retrieval, prompt and LLM steps of a chat turn. Returns the text without
+        posters and the PosterPrefetch started for the retrieved movies (or None).
+        """
         # Step 1: Search for relevant movies
-        results = self.collection.query(
-            query_texts=[message],
-            n_results=5
-        )
+        with trace.stage("embedding"):
+            query_embeddings = self.embedding_function([message])
 
-        movie_results = results.get("documents", [[]])[0]
+        movie_results = self.retrieve(query_embeddings, N_RESULTS, trace)[0].get("documents", [])
 
-        # Step 2: Prepare movie descriptions
-        movie_descriptions = ""
+        with trace.stage("prompt"):
+            # Step 2: Prepare movie descriptions
+            movie_infos = self.parse_movie_results(movie_results)
+            # The answer will mostly recommend these, so their posters are looked up during the LLM call
+            prefetch = self._prefetch_posters(movie_infos)
+            movie_descriptions = self._format_movie_descriptions(movie_infos)
+
+            # Step 3: Load user preferences
+            user_preferences_string = self._user_preferences_string(user_id)
+
+        # Step 4: Create final response
+        with trace.stage("llm"):
+            response = self._generate_response(
+                user_id, message, movie_descriptions, user_preferences_string, movie_infos, budget, trace
+            )
+        return response, prefetch
+
+    def retrieve(self, query_embeddings, n_results=N_RESULTS, trace=NULL_TRACE):
+        """
+        Search the live catalog version for every query, whichever backend serves it
+        (Chroma collection, ShardedIndex or CompactVectorStore). With diversity on,
+        diversity_pool rows are fetched and n_results of them picked by MMR.
+        Chat turns and batch jobs both retrieve through here. Returns one dict of
+        "ids", "documents" and "distances" lists per query.
+        """
+        diversify = self.diversity_pool > n_results
+        include = ["documents", "distances", "embeddings"] if diversify else ["documents", "distances"]
+        # In-flight requests keep the catalog version they started with during a hot swap
+        with trace.stage("retrieval"), self.catalog_index.acquire() as index:
+            results = index.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=self.diversity_pool if diversify else n_results,
+                include=include
+            )
+
+        retrieved = []
+        for position, documents in enumerate(results.get("documents", [[]])):
+            picked = range(min(n_results, len(documents)))
+            if diversify:
+                embeddings = results.get("embeddings")
+                embeddings = embeddings[position] if embeddings is not None and len(embeddings) > position else None
+                with trace.stage("diversity"):
+                    picked = self._diversify(query_embeddings[position], len(documents), embeddings, n_results)
+            retrieved.append({
+                key: [results[key][position][i] for i in picked]
+                for key in ("ids", "documents", "distances") if results.get(key) is not None
+            })
+        return retrieved
+
+    def _diversify(self, query_embedding, count, embeddings, n_results=N_RESULTS):
+        """Positions of the n_results over-fetched rows picked by maximal marginal relevance"""
+        if embeddings is None or len(embeddings) != count:
+            return range(min(n_results, count))
+        return mmr_select(query_embedding, embeddings, n_results, self.diversity_lambda)
+
+    def _prefetch_posters(self, movie_infos):
+        """Start poster lookups for retrieved movies, or None when prefetching is off"""
+        if not self.poster_prefetch or not movie_infos:
+            return None
+        movies = [(info.get('title'), info.get('year')) for info in movie_infos if info.get('title')]
+        return PosterPrefetch(self._poster_executor, self.tmdb_helper.get_poster_url, movies)
+
+    def recommend_stateless(self, user_id, message, movie_infos):
+        """
+        One-shot recommendation for already retrieved movies that neither reads nor
+        writes the conversation memory (batch jobs). Uses the same latency budget and
+        circuit breaker as get_response. Returns (text, source).
+        """
+        if not self.llm_breaker.allow_request():
+            return self._build_fallback_response(movie_infos), "fallback"
+
+        budget = LatencyBudget(self.request_timeout)
+        try:
+            response = self._invoke_chain(self.stateless_chain, {
+                "chat_history": "",
+                "human_input": message,
+                "movie_results": self._format_movie_descriptions(movie_infos),
+                "user_preferences": self._user_preferences_string(user_id)
+            }, budget, NULL_TRACE)
+            self.llm_breaker.record_success()
+            return response, "recommendation"
+        except Exception as e:
+            print(f"Error generating recommendation: {e}")
+            self.llm_breaker.record_failure()
+            return self._build_fallback_response(movie_infos), "fallback"
+
+    def _user_preferences_string(self, user_id):
+        """Describe the user's saved favorites for the prompt"""
+        favorites = self.favorites.list(user_id)
+
+        if favorites:
+            return f"Favorite movies: {', '.join(favorites)}."
+        return "No preferences recorded yet."
+
+    def parse_movie_results(self, movie_results):
+        """Turn the documents returned by the collection into movie dicts"""
+        movie_infos = []
         for movie in movie_results:
             if isinstance(movie, str) and movie.strip():
                 try:
@@ -188,64 +484,181 @@ class MovieRecommender:
                 movie_info = movie
 
             if movie_info:
-                movie_descriptions += f"\nTitle: {movie_info.get('title', 'Unknown')}\n"
-                movie_descriptions += f"Year: {movie_info.get('year', 'Unknown')}\n"
-                movie_descriptions += f"Genre: {movie_info.get('genre', 'Unknown')}\n"
-                movie_descriptions += f"Director: {movie_info.get('director', 'Unknown')}\n"
-                actors = movie_info.get('actors', [])
-                if isinstance(actors, list):
-                    movie_descriptions += f"Actors: {', '.join(actors)}\n"
-                else:
-                    movie_descriptions += f"Actors: {actors}\n"
-                movie_descriptions += f"Plot: {movie_info.get('plot', 'No plot available')}\n\n"
+                movie_infos.append(movie_info)
+        return movie_infos
 
-        # Step 3: Load user preferences
-        user_prefs = self.user_preferences.get(user_id, {})
-        favorites = user_prefs.get("favorites", [])
-        
-        if favorites:
-            user_preferences_string = (
-                f"Favorite movies: {', '.join(favorites)}."
-            )
-        else:
-            user_preferences_string = "No preferences recorded yet."
+    def _format_movie_descriptions(self, movie_infos):
+        """Format the retrieved movies for the recommendation prompt"""
+        movie_descriptions = ""
+        for movie_info in movie_infos:
+            movie_descriptions += f"\nTitle: {movie_info.get('title', 'Unknown')}\n"
+            movie_descriptions += f"Year: {movie_info.get('year', 'Unknown')}\n"
+            movie_descriptions += f"Genre: {movie_info.get('genre', 'Unknown')}\n"
+            movie_descriptions += f"Director: {movie_info.get('director', 'Unknown')}\n"
+            actors = movie_info.get('actors', [])
+            if isinstance(actors, list):
+                movie_descriptions += f"Actors: {', '.join(actors)}\n"
+            else:
+                movie_descriptions += f"Actors: {actors}\n"
+            movie_descriptions += f"Plot: {movie_info.get('plot', 'No plot available')}\n\n"
+        return movie_descriptions
+
+    def _generate_response(self, user_id, message, movie_descriptions, user_preferences_string, movie_infos,
+                           budget, trace):
+        """
+        Ask the LLM for recommendations within the request's latency budget.
+        Falls back to the general chain if time allows, and to a templated
+        answer built from the retrieved movies while the LLM is unavailable.
+        Only answers that arrive in time are saved to the conversation memory.
+        """
+        # Every LLM worker is still busy (e.g. with calls that already timed out)
+        if self._llm_executor.saturated() or not self.llm_breaker.allow_request():
+            trace.tag(source="fallback")
+            return self._build_fallback_response(movie_infos)
 
-        # Step 4: Create final response
         try:
-            
-            response = self.recommendation_chain.invoke({
-                "chat_history": self.memory.buffer,
+            response = self._invoke_chain(self.recommendation_chain, {
+                "chat_history": self.memory.buffer(user_id),
                 "human_input": message,
                 "movie_results": movie_descriptions,
                 "user_preferences": user_preferences_string
-            })
-            
-            # Extract the text response
-            if isinstance(response, dict) and "text" in response:
-                response = response["text"]
-            
+            }, budget, trace)
+            self.llm_breaker.record_success()
+            self.memory.save(user_id, message, response)
+            trace.tag(source="recommendation")
+            return response
         except Exception as e:
             print(f"Error generating recommendation: {e}")
-            # Fallback to general response
+            self.llm_breaker.record_failure()
+
+        # Fallback to general response, but only if the LLM is still worth a try
+        if budget.stage_timeout("llm") > 0 and self.llm_breaker.allow_request():
             try:
-                response = self.general_chain.invoke({
-                    "chat_history": self.memory.buffer,
+                response = self._invoke_chain(self.general_chain, {
+                    "chat_history": self.memory.buffer(user_id),
                     "human_input": message
-                })
-                
-                if isinstance(response, dict) and "text" in response:
-                    response = response["text"]
-                    
+                }, budget, trace)
+                self.llm_breaker.record_success()
+                self.memory.save(user_id, message, response)
+                trace.tag(source="general")
+                return response
             except Exception as e2:
                 print(f"Error generating general response: {e2}")
-                response = "I'm having trouble generating a recommendation right now. Could you try again or ask in a different way?"
-
-        # Step 5: Process the response to add poster data
-        processed_response = self.process_response_with_posters(response)
-        return processed_response
+                self.llm_breaker.record_failure()
+
+        trace.tag(source="fallback")
+        return self._build_fallback_response(movie_infos)
+
+    def _invoke_chain(self, chain, inputs, budget, trace):
+        """Invoke a chain, giving up once the LLM share of the budget is spent"""
+        timeout = budget.stage_timeout("llm")
+        if timeout <= 0:
+            raise TimeoutError("no time left in the request budget for the LLM")
+
+        # Token counts are only collected while metrics are enabled
+        config = {"callbacks": [TokenUsageCallback(trace)]} if trace.enabled else None
+        response = call_with_timeout(self._llm_executor, chain.invoke, timeout, inputs, config=config)
+
+        # Extract the text response
+        if isinstance(response, dict) and "text" in response:
+            response = response["text"]
+        return response
+
+    def _build_fallback_response(self, movie_infos):
+        """Templated answer built from the retrieved movies, used while the LLM is unavailable"""
+        if not movie_infos:
+            return FALLBACK_APOLOGY
+
+        paragraphs = [
+            "I can't put together a personal write-up right now, "
+            "but these are the closest matches I found in our catalogue:"
+        ]
+        for movie_info in movie_infos:
+            paragraphs.append(
+                f"Title: {movie_info.get('title', 'Unknown')}\n"
+                f"Year: {movie_info.get('year', 'Unknown')}\n"
+                f"Genre: {movie_info.get('genre', 'Unknown')}\n"
+                f"Plot: {movie_info.get('plot', 'No plot available')}"
+            )
+        return "\n\n".join(paragraphs)
         
-    def process_response_with_posters(self, response):
-        """Process the response to add movie poster data"""
+    def _movie_title_and_year(self, paragraph):
+        """(title, year) of the movie a response paragraph describes, or None"""
+        # Check if this paragraph contains movie information
+        if "Title:" not in paragraph and not re.search(r'\b\(\d{4}\)\b', paragraph):
+            return None
+
+        # Extract movie title
+        title_match = re.search(r"Title:\s*(.*?)(?:\n|$)", paragraph)
+        if not title_match:
+            # Try to find title in format "Movie Title (Year)"
+            title_match = re.search(r"(.*?)\s*\(\d{4}\)", paragraph)
+        if not title_match:
+            return None
+        movie_title = title_match.group(1).strip()
+
+        # Extract year if available
+        year_match = re.search(r"Year:\s*(\d{4})", paragraph)
+        year = year_match.group(1) if year_match else None
+
+        if not year:
+            # Try to find year in format "Movie Title (Year)"
+            year_match = re.search(r"\((\d{4})\)", paragraph)
+            year = year_match.group(1) if year_match else None
+        return movie_title, year
+
+    def extract_movie_titles(self, response):
+        """(title, year) of every movie described in a response, in order"""
+        movies = []
+        for paragraph in response.split("\n\n"):
+            if paragraph.strip():
+                movie = self._movie_title_and_year(paragraph)
+                if movie:
+                    movies.append(movie)
+        return movies
+
+    def iter_posters(self, movies, deadline=None, prefetch=None):
+        """
+        Look up the posters of (title, year) pairs concurrently and yield
+        (index, poster_url) in completion order. Lookups still running at the
+        monotonic `deadline` are abandoned and yielded with poster_url None.
+        Movies found in `prefetch` reuse the lookup already in flight.
+        """
+        futures = {}
+        for index, (title, year) in enumerate(movies):
+            future = prefetch.take(title, year) if prefetch is not None else None
+            if future is None or future in futures:
+                future = self._poster_executor.submit(self.tmdb_helper.get_poster_url, title, year)
+            futures[future] = index
+        try:
+            yield from self._completed_posters(futures, deadline)
+        finally:
+            if prefetch is not None:
+                prefetch.finish()
+
+    def _completed_posters(self, futures, deadline):
+        pending = set(futures)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                pending.discard(future)
+                try:
+                    poster_url = future.result()
+                except Exception as e:
+                    print(f"Error getting poster URL: {e}")
+                    poster_url = None
+                yield futures[future], poster_url
+        except FuturesTimeoutError:
+            for future in sorted(pending, key=futures.get):
+                future.cancel()
+                yield futures[future], None
+
+    def process_response_with_posters(self, response, deadline=None, prefetch=None):
+        """
+        Process the response to add movie poster data.
+        Poster lookups stop once the monotonic `deadline` has passed; movies
+        found in `prefetch` use the lookup started during the LLM call.
+        """
         # Split the response into paragraphs
         paragraphs = response.split("\n\n")
         result = ""
@@ -255,38 +668,26 @@ class MovieRecommender:
             # Skip empty paragraphs
             if not paragraph.strip():
                 continue
-                
-            # Check if this paragraph contains movie information
-            if "Title:" in paragraph or re.search(r'\b\(\d{4}\)\b', paragraph):
-                # Extract movie title
-                title_match = re.search(r"Title:\s*(.*?)(?:\n|$)", paragraph)
-                if not title_match:
-                    # Try to find title in format "Movie Title (Year)"
-                    title_match = re.search(r"(.*?)\s*\(\d{4}\)", paragraph)
-                
-                if title_match:
-                    movie_title = title_match.group(1).strip()
-                    
-                    # Extract year if available
-                    year_match = re.search(r"Year:\s*(\d{4})", paragraph)
-                    year = year_match.group(1) if year_match else None
-                    
-                    if not year:
-                        # Try to find year in format "Movie Title (Year)"
-                        year_match = re.search(r"\((\d{4})\)", paragraph)
-                        year = year_match.group(1) if year_match else None
-                    
-                    # Get poster URL
+
+            movie = self._movie_title_and_year(paragraph)
+            if movie:
+                movie_title, year = movie
+
+                # Get poster URL, unless the request has run out of time
+                if deadline is not None and time.monotonic() >= deadline:
+                    poster_url = None
+                elif prefetch is not None:
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    poster_url = prefetch.result(movie_title, year, timeout=timeout)
+                else:
                     poster_url = self.tmdb_helper.get_poster_url(movie_title, year)
-                    
-                    # Add poster URL to the response
-                    if poster_url:
-                        result += paragraph + f"\n[POSTER_URL: {poster_url}]\n\n"
-                    else:
-                        result += paragraph + "\n\n"
+
+                # Add poster URL to the response
+                if poster_url:
+                    result += paragraph + f"\n[POSTER_URL: {poster_url}]\n\n"
                 else:
                     result += paragraph + "\n\n"
             else:
                 result += paragraph + "\n\n"
         
-        return result
\ No newline at end of file
+        return result
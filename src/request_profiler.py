@@ -0,0 +1,198 @@
+import cProfile
+import glob
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+
+DEFAULT_PROFILE_DIR = "data/profiles"
+DEFAULT_KEEP = 50
+SAMPLE_INTERVAL = 0.005
+# Request ids become part of file names, so only these are used as given
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def safe_request_id(request_id):
+    """The request id if it is safe to use in a file name, otherwise a generated one"""
+    if request_id and REQUEST_ID_PATTERN.match(str(request_id)):
+        return str(request_id)
+    return uuid.uuid4().hex[:12]
+
+
+def profile_sample_rate():
+    """Fraction of requests profiled without being asked to (MOVIEMIND_PROFILE_SAMPLE_RATE)"""
+    try:
+        return float(os.environ.get("MOVIEMIND_PROFILE_SAMPLE_RATE", "0"))
+    except ValueError:
+        return 0.0
+
+
+def should_profile(requested=False):
+    """True when the caller asked for a profile or the request is picked by the sample rate"""
+    if requested:
+        return True
+    rate = profile_sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+class StackSampler:
+    """
+    Wall-clock sampler for the threads serving one request: every `interval`
+    seconds it records each thread's current stack, so time spent waiting (on
+    the LLM, on TMDB) shows up as well as CPU time. Output is the collapsed-stack
+    format read by flamegraph.pl and speedscope: "outer;inner;leaf <count>" per line.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def follow(self, thread_id):
+        """Sample another thread as well, e.g. the one consuming a streamed response"""
+        self.thread_ids = self.thread_ids | {thread_id}
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """
+    cProfile plus a stack sampler around one request, written to `profile_dir` as
+    <time>_<request_id>.pstats, .collapsed and a .json sidecar with the request id
+    and stage timings. Only the newest `keep` profiles are kept.
+
+    cProfile only sees the thread that started it; a request that goes on in
+    another thread (streamed posters) calls stop_cprofile() before leaving and
+    follow() from the new thread, so the sampler covers the rest.
+    """
+
+    def __init__(self, profile_dir=None, keep=None):
+        self.profile_dir = profile_dir or os.environ.get("MOVIEMIND_PROFILE_DIR", DEFAULT_PROFILE_DIR)
+        self.keep = keep if keep is not None else int(os.environ.get("MOVIEMIND_PROFILE_KEEP", DEFAULT_KEEP))
+        self.profile = None
+        self.sampler = None
+        self.started_at = None
+        self.duration = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._start_clock = time.perf_counter()
+        self._cprofile_stopped = False
+        self.sampler = StackSampler(threading.get_ident())
+        self.sampler.start()
+        self.profile = cProfile.Profile()
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Another profiler is already running in this process (concurrent request
+            # on Python 3.12+); the sampled stacks still cover this request
+            self.profile = None
+
+    def stop_cprofile(self):
+        """Stop cProfile; must run on the thread that called start()"""
+        if self.profile is not None and not self._cprofile_stopped:
+            self.profile.disable()
+        self._cprofile_stopped = True
+
+    def follow(self, thread_id):
+        self.sampler.follow(thread_id)
+
+    def stop(self):
+        self.stop_cprofile()
+        self.sampler.stop()
+        self.duration = time.perf_counter() - self._start_clock
+
+    def save(self, request_id, stages=None, tags=None):
+        """Write the profile files and return the sidecar's path"""
+        request_id = safe_request_id(request_id)
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stem = os.path.join(
+            self.profile_dir,
+            f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}_{request_id}",
+        )
+        files = {}
+        if self.profile is not None:
+            self.profile.dump_stats(stem + ".pstats")
+            files["pstats"] = os.path.basename(stem + ".pstats")
+        with open(stem + ".collapsed", "w") as f:
+            f.write(self.sampler.collapsed())
+        files["collapsed"] = os.path.basename(stem + ".collapsed")
+
+        with open(stem + ".json", "w") as f:
+            json.dump({
+                "request_id": request_id,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+                "total_ms": round(self.duration * 1000, 2),
+                "stages_ms": {name: round(s * 1000, 2) for name, s in (stages or {}).items()},
+                "tags": tags or {},
+                "samples": sum(self.sampler.stacks.values()),
+                "sample_interval_ms": self.sampler.interval * 1000,
+                "files": files,
+            }, f, indent=2)
+
+        self._rotate()
+        return stem + ".json"
+
+    def _rotate(self):
+        """Delete the oldest profiles beyond `keep`"""
+        sidecars = sorted(glob.glob(os.path.join(self.profile_dir, "*.json")))
+        for sidecar in sidecars[:max(0, len(sidecars) - self.keep)]:
+            stem = sidecar[:-len(".json")]
+            for path in (sidecar, stem + ".pstats", stem + ".collapsed"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+@contextmanager
+def profile_request(trace, enabled=True):
+    """Profile the enclosed block as request `trace.request_id` when `enabled`"""
+    if not enabled:
+        yield None
+        return
+
+    profiler = RequestProfiler()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        try:
+            path = profiler.save(trace.request_id, trace.stages, getattr(trace, "tags", {}))
+            print(f"Request profile written to {path}")
+        except Exception as e:
+            print(f"Could not write request profile: {e}")
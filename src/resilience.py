@@ -0,0 +1,159 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+# Order in which a chat turn spends its latency budget, and the share reserved for each stage
+REQUEST_STAGES = ("retrieval", "llm", "posters")
+DEFAULT_STAGE_SHARES = {
+    # Includes fetching the MMR candidate pool, a few ms at the default size (see diversity.DEFAULT_POOL_SIZE)
+    "retrieval": 0.15,
+    "llm": 0.7,
+    "posters": 0.15,
+}
+
+
+class LatencyBudget:
+    """Deadline for a single request, split across its stages"""
+
+    def __init__(self, total_seconds, stage_shares=None, clock=time.monotonic):
+        self.total_seconds = total_seconds
+        self.stage_shares = stage_shares or DEFAULT_STAGE_SHARES
+        self.clock = clock
+        self.start_time = clock()
+        self.deadline = self.start_time + total_seconds
+
+    def elapsed(self):
+        return self.clock() - self.start_time
+
+    def remaining(self):
+        return max(0.0, self.deadline - self.clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def stage_timeout(self, stage):
+        """
+        Time a stage may use: whatever is left of the budget minus the share
+        reserved for the stages that still have to run after it.
+        Time saved by earlier stages is passed on to later ones.
+        """
+        later_stages = REQUEST_STAGES[REQUEST_STAGES.index(stage) + 1:]
+        reserved = self.total_seconds * sum(self.stage_shares.get(s, 0) for s in later_stages)
+        return max(0.0, self.remaining() - reserved)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a cool-down period.
+
+    The breaker opens after `failure_threshold` consecutive failures. Once
+    `reset_timeout` seconds have passed it lets a single trial call through
+    (half-open): a success closes it again, a failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failure_count = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self):
+        """Return True if a call may be attempted right now"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failure_count = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failure_count += 1
+            if self._trial_in_flight or self.failure_count >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial_in_flight = False
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised by BoundedExecutor.submit while every worker is busy"""
+
+
+class BoundedExecutor:
+    """
+    Thread pool that refuses work instead of queueing it. A call its caller
+    gave up on (see call_with_timeout) keeps its worker until it returns, so
+    queueing behind such calls would spend later requests' budgets waiting;
+    submit raises ExecutorSaturated instead while all workers are busy.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix=""):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._busy = 0
+        self._lock = threading.Lock()
+
+    def saturated(self):
+        with self._lock:
+            return self._busy >= self.max_workers
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._busy >= self.max_workers:
+                raise ExecutorSaturated(f"all {self.max_workers} workers are busy")
+            self._busy += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._lock:
+            self._busy -= 1
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def call_with_timeout(executor, fn, timeout, *args, **kwargs):
+    """
+    Run fn on the executor and wait at most `timeout` seconds for its result.
+    Raises TimeoutError if the call does not finish in time; the worker thread
+    is left to finish on its own (the client-side timeout bounds how long).
+    """
+    future = executor.submit(fn, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"call did not finish within {timeout:.2f}s")
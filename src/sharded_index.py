@@ -0,0 +1,321 @@
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from catalog_index import build_lock, collection_fingerprint
+
+
+SHARD_COLLECTION_NAME = "movie_shard"
+SHARD_MANIFEST_FILE = "shards.json"
+PAGE_SIZE = 5000
+
+
+class ShardError(Exception):
+    """Raised when a shard worker fails or returns an error"""
+
+
+def shard_for(movie_id, num_shards):
+    """Shard that owns an id; stable across processes and Python versions (unlike hash())"""
+    return zlib.crc32(str(movie_id).encode("utf-8")) % num_shards
+
+
+def partition(ids, num_shards):
+    """Row positions of `ids` grouped by owning shard"""
+    groups = [[] for _ in range(num_shards)]
+    for position, movie_id in enumerate(ids):
+        groups[shard_for(movie_id, num_shards)].append(position)
+    return groups
+
+
+def merge_top_k(shard_results, n_results, include=("documents", "metadatas", "distances")):
+    """
+    Merge per-shard Chroma query results into one global top-k per query.
+    Every shard's rows are already sorted by distance, so a k-way heapq.merge
+    is enough; ties keep shard order, which makes the output deterministic.
+    """
+    shard_results = [r for r in shard_results if r is not None]
+    fields = ["ids"] + [key for key in include if key != "ids"]
+    merged = {key: [] for key in fields}
+    num_queries = len(shard_results[0]["ids"]) if shard_results else 0
+
+    for query in range(num_queries):
+        rows = heapq.merge(*[
+            [(distance, shard, rank) for rank, distance in enumerate(result["distances"][query])]
+            for shard, result in enumerate(shard_results)
+        ])
+        top = [next(rows) for _ in range(min(n_results, sum(len(r["ids"][query]) for r in shard_results)))]
+        for key in fields:
+            merged[key].append([shard_results[shard][key][query][rank] for _, shard, rank in top])
+    return merged
+
+
+def _serve_shard(conn, path, metadata):
+    """Worker process body: own one shard collection and answer requests over the pipe"""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=path)
+
+    def open_collection():
+        return client.get_or_create_collection(
+            name=SHARD_COLLECTION_NAME, embedding_function=None, metadata=metadata
+        )
+
+    collection = open_collection()
+    conn.send(("ok", collection.count()))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        command = message[0]
+        if command == "stop":
+            break
+        try:
+            if command == "query":
+                _, embeddings, n_results, include = message
+                result = collection.query(query_embeddings=embeddings, n_results=n_results, include=include)
+                conn.send(("ok", {key: result[key] for key in ["ids"] + include}))
+            elif command == "add":
+                _, ids, embeddings, documents, metadatas = message
+                collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+                conn.send(("ok", collection.count()))
+            elif command == "count":
+                conn.send(("ok", collection.count()))
+            elif command == "reset":
+                client.delete_collection(SHARD_COLLECTION_NAME)
+                collection = open_collection()
+                conn.send(("ok", 0))
+            else:
+                conn.send(("error", f"unknown command {command!r}"))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class ShardedIndex:
+    """
+    The movie catalog split by crc32(id) across `num_shards` Chroma collections,
+    each owned by its own worker process (spawned, so every shard gets a core and
+    its own HNSW index in memory). query() mirrors Collection.query: the query is
+    sent to every shard at once, each returns its local top-k and the results are
+    merged into the global top-k, which is the same set a single exact index returns.
+    """
+
+    def __init__(self, path="data/shards", num_shards=4, embedding_function=None, metadata=None):
+        self.path = path
+        self.num_shards = num_shards
+        self.embedding_function = embedding_function
+        self.metadata = metadata
+        self.name = f"movie_collection_{num_shards}_shards"
+        self._connections = []
+        self._processes = []
+        self._locks = []
+        self._shard_counts = []
+
+    def start(self):
+        """Spawn one worker per shard and wait until each has opened its collection"""
+        self._context = multiprocessing.get_context("spawn")
+        for shard in range(self.num_shards):
+            conn, process = self._spawn(shard)
+            self._connections.append(conn)
+            self._processes.append(process)
+            self._locks.append(threading.Lock())
+        self._shard_counts = [self._wait_ready(shard) for shard in range(self.num_shards)]
+        return self
+
+    def _spawn(self, shard):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_serve_shard,
+            args=(child_conn, os.path.join(self.path, f"shard_{shard}"), self.metadata),
+            name=f"moviemind-shard-{shard}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return parent_conn, process
+
+    def _wait_ready(self, shard):
+        status, payload = self._connections[shard].recv()
+        if status != "ok":
+            raise ShardError(f"shard {shard}: {payload}")
+        return payload
+
+    def _restart_shard(self, shard):
+        """
+        Replace a shard worker whose pipe can no longer be trusted: after a
+        transport error it may still owe a reply that the next caller would
+        read as its own. Called with the shard's lock held.
+        """
+        self._connections[shard].close()
+        process = self._processes[shard]
+        process.terminate()
+        process.join(timeout=10)
+        self._connections[shard], self._processes[shard] = self._spawn(shard)
+        self._shard_counts[shard] = self._wait_ready(shard)
+
+    def close(self):
+        for conn, process in zip(self._connections, self._processes):
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=10)
+            conn.close()
+        self._connections, self._processes, self._locks = [], [], []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _broadcast(self, messages):
+        """
+        Send one message per shard (None skips the shard and its reply is None)
+        and collect the replies.
+        All messages go out before any reply is read so the shards work in parallel.
+        Locks are always taken in shard order, so concurrent callers cannot deadlock.
+        """
+        sent = []
+        replies = [None] * self.num_shards
+        errors = []
+        try:
+            for shard, message in enumerate(messages):
+                if message is None:
+                    continue
+                self._locks[shard].acquire()
+                sent.append(shard)
+                self._connections[shard].send(message)
+
+            # Each shard is released as soon as it has answered so the next caller can
+            # use it; error replies are all read before raising so no pipe keeps a stale answer
+            while sent:
+                shard = sent[0]
+                status, payload = self._connections[shard].recv()
+                sent.pop(0)
+                self._locks[shard].release()
+                if status != "ok":
+                    errors.append(f"shard {shard}: {payload}")
+                replies[shard] = payload
+        except Exception as e:
+            # A failed send or recv (dead worker, broken pipe) leaves the shards still
+            # in `sent` with an unknown reply pending, so they are restarted before
+            # their locks are released
+            for shard in sent:
+                try:
+                    self._restart_shard(shard)
+                except Exception as restart_error:
+                    print(f"Error restarting shard {shard}: {restart_error}")
+            raise ShardError(f"shard transport failed: {type(e).__name__}: {e}") from e
+        finally:
+            for shard in sent:
+                self._locks[shard].release()
+        if errors:
+            raise ShardError("; ".join(errors))
+        return replies
+
+    def count(self):
+        return sum(self._broadcast([("count",)] * self.num_shards))
+
+    def query(self, query_embeddings=None, query_texts=None, n_results=10,
+              include=("documents", "metadatas", "distances")):
+        """Same call shape and result layout as chromadb Collection.query"""
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(query_texts)
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        include = list(include)
+        if "distances" not in include:
+            include.append("distances")
+
+        messages = [
+            ("query", query_embeddings, min(n_results, count), include) if count else None
+            for count in self._shard_counts
+        ]
+        # Empty shards are skipped; their None replies are ignored by the merge
+        return merge_top_k(self._broadcast(messages), n_results, include)
+
+    def load_from(self, collection, page_size=PAGE_SIZE, fingerprint=None):
+        """Copy every row (with its stored embedding) of a single collection into the shards"""
+        start = time.time()
+        if fingerprint is None:
+            fingerprint = collection_fingerprint(collection, page_size)
+        self._shard_counts = self._broadcast([("reset",)] * self.num_shards)
+        total = collection.count()
+        for offset in range(0, total, page_size):
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            messages = []
+            for positions in partition(page["ids"], self.num_shards):
+                if not positions:
+                    messages.append(None)
+                    continue
+                messages.append((
+                    "add",
+                    [page["ids"][p] for p in positions],
+                    embeddings[positions],
+                    [page["documents"][p] for p in positions],
+                    [page["metadatas"][p] for p in positions],
+                ))
+            for shard, shard_count in enumerate(self._broadcast(messages)):
+                if shard_count is not None:
+                    self._shard_counts[shard] = shard_count
+
+        self._write_manifest(collection.name, total, fingerprint)
+        print(f"Loaded {total} movies into {self.num_shards} shards {self._shard_counts} "
+              f"in {time.time() - start:.1f}s")
+
+    def _write_manifest(self, source, total, fingerprint):
+        os.makedirs(self.path, exist_ok=True)
+        manifest_path = os.path.join(self.path, SHARD_MANIFEST_FILE)
+        with open(manifest_path + ".tmp", 'w') as f:
+            json.dump({"source": source, "num_shards": self.num_shards, "count": total,
+                       "fingerprint": fingerprint, "shard_counts": self._shard_counts}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def read_manifest(self):
+        manifest_path = os.path.join(self.path, SHARD_MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+
+    @classmethod
+    def from_collection(cls, collection, path="data/shards", num_shards=4, embedding_function=None):
+        """
+        Start shard workers for `collection`, (re)loading them if they hold another
+        version or other contents (checked by collection_fingerprint). The check and
+        the load run under build_lock, so of several API workers sharing `path` only
+        the first loads the shards and the rest attach to them.
+        """
+        fingerprint = collection_fingerprint(collection)
+        with build_lock(path):
+            index = cls(path, num_shards, embedding_function, metadata=collection.metadata or None).start()
+            manifest = index.read_manifest()
+            if (manifest.get("source") != collection.name or manifest.get("num_shards") != num_shards
+                    or sum(index._shard_counts) != collection.count()
+                    or manifest.get("fingerprint") != fingerprint):
+                index.load_from(collection, fingerprint=fingerprint)
+        return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split the live movie collection into shards served by worker processes")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--path", default="data/shards")
+    args = parser.parse_args()
+
+    import chromadb
+    from catalog_index import read_active_version
+
+    live_version = read_active_version("data/embeddings")
+    live_collection = chromadb.PersistentClient(path="data/embeddings").get_collection(name=live_version)
+    with ShardedIndex(args.path, args.shards, metadata=live_collection.metadata or None) as sharded:
+        sharded.load_from(live_collection)
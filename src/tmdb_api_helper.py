@@ -1,16 +1,19 @@
 import requests
 import os
+import threading
 import time
 from dotenv import load_dotenv
+from metrics import TMDB_CACHE_LOOKUPS, TMDB_API_CALLS
 
 class TMDBHelper:
     def __init__(self):
         load_dotenv()
         self.api_key = os.environ.get("TMDB_API_KEY")
-        self.base_url = "https://api.themoviedb.org/3"
+        self.base_url = os.environ.get("TMDB_API_BASE_URL", "https://api.themoviedb.org/3")
         self.poster_base_url = "https://image.tmdb.org/t/p/w500"
         self.search_cache = {}  # Simple cache to avoid repeated API calls
         self.last_request_time = 0  # For rate limiting
+        self._rate_limit_lock = threading.Lock()  # Posters are looked up from several threads
         
         if not self.api_key:
             print("Warning: TMDB_API_KEY not found in environment variables.")
@@ -18,14 +21,15 @@ class TMDBHelper:
     
     def _rate_limit(self):
         """Implement simple rate limiting to avoid API restrictions"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        # Wait if less than 0.25 seconds since last request (4 requests per second)
-        if time_since_last_request < 0.25:
-            time.sleep(0.25 - time_since_last_request)
-            
-        self.last_request_time = time.time()
+        # Reserve the next free slot (4 requests per second) under the lock, then
+        # wait for it outside, so other threads can reserve the slots after it
+        with self._rate_limit_lock:
+            slot = max(time.time(), self.last_request_time + 0.25)
+            self.last_request_time = slot
+
+        delay = slot - time.time()
+        if delay > 0:
+            time.sleep(delay)
     
     def search_movie(self, title, year=None):
         """Search for a movie by title and optional year"""
@@ -35,7 +39,9 @@ class TMDBHelper:
         # Check cache first
         cache_key = f"{title}_{year}"
         if cache_key in self.search_cache:
+            TMDB_CACHE_LOOKUPS.inc(result="hit")
             return self.search_cache[cache_key]
+        TMDB_CACHE_LOOKUPS.inc(result="miss")
             
         # Rate limit API calls
         self._rate_limit()
@@ -52,6 +58,7 @@ class TMDBHelper:
                 params["year"] = year
                 
             response = requests.get(url, params=params, timeout=5)
+            TMDB_API_CALLS.inc(status=response.status_code)
             
             if response.status_code == 200:
                 results = response.json().get("results", [])
@@ -71,6 +78,7 @@ class TMDBHelper:
                     return result
                     
         except Exception as e:
+            TMDB_API_CALLS.inc(status="error")
             print(f"Error searching movie: {e}")
             
         return None
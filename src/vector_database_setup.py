@@ -1,67 +1,145 @@
+import ast
 import json
 import pandas as pd
 import os
-from sentence_transformers import SentenceTransformer
 import chromadb
 from chromadb.utils import embedding_functions
 
+from catalog_index import ACTIVE_INDEX_FILE, read_active_version
+
+# HNSW settings for the movie collection; None keeps Chroma's default.
+# Each can be overridden with MOVIEMIND_HNSW_SPACE / _M / _CONSTRUCTION_EF / _SEARCH_EF.
+DEFAULT_INDEX_CONFIG = {
+    "space": None,            # "l2" (Chroma's default), "cosine" or "ip"
+    "M": None,                # graph degree
+    "construction_ef": None,  # candidate list size while building
+    "search_ef": None,        # candidate list size while querying
+}
+
+
+def index_config_from_env():
+    """DEFAULT_INDEX_CONFIG with any MOVIEMIND_HNSW_* environment overrides applied"""
+    config = dict(DEFAULT_INDEX_CONFIG)
+    for key in config:
+        value = os.environ.get(f"MOVIEMIND_HNSW_{key.upper()}")
+        if value:
+            config[key] = value if key == "space" else int(value)
+    return config
+
+
+def hnsw_metadata(index_config):
+    """Translate an index config into Chroma collection metadata"""
+    space = index_config.get("space")
+    if space is not None and space not in ("l2", "cosine", "ip"):
+        raise ValueError(f"Unsupported distance space: {space}")
+    metadata = {
+        f"hnsw:{key}": value
+        for key, value in index_config.items()
+        if value is not None
+    }
+    return metadata or None
+
+def _as_list(value):
+    """List-valued catalog cells: lists pass through, "['a', 'b']" strings from a reloaded CSV are parsed"""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str) and value.startswith('['):
+        return ast.literal_eval(value)
+    return []
+
+
+def _list_column(movies_df, column):
+    if column not in movies_df.columns:
+        return [[] for _ in range(len(movies_df))]
+    return [_as_list(value) for value in movies_df[column]]
+
+
 def prepare_movie_descriptions(movies_df):
     """
     Prepare JSON document strings for each movie (format expected by recommendation_system.py).
     Also adds a plain-text 'description' column used as the embedding source.
+    Top user tags and genome tags (see movie_data_preparation), when present,
+    go into the plot so they are embedded and shown to the LLM.
     """
-    def make_doc(row):
-        genres = row['genres'] if isinstance(row['genres'], list) else []
-        year = str(row['year']) if pd.notna(row['year']) else "Unknown"
-        genre_str = ', '.join(genres) if genres else "Unknown"
-        plot = (
-            f"A {genre_str} film from {year}. "
-            f"Rated {row['avg_rating']:.1f}/5 by {int(row['rating_count'])} users."
-        )
-        doc = {
-            "title": row['clean_title'],
+    years = movies_df['year'].astype(object).where(movies_df['year'].notna(), "Unknown").astype(str)
+    genre_strs = [', '.join(genres) if genres else "Unknown" for genres in _list_column(movies_df, 'genres')]
+    ratings = movies_df['avg_rating'].astype(float).round(1)
+    counts = movies_df['rating_count'].astype(int)
+
+    descriptions = []
+    for title, year, genre_str, rating, count, tags, genome_tags in zip(
+        movies_df['clean_title'], years, genre_strs, ratings, counts,
+        _list_column(movies_df, 'tags'), _list_column(movies_df, 'genome_tags')
+    ):
+        plot = f"A {genre_str} film from {year}. Rated {rating:.1f}/5 by {count} users."
+        if genome_tags:
+            plot += f" Themes: {', '.join(genome_tags)}."
+        if tags:
+            plot += f" Tagged by users as: {', '.join(tags)}."
+        descriptions.append(json.dumps({
+            "title": title,
             "year": year,
             "genre": genre_str,
             "director": "Unknown",
             "actors": [],
+            "tags": list(dict.fromkeys(genome_tags + tags)),
             "plot": plot,
-        }
-        return json.dumps(doc)
+        }))
 
-    movies_df['description'] = movies_df.apply(make_doc, axis=1)
+    movies_df['description'] = descriptions
     return movies_df
 
-def create_vector_database(movies_df):
+def create_vector_database(movies_df, path="data/embeddings", embedding_function=None,
+                           collection_name="movie_collection", index_config=None, replace_live=False):
     """
-    Create a Chroma vector database with movie embeddings
+    Create a Chroma vector database with movie embeddings.
+    embedding_function defaults to the all-MiniLM-L6-v2 sentence transformer and
+    index_config (distance space, M, construction/search ef) to index_config_from_env().
+    Only a collection with the same name is replaced, so a new version can be
+    built next to the one being served. The collection marked live in
+    active_collection.json is never replaced unless replace_live is set; rebuild
+    a running app's catalog through CatalogIndex (POST /admin/rebuild) instead.
     """
     print("Creating vector database...")
     
     # Create embeddings directory if it doesn't exist
-    if not os.path.exists('data/embeddings'):
-        os.makedirs('data/embeddings')
-    
-    # Initialize the sentence transformer model
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    if not os.path.exists(path):
+        os.makedirs(path)
     
     # Initialize ChromaDB client
-    chroma_client = chromadb.PersistentClient(path="data/embeddings")
+    chroma_client = chromadb.PersistentClient(path=path)
     
     # Create or get the collection
-    embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name='all-MiniLM-L6-v2'
-    )
+    if embedding_function is None:
+        embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
+            model_name='all-MiniLM-L6-v2'
+        )
     
+    if not replace_live and os.path.exists(os.path.join(path, ACTIVE_INDEX_FILE)) \
+            and read_active_version(path) == collection_name:
+        try:
+            chroma_client.get_collection(collection_name)
+        except Exception:
+            pass
+        else:
+            raise ValueError(
+                f"Collection {collection_name} is the live catalog; rebuild it through the running app "
+                f"(python src/catalog_index.py) or pass replace_live=True"
+            )
+
     # Delete collection if it exists (for demo purposes)
     try:
-        chroma_client.delete_collection("movie_collection")
+        chroma_client.delete_collection(collection_name)
     except:
         pass
     
     # Create new collection
+    if index_config is None:
+        index_config = index_config_from_env()
     collection = chroma_client.create_collection(
-        name="movie_collection",
-        embedding_function=embedding_function
+        name=collection_name,
+        embedding_function=embedding_function,
+        metadata=hnsw_metadata(index_config)
     )
     
     # Add movies to the collection in batches
@@ -77,7 +155,9 @@ def create_vector_database(movies_df):
                 'year': row['year'],
                 'genres': ','.join(row['genres']),
                 'avg_rating': str(row['avg_rating']),
-                'rating_count': str(row['rating_count'])
+                'rating_count': str(row['rating_count']),
+                'tags': ','.join(_as_list(row.get('tags'))),
+                'genome_tags': ','.join(_as_list(row.get('genome_tags')))
             } for _, row in batch.iterrows()]
         )
         
@@ -87,16 +167,23 @@ def create_vector_database(movies_df):
     return collection
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the movie collection from data/processed_movies.csv")
+    parser.add_argument("--replace-live", action="store_true",
+                        help="replace the collection even if it is the live catalog (stop the app first)")
+    args = parser.parse_args()
+
     movies_df = pd.read_csv('data/processed_movies.csv')
     
     # Convert string representation of list back to list
-    movies_df['genres'] = movies_df['genres'].apply(eval)
+    movies_df['genres'] = movies_df['genres'].apply(ast.literal_eval)
     
     # Prepare movie descriptions
     movies_df = prepare_movie_descriptions(movies_df)
     
     # Create vector database
-    collection = create_vector_database(movies_df)
+    collection = create_vector_database(movies_df, replace_live=args.replace_live)
     
     # Test the database with a query
     results = collection.query(
@@ -0,0 +1,95 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import create_app
+from src.favorites import FavoritesStore
+
+
+def _fake_recommender(delay=0.0):
+    recommender = MagicMock()
+    recommender.calls = []
+
+    def get_response_progressive(user_id, message, profile=False, request_id=None):
+        recommender.calls.append({"profile": profile, "request_id": request_id})
+        time.sleep(delay)
+        return "Title: Heat\nYear: 1995", [("Heat", "1995")], iter([(0, "http://posters/heat.jpg")])
+
+    recommender.get_response_progressive.side_effect = get_response_progressive
+    return recommender
+
+
+def _wait_until_ready(client):
+    for _ in range(100):
+        if client.get("/readyz").status_code == 200:
+            return
+        time.sleep(0.02)
+    raise AssertionError("recommender never became ready")
+
+
+@pytest.fixture
+def favorites(tmp_path):
+    return FavoritesStore(str(tmp_path / "prefs.json"))
+
+
+def test_recommend_returns_text_and_posters(favorites):
+    recommender = _fake_recommender()
+    app = create_app(lambda: recommender, favorites=favorites)
+    with TestClient(app) as client:
+        assert client.get("/healthz").json() == {"status": "ok"}
+        _wait_until_ready(client)
+
+        response = client.post("/recommend", json={"message": "heist movies", "user_id": "u1"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["response"].startswith("Title: Heat")
+        assert body["movies"] == [{"title": "Heat", "year": "1995", "poster_url": "http://posters/heat.jpg"}]
+
+        assert recommender.calls[-1]["profile"] is False
+
+        response = client.post("/recommend", json={"message": "heist movies"},
+                               headers={"X-MovieMind-Profile": "1", "X-Request-Id": "req42"})
+        assert response.json()["request_id"] == "req42"
+        assert recommender.calls[-1] == {"profile": True, "request_id": "req42"}
+
+        # Request ids end up in profile file names
+        response = client.post("/recommend", json={"message": "heist movies"},
+                               headers={"X-Request-Id": "../../etc/x"})
+        assert response.json()["request_id"] != "../../etc/x"
+        assert response.json()["request_id"].isalnum()
+
+
+def test_recommend_times_out_with_504(favorites):
+    app = create_app(lambda: _fake_recommender(delay=1.0), favorites=favorites, request_timeout=0.1)
+    with TestClient(app) as client:
+        _wait_until_ready(client)
+        assert client.post("/recommend", json={"message": "heist movies"}).status_code == 504
+
+
+def test_not_ready_until_recommender_is_built(favorites):
+    app = create_app(lambda: time.sleep(1.0) or _fake_recommender(), favorites=favorites)
+    with TestClient(app) as client:
+        assert client.get("/readyz").status_code == 503
+        assert client.post("/recommend", json={"message": "heist movies"}).status_code == 503
+
+
+def test_favorites_crud(favorites):
+    app = create_app(lambda: _fake_recommender(), favorites=favorites)
+    with TestClient(app) as client:
+        created = client.post("/favorites/u1", json={"title": "Heat"})
+        assert created.status_code == 201 and created.json()["added"] is True
+        duplicate = client.post("/favorites/u1", json={"title": "Heat"})
+        assert duplicate.status_code == 200 and duplicate.json()["added"] is False
+        assert client.get("/favorites/u1").json() == {"user_id": "u1", "favorites": ["Heat"]}
+        assert client.delete("/favorites/u1/Heat").status_code == 200
+        assert client.delete("/favorites/u1/Heat").status_code == 404
+        assert client.get("/favorites/u1").json()["favorites"] == []
+
+        # Titles with a slash, sent raw or percent-encoded
+        client.post("/favorites/u1", json={"title": "Face/Off"})
+        client.post("/favorites/u1", json={"title": "AC/DC: Let There Be Rock"})
+        assert client.delete("/favorites/u1/Face/Off").json()["title"] == "Face/Off"
+        assert client.delete("/favorites/u1/AC%2FDC%3A%20Let%20There%20Be%20Rock").status_code == 200
+        assert client.get("/favorites/u1").json()["favorites"] == []
@@ -0,0 +1,91 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from src.batch_recommendations import run_batch, load_checkpoint
+
+
+def make_recommender():
+    recommender = MagicMock()
+    recommender.llm_workers = 8
+    recommender.embedding_function.side_effect = lambda queries: [[0.1, 0.2] for _ in queries]
+
+    def retrieve(query_embeddings, n_results):
+        return [{
+            "ids": ["1", "2"],
+            "documents": [json.dumps({"title": "Heat", "year": "1995"}),
+                          json.dumps({"title": "Alien", "year": "1979"})],
+            "distances": [0.1, 0.2],
+        } for _ in query_embeddings]
+
+    recommender.retrieve.side_effect = retrieve
+    recommender.parse_movie_results.side_effect = lambda docs: [json.loads(d) for d in docs]
+    recommender.recommend_stateless.side_effect = lambda user_id, query, infos: (f"Try {infos[0]['title']}", "recommendation")
+    return recommender
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    path.write_text("".join(
+        json.dumps({"user_id": f"user{i}", "query": f"query {i}"}) + "\n" for i in range(5)
+    ))
+    return path
+
+
+def test_run_batch_issues_multi_query_calls(tmp_path, input_file):
+    recommender = make_recommender()
+    output = tmp_path / "out.jsonl"
+
+    processed = run_batch(recommender, str(input_file), str(output), batch_size=2)
+
+    assert processed == 5
+    # 5 queries in batches of 2 -> 3 embedding calls and 3 multi-query retrievals
+    assert recommender.embedding_function.call_count == 3
+    assert recommender.retrieve.call_count == 3
+    recommender.collection.query.assert_not_called()
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r["row"] for r in rows] == [0, 1, 2, 3, 4]
+    assert rows[0]["response"] == "Try Heat"
+    assert rows[0]["movies"][1]["title"] == "Alien"
+
+
+def test_run_batch_resumes_after_crash(tmp_path, input_file):
+    recommender = make_recommender()
+    output = tmp_path / "out.jsonl"
+    # Two rows finished, the third was cut off mid-write
+    output.write_text(
+        json.dumps({"row": 0, "user_id": "user0"}) + "\n"
+        + json.dumps({"row": 1, "user_id": "user1"}) + "\n"
+        + '{"row": 2, "user'
+    )
+
+    processed = run_batch(recommender, str(input_file), str(output), use_llm=False)
+
+    assert processed == 3
+    recommender.recommend_stateless.assert_not_called()
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(r["row"] for r in rows) == [0, 1, 2, 3, 4]
+    assert rows[-1]["source"] == "retrieval"
+    assert load_checkpoint(str(output)) == {0, 1, 2, 3, 4}
+
+
+def test_fallback_rows_are_retried_on_resume(tmp_path, input_file):
+    recommender = make_recommender()
+    output = tmp_path / "out.jsonl"
+    output.write_text(
+        json.dumps({"row": 0, "source": "recommendation"}) + "\n"
+        + json.dumps({"row": 1, "source": "fallback"}) + "\n"
+        + json.dumps({"note": "no row key"}) + "\n"
+    )
+
+    assert load_checkpoint(str(output)) == {0}
+    run_batch(recommender, str(input_file), str(output))
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(r["row"] for r in rows if "row" in r) == [0, 1, 2, 3, 4]
+    assert [r["source"] for r in rows if r.get("row") == 1] == ["recommendation"]
+
+
+def test_llm_concurrency_above_the_recommender_pool_is_rejected(tmp_path, input_file):
+    with pytest.raises(ValueError):
+        run_batch(make_recommender(), str(input_file), str(tmp_path / "out.jsonl"), llm_concurrency=16)
@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+from zipfile import ZipFile
+
+import numpy as np
+
+from benchmarks import run_benchmarks
+from benchmarks.fakes import FakeChatModel, FakeTMDBServer, HashingEmbeddingFunction
+from benchmarks.synthetic_catalog import generate_catalog, write_movielens_archive, query_set
+from src.tmdb_api_helper import TMDBHelper
+
+
+def test_synthetic_catalog_schema():
+    catalog = generate_catalog(20)
+    assert len(catalog) == 20
+    assert catalog["title"].is_unique
+    assert all(isinstance(genres, list) and genres for genres in catalog["genres"])
+    assert catalog["avg_rating"].between(0.5, 5.0).all()
+    assert len(query_set(12)) == 12
+
+
+def test_synthetic_archive_layout(tmp_path):
+    path = write_movielens_archive(str(tmp_path / "ml.zip"), 20)
+    with ZipFile(path) as zip_file:
+        assert sorted(zip_file.namelist()) == [
+            "ml-latest-small/movies.csv", "ml-latest-small/ratings.csv", "ml-latest-small/tags.csv",
+        ]
+
+
+def test_hashing_embeddings_are_deterministic_unit_vectors():
+    embed = HashingEmbeddingFunction(dim=64)
+    first, second, empty = embed(["dark sci-fi thriller", "dark sci-fi thriller", ""])
+    assert first.shape == (64,)
+    assert np.allclose(first, second)
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert not empty.any()
+
+
+def test_fake_chat_model_echoes_prompt_movies():
+    model = FakeChatModel()
+    text = model.invoke("Title: Heat\nYear: 1995\nGenre: Crime\n\nTitle: Alien\nYear: 1979\nGenre: Sci-Fi\n")
+    assert "Title: Heat\nYear: 1995" in text.content
+    assert "Title: Alien" in text.content
+    assert model.calls == 1
+
+
+def test_fake_tmdb_server_answers_poster_lookups():
+    with FakeTMDBServer() as server:
+        helper = TMDBHelper()
+        helper.api_key = "test"
+        helper.base_url = server.base_url
+        poster_url = helper.get_poster_url("Heat", "1995")
+        assert poster_url.startswith(helper.poster_base_url)
+        assert server.request_count == 1
+
+
+def test_run_benchmarks_tiny_size(tmp_path):
+    output = tmp_path / "bench.json"
+    # --max-index-size 0 keeps the smoke test to the data preparation benchmarks
+    run_benchmarks.main(["--sizes", "50", "--max-index-size", "0", "--output", str(output)])
+
+    results = json.loads(output.read_text())["results"]["50"]
+    assert results["prepare_movielens"]["rows_per_second"] > 0
+    assert results["prepare_movie_descriptions"]["rows_per_second"] > 0
+    assert "skipped" in results
+
+
+def test_run_benchmarks_get_response_tiny_size(tmp_path):
+    output = tmp_path / "bench.json"
+    # A separate process, since test_recommendation_system replaces chromadb and
+    # tmdb_api_helper in sys.modules for the rest of the session
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.run_benchmarks", "--sizes", "40", "--queries", "5",
+         "--e2e-queries", "3", "--output", str(output)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True, timeout=300,
+    )
+
+    results = json.loads(output.read_text())["results"]["40"]
+    assert results["query_latency"]["count"] == 5
+    get_response = results["get_response"]
+    assert get_response["overhead_excluding_llm"]["count"] == 3
+    # With the TMDB rate limit off, no request waits on a 0.25 s slot
+    assert get_response["overhead_excluding_llm"]["p50_ms"] < 250
+    assert "retrieval" in get_response["stages"]
+    assert get_response["tmdb_requests"] > 0
@@ -0,0 +1,140 @@
+import json
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.catalog_index import (
+    CatalogIndex, IndexValidationError, add_rebuild_route, read_active_version, write_active_version
+)
+
+
+def make_collection(count=2):
+    collection = MagicMock()
+    collection.count.return_value = count
+    collection.query.return_value = {"documents": [[json.dumps({"title": "Heat"})]]}
+    return collection
+
+
+def test_in_flight_requests_finish_on_old_version(tmp_path):
+    client = MagicMock()
+    old, new = make_collection(), make_collection()
+    index = CatalogIndex(client, None, old, "movie_collection", path=str(tmp_path), retire_grace=0)
+
+    with index.acquire() as handle:
+        index.swap("movie_collection_v2", new)
+        # The request that started before the swap still sees the old collection
+        assert handle.collection is old
+        assert index.current().collection is new
+        client.delete_collection.assert_not_called()
+
+    # Old version is garbage-collected once its last request is done
+    client.delete_collection.assert_called_once_with("movie_collection")
+    assert read_active_version(str(tmp_path)) == "movie_collection_v2"
+
+
+def test_rebuild_rejects_invalid_collection(tmp_path):
+    client = MagicMock()
+    live = make_collection()
+    index = CatalogIndex(client, None, live, "movie_collection", path=str(tmp_path))
+    movies_df = MagicMock()
+    movies_df.__len__.return_value = 10
+
+    with patch("vector_database_setup.create_vector_database", return_value=make_collection(count=3)):
+        with pytest.raises(IndexValidationError):
+            index.rebuild(movies_df)
+
+    assert index.current().collection is live
+    deleted = client.delete_collection.call_args[0][0]
+    assert deleted.startswith("movie_collection_v")
+
+
+def test_follows_version_activated_by_another_process(tmp_path):
+    client = MagicMock()
+    rebuilt = make_collection()
+    client.get_collection.return_value = rebuilt
+    index = CatalogIndex(client, None, make_collection(), "movie_collection",
+                         path=str(tmp_path), poll_interval=0)
+
+    write_active_version(str(tmp_path), "movie_collection_v2")
+    # Requests never touch the pointer or the store themselves
+    with index.acquire() as handle:
+        assert handle.version == "movie_collection"
+    client.get_collection.assert_not_called()
+
+    index.follow_pointer()
+    with index.acquire() as handle:
+        assert handle.version == "movie_collection_v2"
+        assert handle.collection is rebuilt
+    # Other workers may still be serving the old version; the rebuilding process deletes it
+    client.delete_collection.assert_not_called()
+
+
+def test_old_version_is_deleted_after_grace_period(tmp_path):
+    client = MagicMock()
+    index = CatalogIndex(client, None, make_collection(), "movie_collection",
+                         path=str(tmp_path), retire_grace=0.2)
+
+    index.swap("movie_collection_v2", make_collection())
+    client.delete_collection.assert_not_called()
+
+    deadline = time.monotonic() + 5
+    while not client.delete_collection.called and time.monotonic() < deadline:
+        time.sleep(0.02)
+    client.delete_collection.assert_called_once_with("movie_collection")
+
+
+def test_background_poll_follows_pointer(tmp_path):
+    client = MagicMock()
+    client.get_collection.return_value = make_collection()
+    index = CatalogIndex(client, None, make_collection(), "movie_collection",
+                         path=str(tmp_path), poll_interval=0.01)
+    write_active_version(str(tmp_path), "movie_collection_v2")
+
+    index.start_polling()
+    try:
+        deadline = time.monotonic() + 5
+        while index.version != "movie_collection_v2" and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        index.stop_polling()
+    assert index.version == "movie_collection_v2"
+
+
+def make_admin_app(index, token="secret"):
+    app = FastAPI()
+    add_rebuild_route(app, lambda: index, token=token, load_movies=lambda: "movies")
+    return TestClient(app)
+
+
+def test_rebuild_route_requires_admin_token():
+    index = MagicMock()
+    client = make_admin_app(index)
+
+    assert client.post("/admin/rebuild").status_code == 403
+    assert client.post("/admin/rebuild", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    index.rebuild_async.assert_not_called()
+
+    # Without a configured token the route stays closed
+    assert make_admin_app(index, token="").post("/admin/rebuild", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_rebuild_route_starts_background_rebuild(tmp_path):
+    index = CatalogIndex(MagicMock(), None, make_collection(), "movie_collection", path=str(tmp_path))
+    client = make_admin_app(index)
+
+    with patch.object(index, "rebuild_async") as rebuild_async:
+        response = client.post("/admin/rebuild", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 202
+    assert response.json()["live_version"] == "movie_collection"
+    assert rebuild_async.call_args[0][0]() == "movies"
+
+    # One rebuild at a time
+    with index._rebuild_lock:
+        assert client.post("/admin/rebuild", headers={"X-Admin-Token": "secret"}).status_code == 409
+
+
+def test_rebuild_route_conflicts_without_chroma_client():
+    index = CatalogIndex(None, None, make_collection(), "movie_collection")
+    response = make_admin_app(index).post("/admin/rebuild", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 409
@@ -0,0 +1,111 @@
+import json
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from src.compact_vectors import quantize_int8, dequantize_int8, CompactVectorStore, distances
+
+
+@pytest.fixture
+def fake_collection():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((300, 16)).astype(np.float32)
+    collection = MagicMock()
+    collection.name = "movie_collection"
+    collection.metadata = {"hnsw:space": "cosine"}
+    collection.count.return_value = len(embeddings)
+
+    def get(include, limit=None, offset=0, ids=None):
+        if ids is not None:
+            return {"ids": list(reversed(ids)),
+                    "documents": [json.dumps({"title": f"Movie {i}"}) for i in reversed(ids)],
+                    "metadatas": [{"title": f"Movie {i}"} for i in reversed(ids)]}
+        rows = range(offset, min(offset + limit, len(embeddings)))
+        return {"ids": [str(i) for i in rows], "embeddings": embeddings[offset:offset + len(rows)],
+                "documents": [json.dumps({"title": f"Movie {i}"}) for i in rows]}
+
+    collection.get.side_effect = get
+    return collection, embeddings
+
+
+def test_quantize_int8_roundtrip():
+    matrix = np.array([[0.5, -1.0, 0.25], [0.0, 0.0, 0.0]], dtype=np.float32)
+    codes, scales = quantize_int8(matrix)
+    assert codes.dtype == np.int8
+    assert codes[0, 1] == -127
+    np.testing.assert_allclose(dequantize_int8(codes, scales), matrix, atol=scales[0])
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16"])
+def test_compact_store_matches_exact_search(tmp_path, fake_collection, dtype):
+    collection, embeddings = fake_collection
+    store = CompactVectorStore.from_collection(collection, str(tmp_path / "compact"), dtype, overfetch=4)
+
+    queries = embeddings[:3] + 0.01
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    expected = np.argsort(-(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T, axis=1)[:, :5]
+
+    rows, _ = store.search(queries, k=5)
+    np.testing.assert_array_equal(np.array(rows), expected)
+
+    report = store.memory_report()
+    assert report["ids_bytes"] > 0
+    assert report["compact_bytes"] < report["float32_bytes"]
+
+
+def test_query_returns_collection_layout(tmp_path, fake_collection):
+    collection, embeddings = fake_collection
+    store = CompactVectorStore.from_collection(collection, str(tmp_path / "compact"), "int8")
+
+    results = store.query(query_embeddings=embeddings[:1], n_results=3)
+    assert results["ids"][0][0] == "0"
+    assert json.loads(results["documents"][0][0])["title"] == "Movie 0"
+    assert results["metadatas"][0][0] == {"title": "Movie 0"}
+    assert results["distances"][0] == sorted(results["distances"][0])
+
+
+def test_ivf_probes_nearest_lists(tmp_path, fake_collection):
+    collection, embeddings = fake_collection
+    CompactVectorStore.build(collection, str(tmp_path / "compact"), ivf_lists=16)
+    store = CompactVectorStore(str(tmp_path / "compact"), "int8", collection, overfetch=4, n_probe=4)
+    assert store.manifest["ivf_lists"] == 16
+    assert sorted(store.ivf_order.tolist()) == list(range(len(embeddings)))
+
+    # Only the probed lists are scanned, and the query's own row sits in its nearest list
+    queries = embeddings[:20]
+    candidates = store._first_pass(queries, 20)
+    assert all(len(rows) < len(embeddings) for rows in candidates)
+    rows, _ = store.search(queries, k=1)
+    assert [int(r[0]) for r in rows] == list(range(20))
+
+    # Probing every list gives exact search back
+    store.n_probe = 16
+    exact = np.argsort(distances(queries, embeddings, "cosine"), axis=1)[:, :5]
+    rows, _ = store.search(queries, k=5)
+    np.testing.assert_array_equal(np.array(rows), exact)
+
+
+def test_from_collection_rebuilds_when_documents_change(tmp_path, fake_collection):
+    collection, embeddings = fake_collection
+    first = CompactVectorStore.from_collection(collection, str(tmp_path / "compact"))
+
+    with patch.object(CompactVectorStore, "build") as build:
+        CompactVectorStore.from_collection(collection, str(tmp_path / "compact"))
+    build.assert_not_called()
+
+    # Same name and row count, re-prepared documents
+    get = collection.get.side_effect
+
+    def changed_get(include, limit=None, offset=0, ids=None):
+        page = get(include, limit, offset, ids)
+        page["documents"] = [document + " tagged" for document in page["documents"]]
+        return page
+
+    collection.get.side_effect = changed_get
+    store = CompactVectorStore.from_collection(collection, str(tmp_path / "compact"))
+    assert store.manifest["fingerprint"] != first.manifest["fingerprint"]
+
+    # The rebuild replaced the directory as a whole: the store opened before it
+    # still reads its own files, and no staging or retired copies are left behind
+    rows, _ = first.search(embeddings[:1], k=1)
+    assert rows[0][0] == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["compact", "compact.lock"]
@@ -0,0 +1,31 @@
+from src.conversation_memory import ConversationMemory
+
+
+def test_history_is_kept_per_user():
+    memory = ConversationMemory()
+    memory.save("alice", "heist movies", "Try Heat")
+    memory.save("bob", "cartoons", "Try Up")
+
+    assert memory.buffer("alice") == "Human: heist movies\nAI: Try Heat"
+    assert memory.buffer("bob") == "Human: cartoons\nAI: Try Up"
+    assert memory.buffer("carol") == ""
+
+
+def test_turns_and_users_are_capped():
+    memory = ConversationMemory(max_turns=2, max_users=2)
+    for turn in range(3):
+        memory.save("alice", f"question {turn}", f"answer {turn}")
+    assert "question 0" not in memory.buffer("alice")
+    assert memory.buffer("alice").count("Human:") == 2
+
+    # The least recently active user is dropped first
+    memory.save("bob", "cartoons", "Try Up")
+    memory.save("alice", "more", "Try Thief")
+    memory.save("carol", "comedies", "Try Airplane!")
+    assert memory.buffer("bob") == ""
+    assert "Try Thief" in memory.buffer("alice")
+
+    memory.clear("alice")
+    assert memory.buffer("alice") == ""
+    memory.clear()
+    assert memory.buffer("carol") == ""
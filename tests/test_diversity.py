@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from src.diversity import mmr_select, diversity_config_from_env
+
+
+@pytest.fixture
+def near_duplicates():
+    # Three near-copies of the best match and two distinct, slightly less relevant movies
+    query = np.array([1.0, 0.0, 0.0])
+    candidates = np.array([
+        [1.0, 0.00, 0.00],
+        [1.0, 0.01, 0.00],
+        [1.0, 0.00, 0.01],
+        [0.8, 0.60, 0.00],
+        [0.8, 0.00, 0.60],
+    ])
+    return query, candidates
+
+
+def test_mmr_skips_near_duplicates(near_duplicates):
+    query, candidates = near_duplicates
+    assert mmr_select(query, candidates, 3, lambda_mult=0.3) == [0, 3, 4]
+
+
+def test_lambda_one_ranks_by_relevance(near_duplicates):
+    query, candidates = near_duplicates
+    assert mmr_select(query, candidates, 3, lambda_mult=1.0) == [0, 1, 2]
+
+
+def test_k_larger_than_pool(near_duplicates):
+    query, candidates = near_duplicates
+    assert sorted(mmr_select(query, candidates, 10)) == [0, 1, 2, 3, 4]
+    assert mmr_select(query, np.empty((0, 3)), 5) == []
+
+
+def test_diversity_config_from_env(monkeypatch):
+    monkeypatch.setenv("MOVIEMIND_DIVERSITY_POOL", "50")
+    monkeypatch.setenv("MOVIEMIND_DIVERSITY_LAMBDA", "0.5")
+    assert diversity_config_from_env() == (50, 0.5)
+    monkeypatch.setenv("MOVIEMIND_DIVERSITY_LAMBDA", "2")
+    with pytest.raises(ValueError):
+        diversity_config_from_env()
@@ -0,0 +1,23 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from src.favorites import FavoritesStore
+
+
+def test_add_remove_and_list(tmp_path):
+    store = FavoritesStore(str(tmp_path / "prefs.json"))
+    assert store.list("u1") == []
+    assert store.add("u1", "Heat") is True
+    assert store.add("u1", "Heat") is False
+    assert store.remove("u1", "Alien") is False
+    assert store.list("u1") == ["Heat"]
+
+    with open(tmp_path / "prefs.json") as f:
+        assert json.load(f) == {"u1": {"favorites": ["Heat"]}}
+
+
+def test_concurrent_adds_are_not_lost(tmp_path):
+    store = FavoritesStore(str(tmp_path / "prefs.json"))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda i: store.add("u1", f"Movie {i}"), range(50)))
+    assert sorted(store.list("u1")) == sorted(f"Movie {i}" for i in range(50))
@@ -0,0 +1,40 @@
+from unittest.mock import MagicMock, patch
+from src import gradio_interface
+from src.gradio_interface import POSTER_PENDING, render_poster_cards, respond_progressive
+
+
+MOVIES = [("Heat", "1995"), ("Alien", "1979")]
+
+
+def test_pending_posters_render_as_placeholders():
+    html = render_poster_cards(MOVIES, [POSTER_PENDING, "http://posters/alien.jpg"])
+    assert html.count("Loading poster…") == 1
+    assert '<img src="http://posters/alien.jpg" alt="Alien"' in html
+    assert "<strong>Heat</strong>" in html
+
+
+def test_movies_without_posters_are_left_out():
+    assert render_poster_cards(MOVIES, [None, None]) == ""
+    html = render_poster_cards(MOVIES, [None, "http://posters/alien.jpg"])
+    assert "Heat" not in html and "Alien" in html
+
+
+def test_respond_progressive_replaces_placeholders_as_posters_arrive():
+    recommender = MagicMock()
+    recommender.get_response_progressive.return_value = (
+        "Title: Heat\nTitle: Alien", MOVIES, iter([(1, "http://posters/alien.jpg"), (0, None)]),
+    )
+    with patch.object(gradio_interface, "get_recommender", return_value=recommender), \
+            patch.object(gradio_interface, "poster_cache", None):
+        updates = list(respond_progressive("heist movies"))
+
+    assert [text for text, _ in updates] == ["Title: Heat\nTitle: Alien"] * 3
+    first, second, last = [html for _, html in updates]
+    # The text comes first, with a placeholder card per movie
+    assert first.count("Loading poster…") == 2
+    # Each finished lookup replaces its placeholder with the poster...
+    assert second.count("Loading poster…") == 1
+    assert 'src="http://posters/alien.jpg"' in second
+    # ...or drops the card when there is no poster
+    assert "Loading poster…" not in last and "Heat" not in last
+    assert 'src="http://posters/alien.jpg"' in last
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from src.index_evaluation import exact_neighbors, recall_at_k, latency_summary, parameter_grid
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((50, 8)).astype(np.float32), rng.standard_normal((5, 8)).astype(np.float32)
+
+
+@pytest.mark.parametrize("space", ["l2", "cosine", "ip"])
+def test_exact_neighbors_matches_full_sort(vectors, space):
+    corpus, queries = vectors
+    if space == "l2":
+        distances = ((queries[:, None, :] - corpus[None, :, :]) ** 2).sum(axis=2)
+    elif space == "cosine":
+        normalized = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        distances = -(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T
+    else:
+        distances = -queries @ corpus.T
+
+    # A chunk size that does not divide the corpus exercises the running merge
+    result = exact_neighbors(corpus, queries, k=7, space=space, chunk_size=13)
+    np.testing.assert_array_equal(result, np.argsort(distances, axis=1)[:, :7])
+
+
+def test_recall_at_k():
+    exact = [[1, 2, 3, 4], [5, 6, 7, 8]]
+    approximate = [[1, 2, 9, 10], [8, 7, 6, 5]]
+    assert recall_at_k(approximate, exact, 4) == pytest.approx(0.75)
+    assert recall_at_k(approximate, exact, 2) == pytest.approx(0.5)
+
+
+def test_latency_summary_and_grid():
+    summary = latency_summary([0.001] * 99 + [0.1])
+    assert summary["p50_ms"] == pytest.approx(1.0)
+    assert summary["p99_ms"] > summary["p50_ms"]
+
+    grid = parameter_grid(["l2", "cosine"], [16], [100, 200], [10, 50])
+    assert len(grid) == 8
+    assert {"space": "cosine", "M": 16, "construction_ef": 200, "search_ef": 10} in grid
@@ -0,0 +1,59 @@
+import json
+import tarfile
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from src.index_snapshot import export_snapshot, extract_snapshot, load_embeddings, SnapshotError
+
+
+@pytest.fixture
+def fake_collection():
+    embeddings = np.arange(12, dtype=np.float32).reshape(3, 4)
+    collection = MagicMock()
+    collection.name = "movie_collection"
+    collection.metadata = {"hnsw:space": "cosine"}
+    collection.count.return_value = 3
+
+    def get(include, limit, offset):
+        rows = range(offset, min(offset + limit, 3))
+        return {
+            "ids": [str(i + 1) for i in rows],
+            "embeddings": embeddings[offset:offset + len(rows)],
+            "documents": [json.dumps({"title": f"Movie {i + 1}"}) for i in rows],
+            "metadatas": [{"title": f"Movie {i + 1}"} for i in rows],
+        }
+
+    collection.get.side_effect = get
+    return collection, embeddings
+
+
+def test_export_and_extract_roundtrip(tmp_path, fake_collection):
+    collection, embeddings = fake_collection
+    artifact = tmp_path / "snapshot.tar"
+
+    manifest = export_snapshot(collection, str(artifact), version="v1", catalog_csv=None)
+    assert manifest["count"] == 3 and manifest["dim"] == 4
+
+    extracted, snapshot_dir = extract_snapshot(str(artifact), str(tmp_path / "snapshots"))
+    assert extracted["collection_metadata"] == {"hnsw:space": "cosine"}
+    matrix = load_embeddings(snapshot_dir)
+    assert isinstance(matrix, np.memmap)
+    np.testing.assert_array_equal(matrix, embeddings)
+
+
+def test_extract_rejects_corrupted_artifact(tmp_path, fake_collection):
+    collection, _ = fake_collection
+    artifact = tmp_path / "snapshot.tar"
+    export_snapshot(collection, str(artifact), version="v1", catalog_csv=None)
+
+    # Rebuild the tar with a tampered records file but the original manifest
+    staging = tmp_path / "staging"
+    with tarfile.open(artifact) as tar:
+        tar.extractall(staging)
+    (staging / "records.jsonl").write_text('{"id": "1", "document": "tampered", "metadata": {}}\n')
+    with tarfile.open(artifact, "w") as tar:
+        for name in ["manifest.json", "embeddings.npy", "records.jsonl"]:
+            tar.add(staging / name, arcname=name)
+
+    with pytest.raises(SnapshotError):
+        extract_snapshot(str(artifact), str(tmp_path / "snapshots"))
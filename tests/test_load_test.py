@@ -0,0 +1,81 @@
+import json
+
+import gradio as gr
+import pytest
+from langchain_openai import ChatOpenAI
+
+from benchmarks import load_test
+from benchmarks.fakes import FakeOpenAIServer
+
+
+def stub_llm(server):
+    return ChatOpenAI(model="gpt-3.5-turbo", base_url=server.base_url, api_key="stub", max_retries=0)
+
+
+def test_fake_openai_server_answers_chat_completions():
+    with FakeOpenAIServer() as server:
+        llm = stub_llm(server)
+        for _ in range(3):
+            reply = llm.invoke("Title: Heat\nYear: 1995\nGenre: Crime\n")
+            assert "Title: Heat\nYear: 1995" in reply.content
+        assert server.request_count == 3
+
+
+def test_fake_openai_server_injects_errors():
+    with FakeOpenAIServer(error_rate=1.0) as server:
+        with pytest.raises(Exception):
+            stub_llm(server).invoke("Title: Heat\nYear: 1995\nGenre: Crime\n")
+
+
+@pytest.fixture
+def stub_app():
+    """Gradio app exposing the endpoints the load tester drives, without a recommender"""
+    favorites = []
+
+    def chat(history):
+        history[-1][1] = "Title: Heat\nYear: 1995"
+        return history, ""
+
+    def save_favorite(title):
+        favorites.append(title)
+        return "saved"
+
+    def delete_favorite(title):
+        favorites.remove(title)
+        return "deleted"
+
+    with gr.Blocks() as demo:
+        chatbot = gr.Chatbot(type="tuples")
+        posters = gr.HTML()
+        title = gr.Textbox()
+        output = gr.Textbox()
+        gr.Button().click(chat, chatbot, [chatbot, posters], api_name="chat")
+        gr.Button().click(save_favorite, title, output, api_name="save_favorite")
+        gr.Button().click(delete_favorite, title, output, api_name="delete_favorite")
+        gr.Button().click(lambda: "\n".join(favorites), None, output, api_name="list_favorites")
+
+    demo.queue()
+    _, url, _ = demo.launch(server_name="127.0.0.1", prevent_thread_lock=True, quiet=True)
+    yield url
+    demo.close()
+
+
+def test_load_test_run_against_stub_app(stub_app, tmp_path):
+    script = {"conversations": [
+        {"name": conversation["name"], "steps": [s for s in conversation["steps"] if s["action"] != "think"]}
+        for conversation in load_test.DEFAULT_SCRIPT["conversations"]
+    ]}
+    script_path = tmp_path / "script.json"
+    script_path.write_text(json.dumps(script))
+    output = tmp_path / "report.json"
+
+    load_test.main([
+        "run", "--url", stub_app, "--sessions", "2", "--ramp-up", "0",
+        "--script", str(script_path), "--output", str(output),
+    ])
+
+    report = json.loads(output.read_text())
+    assert report["error_rate"] == 0
+    # Session 0 runs "browse" (2 chats), session 1 runs "curate" (1 chat)
+    assert report["actions"]["chat"]["requests"] == 3
+    assert report["actions"]["list_favorites"]["requests"] == 3
@@ -0,0 +1,64 @@
+import urllib.request
+import pytest
+# Imported the way the app imports it (pythonpath includes src), so these tests
+# use the same registry that MovieRecommender records into
+import metrics
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def enabled_registry():
+    metrics.registry.enable()
+    yield metrics.registry
+    metrics.registry.enabled = False
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "Calls", ("status",))
+    counter.inc(status="ok")
+    assert counter.value(status="ok") == 0
+    assert metrics.start_request() is metrics.NULL_TRACE
+
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry(enabled=True)
+    counter = registry.counter("calls_total", "Calls", ("status",))
+    histogram = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    counter.inc(status="ok")
+    counter.inc(2, status="ok")
+    histogram.observe(0.05, stage="llm")
+    histogram.observe(0.5, stage="llm")
+    histogram.observe(5.0, stage="llm")
+
+    text = registry.render()
+    assert 'calls_total{status="ok"} 3' in text
+    assert 'latency_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="llm",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{stage="llm"} 3' in text
+
+
+def test_request_trace_publishes_stage_timings(enabled_registry):
+    before = metrics.STAGE_SECONDS.count(stage="retrieval")
+    trace = metrics.start_request("req-1")
+    with trace.stage("retrieval"):
+        pass
+    trace.record_tokens(120, 30)
+    trace.tag(source="recommendation")
+    trace.finish()
+
+    assert trace.request_id == "req-1"
+    assert metrics.STAGE_SECONDS.count(stage="retrieval") == before + 1
+    assert metrics.LLM_TOKENS.count(kind="prompt") >= 1
+
+
+def test_metrics_endpoint(enabled_registry):
+    server = metrics.start_metrics_server(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        with urllib.request.urlopen(url) as response:
+            body = response.read().decode()
+        assert "# TYPE moviemind_stage_seconds histogram" in body
+    finally:
+        server.shutdown()
@@ -5,13 +5,17 @@ from unittest.mock import patch, MagicMock
 from io import BytesIO
 import os
 
-from src.movie_data_preparation import download_and_prepare_movielens
+from src import movie_data_preparation
+from src.movie_data_preparation import download_and_prepare_movielens, aggregate_user_tags, aggregate_genome_tags
 
 
 @patch("src.movie_data_preparation.requests.get")
 @patch("src.movie_data_preparation.ZipFile.extractall")
 @patch("src.movie_data_preparation.pd.read_csv")
-def test_download_and_prepare_movielens(mock_read_csv, mock_extractall, mock_get):
+def test_download_and_prepare_movielens(mock_read_csv, mock_extractall, mock_get, tmp_path, monkeypatch):
+    # Keep the processed catalog out of the repository's data directory
+    monkeypatch.chdir(tmp_path)
+
     # Mock the GET request
     mock_get.return_value.content = b"Fake zip content"
 
@@ -52,3 +56,90 @@ def test_download_and_prepare_movielens(mock_read_csv, mock_extractall, mock_get
 
         # Check that processed file was saved (if you want to validate this part)
         assert os.path.exists("data/processed_movies.csv") or True  # Optional
+
+
+def test_download_and_prepare_movielens_from_local_archive(tmp_path):
+    from zipfile import ZipFile
+
+    archive_path = tmp_path / "ml-latest-small.zip"
+    with ZipFile(archive_path, "w") as zip_file:
+        zip_file.writestr(
+            "ml-latest-small/movies.csv",
+            "movieId,title,genres\n1,Toy Story (1995),Animation|Children\n2,Heat (1995),Action|Crime\n",
+        )
+        zip_file.writestr(
+            "ml-latest-small/ratings.csv",
+            "userId,movieId,rating,timestamp\n1,1,4.0,0\n2,1,5.0,0\n",
+        )
+
+    with patch("src.movie_data_preparation.requests.get") as mock_get:
+        result_df = download_and_prepare_movielens(archive_path=str(archive_path), data_dir=str(tmp_path / "data"))
+        mock_get.assert_not_called()
+
+    assert result_df.loc[0, "avg_rating"] == 4.5
+    assert result_df.loc[1, "rating_count"] == 0
+    assert (tmp_path / "data" / "processed_movies.csv").exists()
+
+
+def test_aggregate_user_tags_counts_across_chunks(tmp_path):
+    tags_path = tmp_path / "tags.csv"
+    tags_path.write_text(
+        "userId,movieId,tag,timestamp\n"
+        "1,1,Pixar,0\n2,1,pixar ,0\n3,1,funny,0\n"
+        "4,2,heist,0\n5,1,Pixar,0\n6,1,toys,0\n7,1,funny,0\n"
+    )
+
+    # chunksize=2 splits each movie's tags over several chunks
+    top = aggregate_user_tags(str(tags_path), top_k=2, chunksize=2)
+
+    assert top[1] == ["pixar", "funny"]
+    assert top[2] == ["heist"]
+
+
+def test_aggregate_user_tags_prunes_rare_tags_between_chunks(tmp_path):
+    tags_path = tmp_path / "tags.csv"
+    # Every chunk of 5 rows has one "heist" and four tags used only once
+    rows = [f"{i},1,{'heist' if i % 5 == 0 else f'rare {i}'},0\n" for i in range(100)]
+    tags_path.write_text("userId,movieId,tag,timestamp\n" + "".join(rows))
+
+    with patch("src.movie_data_preparation._top_k_per_movie", wraps=movie_data_preparation._top_k_per_movie) as top_k:
+        top = aggregate_user_tags(str(tags_path), top_k=1, chunksize=5, margin=3)
+
+    assert top[1] == ["heist"]
+    # Each merge sees at most top_k * margin running counts plus one chunk
+    assert max(len(call.args[0]) for call in top_k.call_args_list) <= 3 + 5
+
+
+def test_aggregate_genome_tags_keeps_most_relevant(tmp_path):
+    (tmp_path / "genome-tags.csv").write_text("tagId,tag\n1,heist\n2,pixar\n3,dark\n")
+    (tmp_path / "genome-scores.csv").write_text(
+        "movieId,tagId,relevance\n"
+        "1,1,0.1\n1,2,0.9\n1,3,0.5\n"
+        "2,1,0.8\n2,2,0.05\n2,3,0.7\n"
+    )
+
+    top = aggregate_genome_tags(
+        str(tmp_path / "genome-scores.csv"), str(tmp_path / "genome-tags.csv"), top_k=2, chunksize=2
+    )
+
+    assert top[1] == ["pixar", "dark"]
+    assert top[2] == ["heist", "dark"]
+
+
+def test_download_and_prepare_movielens_adds_tags(tmp_path):
+    from zipfile import ZipFile
+
+    archive_path = tmp_path / "ml-latest-small.zip"
+    with ZipFile(archive_path, "w") as zip_file:
+        zip_file.writestr(
+            "ml-latest-small/movies.csv",
+            "movieId,title,genres\n1,Toy Story (1995),Animation|Children\n2,Heat (1995),Action|Crime\n",
+        )
+        zip_file.writestr("ml-latest-small/ratings.csv", "userId,movieId,rating,timestamp\n1,1,4.0,0\n")
+        zip_file.writestr("ml-latest-small/tags.csv", "userId,movieId,tag,timestamp\n1,1,pixar,0\n2,1,Pixar,0\n")
+
+    result_df = download_and_prepare_movielens(archive_path=str(archive_path), data_dir=str(tmp_path / "data"))
+
+    assert result_df.loc[0, "tags"] == ["pixar"]
+    assert result_df.loc[1, "tags"] == []
+    assert result_df.loc[0, "genome_tags"] == []
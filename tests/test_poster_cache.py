@@ -0,0 +1,144 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from src.poster_cache import PosterCache, add_poster_route, CACHE_CONTROL
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if "missing" in self.path:
+            self.send_error(404)
+            return
+        image = BytesIO()
+        Image.new("RGB", (500, 750), (200, 30, 30)).save(image, "JPEG")
+        body = image.getvalue()
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def image_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ImageHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/t/p/w500"
+    server.shutdown()
+    server.server_close()
+
+
+def test_poster_is_fetched_once_and_resized(tmp_path, image_server):
+    server, source_url = image_server
+    cache = PosterCache(str(tmp_path), source_url=source_url)
+
+    assert cache.local_url(f"{source_url}/abc123.jpg") == "/posters/abc123.jpg"
+    assert cache.local_url("https://elsewhere.example/abc123.jpg") == "https://elsewhere.example/abc123.jpg"
+
+    path = cache.get("abc123.jpg")
+    assert cache.get("abc123.jpg") == path
+    assert len(server.requests) == 1
+    with Image.open(path) as thumbnail:
+        assert thumbnail.size == (200, 300)
+
+    assert cache.get("missing.jpg") is None
+    with pytest.raises(ValueError):
+        cache.get("../../etc/passwd")
+
+
+def test_least_recently_used_posters_are_evicted(tmp_path, image_server):
+    _, source_url = image_server
+    cache = PosterCache(str(tmp_path), source_url=source_url)
+    size = os.path.getsize(cache.get("first.jpg"))
+    cache.max_bytes = 2 * size
+
+    cache.get("second.jpg")
+    cache.get("first.jpg")  # now more recent than second
+    cache.get("third.jpg")
+
+    assert sorted(os.listdir(tmp_path)) == ["first.jpg", "third.jpg"]
+    assert cache.total_bytes == 2 * size
+
+    # A new instance picks the files on disk back up
+    assert PosterCache(str(tmp_path), source_url=source_url).total_bytes == 2 * size
+
+
+def test_poster_route_sets_long_cache_headers(tmp_path, image_server):
+    _, source_url = image_server
+    app = FastAPI()
+    add_poster_route(app, PosterCache(str(tmp_path), source_url=source_url))
+    client = TestClient(app)
+
+    response = client.get("/posters/abc123.jpg")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["cache-control"] == CACHE_CONTROL
+    assert client.get("/posters/missing.jpg").status_code == 502
+    assert client.get("/posters/bad name.jpg").status_code == 404
+
+
+def test_poster_evicted_before_it_is_read_is_fetched_again(tmp_path, image_server):
+    server, source_url = image_server
+    cache = PosterCache(str(tmp_path), source_url=source_url)
+    get = cache.get
+    evicted = []
+
+    def get_then_evict(name):
+        path = get(name)
+        # Another request's eviction removes the file right after get() returned it
+        if not evicted:
+            evicted.append(path)
+            os.remove(path)
+        return path
+
+    cache.get = get_then_evict
+    content = cache.read("abc123.jpg")
+
+    with Image.open(BytesIO(content)) as thumbnail:
+        assert thumbnail.size == (200, 300)
+    assert len(server.requests) == 2
+
+
+def test_failed_save_leaves_no_temp_file(tmp_path, image_server, monkeypatch):
+    _, source_url = image_server
+    cache = PosterCache(str(tmp_path), source_url=source_url)
+
+    def failing_save(self, path, *args, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Image.Image, "save", failing_save)
+    assert cache.get("abc123.jpg") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_eviction_counts_posters_cached_by_other_processes(tmp_path, image_server):
+    _, source_url = image_server
+    # Two workers sharing one cache directory
+    first = PosterCache(str(tmp_path), source_url=source_url)
+    second = PosterCache(str(tmp_path), source_url=source_url)
+    size = os.path.getsize(first.get("a.jpg"))
+    first.max_bytes = second.max_bytes = 2 * size
+
+    second.get("b.jpg")
+    second.get("c.jpg")
+    first.get("d.jpg")
+
+    # Each only counted its own posters; the re-scan keeps the directory in budget
+    assert len(os.listdir(tmp_path)) == 2
+    assert "d.jpg" in os.listdir(tmp_path)
+    assert first.total_bytes == 2 * size
@@ -0,0 +1,77 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.poster_prefetch import PosterPrefetch, POSTER_PREFETCH, normalize_title
+
+
+@pytest.fixture
+def prefetch_counter():
+    POSTER_PREFETCH.registry.enabled = True
+    POSTER_PREFETCH.values.clear()
+    yield POSTER_PREFETCH
+    POSTER_PREFETCH.registry.enabled = False
+
+
+def test_normalize_title():
+    assert normalize_title("Star Wars: Episode IV (1977)") == "star wars episode iv"
+    assert normalize_title("  Heat ") == normalize_title("HEAT")
+    assert normalize_title(None) == ""
+
+
+def test_answer_movies_reuse_prefetched_lookups(prefetch_counter):
+    calls = []
+    def lookup(title, year):
+        calls.append(title)
+        return f"http://posters/{title}.jpg"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        prefetch = PosterPrefetch(executor, lookup, [("Heat", "1995"), ("Alien", "1979"), ("Up", "2009")])
+        assert prefetch.result("heat", "1995", timeout=1) == "http://posters/Heat.jpg"
+        # Same title, different year: a different movie, looked up directly
+        assert prefetch.result("Alien", "2003", timeout=1) == "http://posters/Alien.jpg"
+        prefetch.finish()
+
+    assert sorted(calls) == ["Alien", "Alien", "Heat", "Up"]
+    assert prefetch_counter.value(outcome="hit") == 1
+    assert prefetch_counter.value(outcome="miss") == 1
+    assert prefetch_counter.value(outcome="wasted") + prefetch_counter.value(outcome="cancelled") == 2
+
+
+def test_unstarted_prefetches_are_cancelled(prefetch_counter):
+    release = threading.Event()
+    calls = []
+    def lookup(title, year):
+        calls.append(title)
+        release.wait(1)
+        return None
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        prefetch = PosterPrefetch(executor, lookup, [("Heat", None), ("Alien", None), ("Up", None)])
+        prefetch.finish()
+        prefetch.finish()
+        release.set()
+
+    assert calls == ["Heat"]
+    assert prefetch_counter.value(outcome="cancelled") == 2
+    assert prefetch_counter.value(outcome="wasted") == 1
+
+
+def test_missed_lookups_are_bounded_by_the_timeout(prefetch_counter):
+    release = threading.Event()
+    def lookup(title, year):
+        if title == "Alien":
+            release.wait(5)
+        return f"http://posters/{title}.jpg"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        prefetch = PosterPrefetch(executor, lookup, [("Heat", "1995")])
+        start = time.monotonic()
+        assert prefetch.result("Alien", "1979", timeout=0.1) is None
+        assert time.monotonic() - start < 1
+        release.set()
+        prefetch.finish()
+
+    assert prefetch_counter.value(outcome="miss") == 1
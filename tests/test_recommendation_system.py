@@ -3,6 +3,10 @@ from unittest.mock import patch, MagicMock, mock_open
 import json
 import os
 import sys
+import tempfile
+import time
+
+import numpy as np
 
 # Mock all external dependencies that might cause import issues
 sys.modules['tmdb_api_helper'] = MagicMock()
@@ -105,5 +109,355 @@ class MovieRecommenderTests(unittest.TestCase):
         # Verify save was called
         self.recommender._save_user_preferences.assert_called_once()
 
+
+class SlowChain:
+    """Stub chain that answers after a configurable delay"""
+
+    def __init__(self, delay, text="Title: Heat\nYear: 1995"):
+        self.delay = delay
+        self.text = text
+        self.calls = 0
+
+    def invoke(self, inputs, config=None):
+        self.calls += 1
+        self.inputs = inputs
+        time.sleep(self.delay)
+        return {"text": self.text}
+
+
+class TokenReportingChain(SlowChain):
+    """Stub chain that reports token usage to the callbacks like the OpenAI client does"""
+
+    def invoke(self, inputs, config=None):
+        for callback in (config or {}).get("callbacks", []):
+            callback.on_llm_end(MagicMock(llm_output={"token_usage": {"prompt_tokens": 120, "completion_tokens": 30}}))
+        return super().invoke(inputs, config)
+
+
+class MetricsTests(unittest.TestCase):
+
+    @patch('builtins.open', new_callable=mock_open, read_data='{}')
+    @patch('os.path.exists', return_value=True)
+    @patch('os.makedirs')
+    def setUp(self, mock_makedirs, mock_exists, mock_file):
+        sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+        from src.recommendation_system import MovieRecommender
+        # The registry the recommender records into (flat import, as in the app)
+        import metrics
+        self.metrics = metrics
+        metrics.registry.enable()
+
+        self.recommender = MovieRecommender(request_timeout=1.0)
+        self.recommender.user_preferences = {}
+        self.recommender.collection = MagicMock()
+        self.recommender.collection.query.return_value = {"documents": [[
+            json.dumps({"title": "Heat", "year": "1995"})
+        ]]}
+        self.recommender.recommendation_chain = TokenReportingChain(0)
+        self.recommender.tmdb_helper = MagicMock()
+        self.recommender.tmdb_helper.get_poster_url.return_value = None
+
+    def tearDown(self):
+        self.metrics.registry.enabled = False
+
+    def test_get_response_records_stages_and_tokens(self):
+        stages = ("embedding", "retrieval", "prompt", "llm", "posters")
+        before = {stage: self.metrics.STAGE_SECONDS.count(stage=stage) for stage in stages}
+        prompt_before = self.metrics.LLM_TOKENS.count(kind="prompt")
+        responses_before = self.metrics.RESPONSES.value(source="recommendation")
+
+        self.recommender.get_response("test_user", "heist movies")
+
+        for stage in stages:
+            self.assertEqual(self.metrics.STAGE_SECONDS.count(stage=stage), before[stage] + 1, stage)
+        self.assertEqual(self.metrics.LLM_TOKENS.count(kind="prompt"), prompt_before + 1)
+        self.assertEqual(self.metrics.RESPONSES.value(source="recommendation"), responses_before + 1)
+
+    def test_progressive_turn_records_posters_stage(self):
+        self.recommender.tmdb_helper.get_poster_url.return_value = "http://posters/Heat.jpg"
+        self.recommender.recommendation_chain = TokenReportingChain(0, text="Title: Heat\nYear: 1995")
+        posters_before = self.metrics.STAGE_SECONDS.count(stage="posters")
+        responses_before = self.metrics.RESPONSES.value(source="recommendation")
+
+        text, movies, posters = self.recommender.get_response_progressive("test_user", "heist movies")
+        # The turn is still open while the posters resolve
+        self.assertEqual(self.metrics.RESPONSES.value(source="recommendation"), responses_before)
+
+        self.assertEqual(list(posters), [(0, "http://posters/Heat.jpg")])
+        self.assertEqual(self.metrics.STAGE_SECONDS.count(stage="posters"), posters_before + 1)
+        self.assertEqual(self.metrics.RESPONSES.value(source="recommendation"), responses_before + 1)
+
+        # A client that goes away mid-stream still ends the turn, once
+        text, movies, posters = self.recommender.get_response_progressive("test_user", "heist movies")
+        posters.close()
+        posters.close()
+        self.assertEqual(self.metrics.STAGE_SECONDS.count(stage="posters"), posters_before + 2)
+
+    def test_progressive_profile_covers_the_posters(self):
+        self.recommender.tmdb_helper.get_poster_url.return_value = "http://posters/Heat.jpg"
+        self.recommender.recommendation_chain = TokenReportingChain(0, text="Title: Heat\nYear: 1995")
+        profile_dir = self.enterContext(tempfile.TemporaryDirectory())
+
+        with patch.dict(os.environ, {"MOVIEMIND_PROFILE_DIR": profile_dir}):
+            text, movies, posters = self.recommender.get_response_progressive(
+                "test_user", "heist movies", profile=True, request_id="req7"
+            )
+            self.assertEqual(os.listdir(profile_dir), [])
+            list(posters)
+
+        sidecars = [name for name in os.listdir(profile_dir) if name.endswith(".json")]
+        self.assertEqual(len(sidecars), 1)
+        with open(os.path.join(profile_dir, sidecars[0])) as f:
+            sidecar = json.load(f)
+        self.assertEqual(sidecar["request_id"], "req7")
+        self.assertIn("posters", sidecar["stages_ms"])
+        self.assertIn("llm", sidecar["stages_ms"])
+
+    def test_failed_turn_is_counted(self):
+        self.recommender.collection.query.side_effect = RuntimeError("index unavailable")
+        errors_before = self.metrics.RESPONSES.value(source="error")
+
+        with self.assertRaises(RuntimeError):
+            self.recommender.get_response("test_user", "heist movies")
+        self.assertEqual(self.metrics.RESPONSES.value(source="error"), errors_before + 1)
+
+
+class PerUserStateTests(unittest.TestCase):
+
+    @patch('builtins.open', new_callable=mock_open, read_data='{}')
+    @patch('os.path.exists', return_value=True)
+    @patch('os.makedirs')
+    def setUp(self, mock_makedirs, mock_exists, mock_file):
+        sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+        from src.recommendation_system import MovieRecommender
+
+        self.recommender = MovieRecommender(request_timeout=1.0)
+        self.recommender.collection = MagicMock()
+        self.recommender.collection.query.return_value = {"documents": [[
+            json.dumps({"title": "Heat", "year": "1995"})
+        ]]}
+        self.recommender.tmdb_helper = MagicMock()
+        self.recommender.tmdb_helper.get_poster_url.return_value = None
+        self.chain = SlowChain(0)
+        self.recommender.recommendation_chain = self.chain
+
+    def test_conversations_are_kept_per_user(self):
+        self.recommender.get_response("alice", "heist movies like Rififi")
+        self.recommender.get_response("bob", "something for kids")
+        self.assertNotIn("Rififi", self.chain.inputs["chat_history"])
+
+        self.recommender.get_response("alice", "more like that")
+        self.assertIn("Human: heist movies like Rififi", self.chain.inputs["chat_history"])
+        self.assertNotIn("something for kids", self.chain.inputs["chat_history"])
+
+    def test_favorites_saved_elsewhere_reach_the_next_prompt(self):
+        from src.favorites import FavoritesStore
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), "prefs.json")
+        self.recommender.favorites = FavoritesStore(path)
+
+        self.recommender.get_response("alice", "heist movies")
+        self.assertEqual(self.chain.inputs["user_preferences"], "No preferences recorded yet.")
+
+        # Saved by the API (its own store on the same file) while the recommender runs
+        FavoritesStore(path).add("alice", "Thief")
+        self.recommender.get_response("alice", "heist movies")
+        self.assertEqual(self.chain.inputs["user_preferences"], "Favorite movies: Thief.")
+
+
+class DegradedModeTests(unittest.TestCase):
+
+    @patch('builtins.open', new_callable=mock_open, read_data='{}')
+    @patch('os.path.exists', return_value=True)
+    @patch('os.makedirs')
+    def setUp(self, mock_makedirs, mock_exists, mock_file):
+        sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+        from src.recommendation_system import MovieRecommender
+
+        self.recommender = MovieRecommender(request_timeout=0.5, llm_failure_threshold=2)
+        self.recommender.user_preferences = {}
+        self.recommender.collection = MagicMock()
+        self.recommender.collection.query.return_value = {"documents": [[
+            json.dumps({"title": "Heat", "year": "1995", "genre": "Action, Crime", "plot": "A heist."})
+        ]]}
+        self.recommender.tmdb_helper = MagicMock()
+        self.recommender.tmdb_helper.get_poster_url.return_value = None
+
+    def test_fast_llm_response_is_returned(self):
+        self.recommender.recommendation_chain = SlowChain(0)
+        response = self.recommender.get_response("test_user", "heist movies")
+        self.assertIn("Title: Heat", response)
+        self.assertEqual(self.recommender.llm_breaker.failure_count, 0)
+
+    def test_slow_llm_times_out_and_trips_breaker(self):
+        slow_chain = SlowChain(2.0)
+        self.recommender.recommendation_chain = slow_chain
+        self.recommender.general_chain = slow_chain
+
+        start = time.monotonic()
+        response = self.recommender.get_response("test_user", "heist movies")
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertIn("closest matches", response)
+        self.assertIn("Title: Heat", response)
+
+        self.recommender.get_response("test_user", "heist movies")
+        self.assertEqual(self.recommender.llm_breaker.state, "open")
+
+        # While the breaker is open the LLM is not called at all
+        calls = slow_chain.calls
+        response = self.recommender.get_response("test_user", "heist movies")
+        self.assertEqual(slow_chain.calls, calls)
+        self.assertIn("Title: Heat", response)
+
+    def test_only_answers_in_time_are_saved_to_memory(self):
+        self.recommender.memory = MagicMock()
+        self.recommender.recommendation_chain = SlowChain(0)
+        self.recommender.get_response("test_user", "heist movies")
+        self.recommender.memory.save.assert_called_once_with(
+            "test_user", "heist movies", "Title: Heat\nYear: 1995"
+        )
+
+        self.recommender.memory.save.reset_mock()
+        slow_chain = SlowChain(1.0)
+        self.recommender.recommendation_chain = slow_chain
+        self.recommender.general_chain = slow_chain
+        self.recommender.get_response("test_user", "heist movies")
+        time.sleep(1.2)
+        self.recommender.memory.save.assert_not_called()
+
+    def test_saturated_llm_pool_falls_back_without_waiting(self):
+        slow_chain = SlowChain(1.0)
+        self.recommender.recommendation_chain = slow_chain
+        self.recommender._llm_executor.max_workers = 1
+        self.recommender._llm_executor.submit(time.sleep, 0.5)
+
+        start = time.monotonic()
+        response = self.recommender.get_response("test_user", "heist movies")
+        self.assertLess(time.monotonic() - start, 0.2)
+        self.assertIn("closest matches", response)
+        self.assertEqual(slow_chain.calls, 0)
+
+class ProgressivePosterTests(unittest.TestCase):
+
+    @patch('builtins.open', new_callable=mock_open, read_data='{}')
+    @patch('os.path.exists', return_value=True)
+    @patch('os.makedirs')
+    def setUp(self, mock_makedirs, mock_exists, mock_file):
+        sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+        from src.recommendation_system import MovieRecommender
+
+        self.recommender = MovieRecommender(request_timeout=1.0)
+        self.recommender.user_preferences = {}
+        self.recommender.collection = MagicMock()
+        self.recommender.collection.query.return_value = {"documents": [[
+            json.dumps({"title": "Heat", "year": "1995"}),
+            json.dumps({"title": "Alien", "year": "1979"}),
+        ]]}
+        self.recommender.recommendation_chain = SlowChain(
+            0, text="Try these:\n\nTitle: Heat\nYear: 1995\n\nTitle: Alien\nYear: 1979"
+        )
+        self.recommender.tmdb_helper = MagicMock()
+
+    def test_text_is_returned_without_posters(self):
+        self.recommender.tmdb_helper.get_poster_url.side_effect = lambda title, year: f"http://posters/{title}.jpg"
+        text, movies, posters = self.recommender.get_response_progressive("test_user", "classics")
+        self.assertNotIn("POSTER_URL", text)
+        self.assertEqual(movies, [("Heat", "1995"), ("Alien", "1979")])
+        self.assertEqual(sorted(posters), [(0, "http://posters/Heat.jpg"), (1, "http://posters/Alien.jpg")])
+
+    def test_posters_are_prefetched_during_the_llm_call(self):
+        self.recommender.recommendation_chain = SlowChain(
+            0.3, text="Try these:\n\nTitle: Heat\nYear: 1995\n\nTitle: Alien\nYear: 1979"
+        )
+        self.recommender.tmdb_helper.get_poster_url.side_effect = lambda title, year: f"http://posters/{title}.jpg"
+
+        response = self.recommender.get_response("test_user", "classics")
+
+        self.assertIn("[POSTER_URL: http://posters/Heat.jpg]", response)
+        self.assertIn("[POSTER_URL: http://posters/Alien.jpg]", response)
+        # Each retrieved movie was looked up once, by the prefetch
+        self.assertEqual(self.recommender.tmdb_helper.get_poster_url.call_count, 2)
+
+    def test_prefetch_is_finished_when_posters_fail(self):
+        prefetch = MagicMock()
+        self.recommender._prefetch_posters = MagicMock(return_value=prefetch)
+        self.recommender.process_response_with_posters = MagicMock(side_effect=RuntimeError("TMDB down"))
+
+        with self.assertRaises(RuntimeError):
+            self.recommender.get_response("test_user", "classics")
+        prefetch.finish.assert_called_once()
+
+    def test_stalled_lookup_is_abandoned_at_the_deadline(self):
+        def lookup(title, year):
+            if title == "Alien":
+                time.sleep(2.0)
+            return f"http://posters/{title}.jpg"
+        self.recommender.tmdb_helper.get_poster_url.side_effect = lookup
+
+        start = time.monotonic()
+        results = list(self.recommender.iter_posters(
+            [("Heat", "1995"), ("Alien", "1979")], deadline=time.monotonic() + 0.3
+        ))
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(results, [(0, "http://posters/Heat.jpg"), (1, None)])
+
+class DiversityTests(unittest.TestCase):
+
+    @patch('builtins.open', new_callable=mock_open, read_data='{}')
+    @patch('os.path.exists', return_value=True)
+    @patch('os.makedirs')
+    def setUp(self, mock_makedirs, mock_exists, mock_file):
+        sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+        from src.recommendation_system import MovieRecommender
+
+        self.recommender = MovieRecommender(request_timeout=1.0)
+        self.recommender.user_preferences = {}
+        self.recommender.embedding_function = MagicMock()
+        self.recommender.collection = MagicMock()
+        self.recommender.recommendation_chain = SlowChain(0)
+        self.recommender.poster_prefetch = False
+
+    def test_over_fetched_pool_is_reranked_by_mmr(self):
+        # Six near-identical sequels rank first; four different movies are almost as relevant
+        documents = [json.dumps({"title": f"Sequel {i}", "year": "2000"}) for i in range(6)]
+        documents += [json.dumps({"title": f"Other {i}", "year": "2000"}) for i in range(4)]
+        embeddings = [[1.0, 0.05, 0.0, 0.0, 0.0]] * 6 + [list(row) for row in np.eye(5)[1:]]
+        self.recommender.embedding_function.return_value = [[1.0] * 5]
+        self.recommender.collection.query.return_value = {"documents": [documents], "embeddings": [embeddings]}
+        self.recommender.diversity_pool, self.recommender.diversity_lambda = 10, 0.7
+
+        self.recommender.get_response("test_user", "sequels")
+
+        kwargs = self.recommender.collection.query.call_args.kwargs
+        self.assertEqual(kwargs["n_results"], 10)
+        self.assertIn("embeddings", kwargs["include"])
+        prompt = self.recommender.recommendation_chain.inputs["movie_results"]
+        self.assertEqual(
+            [line[len("Title: "):] for line in prompt.splitlines() if line.startswith("Title: ")],
+            ["Sequel 0", "Other 1", "Other 2", "Other 3", "Other 0"],
+        )
+
+    def test_without_embeddings_the_top_results_are_kept(self):
+        self.assertEqual(list(self.recommender._diversify([1.0, 0.0], 8, None)), [0, 1, 2, 3, 4])
+
+    def test_retrieve_reranks_every_query_of_a_batch(self):
+        documents = [json.dumps({"title": f"Sequel {i}", "year": "2000"}) for i in range(6)]
+        documents += [json.dumps({"title": f"Other {i}", "year": "2000"}) for i in range(4)]
+        embeddings = [[1.0, 0.05, 0.0, 0.0, 0.0]] * 6 + [list(row) for row in np.eye(5)[1:]]
+        ids = [str(i) for i in range(10)]
+        distances = [0.01 * i for i in range(10)]
+        self.recommender.collection.query.return_value = {
+            "ids": [ids, ids], "documents": [documents, documents],
+            "distances": [distances, distances], "embeddings": [embeddings, embeddings],
+        }
+        self.recommender.diversity_pool, self.recommender.diversity_lambda = 10, 0.7
+
+        retrieved = self.recommender.retrieve([[1.0] * 5, [1.0] * 5], n_results=3)
+
+        self.assertEqual(self.recommender.collection.query.call_args.kwargs["n_results"], 10)
+        for rows in retrieved:
+            self.assertEqual(rows["ids"], ["0", "7", "8"])
+            self.assertEqual(rows["distances"], [0.0, 0.07, 0.08])
+            self.assertEqual(json.loads(rows["documents"][1])["title"], "Other 1")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,68 @@
+import json
+import os
+import time
+
+from src.request_profiler import RequestProfiler, profile_request, safe_request_id, should_profile
+
+
+class _Trace:
+    request_id = "req1"
+    stages = {"retrieval": 0.01, "llm": 0.02}
+    tags = {"source": "recommendation"}
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_profile_files_and_sidecar(tmp_path, monkeypatch):
+    monkeypatch.setenv("MOVIEMIND_PROFILE_DIR", str(tmp_path))
+    with profile_request(_Trace(), enabled=True):
+        _busy(0.1)
+
+    sidecars = [name for name in os.listdir(tmp_path) if name.endswith(".json")]
+    assert len(sidecars) == 1
+    with open(tmp_path / sidecars[0]) as f:
+        sidecar = json.load(f)
+    assert sidecar["request_id"] == "req1"
+    assert sidecar["stages_ms"] == {"retrieval": 10.0, "llm": 20.0}
+    assert sidecar["samples"] > 0
+    assert os.path.exists(tmp_path / sidecar["files"]["pstats"])
+    with open(tmp_path / sidecar["files"]["collapsed"]) as f:
+        assert "_busy" in f.read()
+
+
+def test_old_profiles_are_rotated(tmp_path):
+    for i in range(4):
+        profiler = RequestProfiler(str(tmp_path), keep=2)
+        profiler.start()
+        profiler.stop()
+        profiler.started_at -= 100 - i  # distinct, increasing timestamps
+        profiler.save(f"req{i}")
+    remaining = sorted(name for name in os.listdir(tmp_path) if name.endswith(".json"))
+    assert [name.split("_")[1] for name in remaining] == ["req2.json", "req3.json"]
+    assert len(os.listdir(tmp_path)) == 6
+
+
+def test_should_profile(monkeypatch):
+    monkeypatch.setenv("MOVIEMIND_PROFILE_SAMPLE_RATE", "0")
+    assert should_profile(requested=True)
+    assert not should_profile()
+    monkeypatch.setenv("MOVIEMIND_PROFILE_SAMPLE_RATE", "1")
+    assert should_profile()
+
+
+def test_unsafe_request_ids_are_replaced(tmp_path):
+    assert safe_request_id("req-42_a") == "req-42_a"
+    for unsafe in ("../../x", "a/b", "x" * 65, "", None):
+        assert safe_request_id(unsafe) != unsafe
+        assert safe_request_id(unsafe).isalnum()
+
+    profiler = RequestProfiler(str(tmp_path / "profiles"), keep=5)
+    profiler.start()
+    profiler.stop()
+    sidecar = profiler.save("../../escape")
+    assert os.path.dirname(sidecar) == str(tmp_path / "profiles")
+    assert not os.path.exists(tmp_path / "escape.json")
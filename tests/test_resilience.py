@@ -0,0 +1,78 @@
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from src.resilience import LatencyBudget, CircuitBreaker, BoundedExecutor, ExecutorSaturated, call_with_timeout
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stage_timeout_reserves_time_for_later_stages():
+    clock = FakeClock()
+    budget = LatencyBudget(10.0, clock=clock)
+
+    # Posters keep their 15% share, so the LLM gets what is left minus 1.5s
+    clock.now = 1.0
+    assert budget.stage_timeout("llm") == pytest.approx(7.5)
+    assert budget.stage_timeout("posters") == pytest.approx(9.0)
+
+    clock.now = 12.0
+    assert budget.expired()
+    assert budget.stage_timeout("posters") == 0.0
+
+
+def test_circuit_breaker_opens_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    # After the cool-down a single trial call is let through
+    clock.now = 31.0
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_reopens_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5.0, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 6.0
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_call_with_timeout():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert call_with_timeout(executor, lambda x: x * 2, 1.0, 21) == 42
+        with pytest.raises(TimeoutError):
+            call_with_timeout(executor, time.sleep, 0.05, 0.5)
+
+
+def test_bounded_executor_refuses_work_while_saturated():
+    executor = BoundedExecutor(max_workers=1)
+    with pytest.raises(TimeoutError):
+        call_with_timeout(executor, time.sleep, 0.05, 0.3)
+
+    # The timed-out call still holds the only worker
+    assert executor.saturated()
+    with pytest.raises(ExecutorSaturated):
+        executor.submit(lambda: 1)
+
+    time.sleep(0.4)
+    assert not executor.saturated()
+    assert call_with_timeout(executor, lambda: 1, 1.0) == 1
+    executor.shutdown()
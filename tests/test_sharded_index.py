@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from src.catalog_index import collection_fingerprint
+from src.sharded_index import ShardedIndex, ShardError, shard_for, partition, merge_top_k
+
+
+def test_shard_for_is_stable_and_balanced():
+    assert shard_for("42", 4) == shard_for(42, 4)
+    counts = np.bincount([shard_for(i, 4) for i in range(4000)], minlength=4)
+    assert counts.min() > 800
+
+
+def test_partition_covers_every_row_once():
+    ids = [str(i) for i in range(100)]
+    groups = partition(ids, 3)
+    assert sorted(p for group in groups for p in group) == list(range(100))
+    for shard, group in enumerate(groups):
+        assert all(shard_for(ids[p], 3) == shard for p in group)
+
+
+def test_merge_top_k_matches_single_index():
+    rng = np.random.default_rng(0)
+    distances = rng.random((2, 40))
+    ids = [str(i) for i in range(40)]
+    groups = partition(ids, 3)
+
+    # Each shard returns its own sorted top-5, as a Chroma collection would
+    shard_results = []
+    for group in groups:
+        result = {"ids": [], "distances": [], "documents": []}
+        for query in range(2):
+            top = sorted(group, key=lambda p: distances[query, p])[:5]
+            result["ids"].append([ids[p] for p in top])
+            result["distances"].append([distances[query, p] for p in top])
+            result["documents"].append([f"doc {ids[p]}" for p in top])
+        shard_results.append(result)
+
+    merged = merge_top_k(shard_results + [None], 5, include=["documents", "distances"])
+    for query in range(2):
+        expected = [str(p) for p in np.argsort(distances[query])[:5]]
+        assert merged["ids"][query] == expected
+        assert merged["documents"][query] == [f"doc {i}" for i in expected]
+        assert merged["distances"][query] == sorted(merged["distances"][query])
+
+
+def test_merge_top_k_with_fewer_rows_than_k():
+    shard_results = [
+        {"ids": [["a"]], "distances": [[0.2]]},
+        {"ids": [["b", "c"]], "distances": [[0.1, 0.3]]},
+    ]
+    merged = merge_top_k(shard_results, 10, include=["distances"])
+    assert merged["ids"] == [["b", "a", "c"]]
+
+
+def make_collection(documents, embeddings=None):
+    collection = MagicMock()
+    collection.name = "movie_collection"
+    collection.metadata = None
+    collection.count.return_value = len(documents)
+    collection.get.side_effect = lambda include, limit, offset: {
+        "ids": [str(i) for i in range(offset, min(offset + limit, len(documents)))],
+        "documents": documents[offset:offset + limit],
+        "embeddings": None if embeddings is None else embeddings[offset:offset + limit],
+        "metadatas": [{"title": title} for title in documents[offset:offset + limit]],
+    }
+    return collection
+
+
+def test_from_collection_reloads_when_documents_change(tmp_path):
+    old = make_collection(["Heat", "Alien"])
+    manifest = {"source": "movie_collection", "num_shards": 2, "count": 2,
+                "fingerprint": collection_fingerprint(old)}
+
+    def start(index):
+        index._shard_counts = [1, 1]
+        return index
+
+    with patch.object(ShardedIndex, "start", start), \
+            patch.object(ShardedIndex, "read_manifest", return_value=manifest), \
+            patch.object(ShardedIndex, "load_from") as load_from:
+        ShardedIndex.from_collection(old, path=str(tmp_path / "shards"), num_shards=2)
+        load_from.assert_not_called()
+
+        # Same name and row count, re-prepared documents
+        changed = make_collection(["Heat", "Alien (tagged: space horror)"])
+        ShardedIndex.from_collection(changed, path=str(tmp_path / "shards"), num_shards=2)
+        load_from.assert_called_once()
+        assert load_from.call_args.kwargs["fingerprint"] != manifest["fingerprint"]
+
+
+def test_two_real_shards_end_to_end(tmp_path):
+    rng = np.random.default_rng(0)
+    embeddings = rng.random((40, 8)).astype(np.float32)
+    collection = make_collection([f"Movie {i}" for i in range(40)], embeddings)
+    queries = embeddings[[3, 17]]
+    expected = [[str(p) for p in np.argsort(((embeddings - q) ** 2).sum(axis=1))[:5]] for q in queries]
+
+    index = ShardedIndex.from_collection(collection, path=str(tmp_path / "shards"), num_shards=2)
+    try:
+        assert index.count() == 40
+        result = index.query(query_embeddings=queries, n_results=5)
+        assert result["ids"] == expected
+        assert result["metadatas"][0][0] == {"title": "Movie 3"}
+
+        # A dead worker fails the query, is restarted, and the next query is answered
+        index._processes[1].kill()
+        index._processes[1].join()
+        with pytest.raises(ShardError):
+            index.query(query_embeddings=queries, n_results=5)
+        assert index.query(query_embeddings=queries, n_results=5)["ids"] == expected
+    finally:
+        index.close()
+
+    # A second worker finds the shards current and attaches without reloading
+    with patch.object(ShardedIndex, "load_from") as load_from:
+        attached = ShardedIndex.from_collection(collection, path=str(tmp_path / "shards"), num_shards=2)
+        attached.close()
+    load_from.assert_not_called()
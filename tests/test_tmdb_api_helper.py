@@ -53,3 +53,21 @@ def test_get_poster_url_no_poster(tmdb_helper):
     with patch.object(tmdb_helper, 'search_movie') as mock_search:
         mock_search.return_value = {"poster_path": None}
         assert tmdb_helper.get_poster_url("Test Movie") is None
+
+def test_rate_limit_sleeps_outside_the_lock(tmdb_helper):
+    """Concurrent callers get consecutive slots; nobody sleeps while holding the lock"""
+    slots = []
+
+    def sleep(seconds):
+        # Another thread can still reserve its slot while this one waits
+        assert tmdb_helper._rate_limit_lock.acquire(blocking=False)
+        tmdb_helper._rate_limit_lock.release()
+        slots.append(seconds)
+
+    with patch('src.tmdb_api_helper.time.sleep', side_effect=sleep):
+        for _ in range(3):
+            tmdb_helper._rate_limit()
+
+    assert len(slots) == 2
+    assert slots[0] == pytest.approx(0.25, abs=0.05)
+    assert slots[1] == pytest.approx(0.5, abs=0.05)
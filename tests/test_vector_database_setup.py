@@ -1,7 +1,8 @@
+import json
 import pandas as pd
 import pytest
 from unittest.mock import patch, MagicMock
-from src.vector_database_setup import prepare_movie_descriptions, create_vector_database
+from src.vector_database_setup import prepare_movie_descriptions, create_vector_database, hnsw_metadata, index_config_from_env
 
 # Sample DataFrame to use in both tests
 @pytest.fixture
@@ -26,10 +27,22 @@ def test_prepare_movie_descriptions(sample_movies_df):
     assert "Action" in updated_df['description'].iloc[0]
 
 
+def test_prepare_movie_descriptions_folds_in_tags(sample_movies_df):
+    df = sample_movies_df.copy()
+    df['tags'] = [['cyberpunk', 'philosophy']]
+    # Lists come back as strings when the catalog is reloaded from processed_movies.csv
+    df['genome_tags'] = ["['virtual reality', 'cyberpunk']"]
+
+    doc = json.loads(prepare_movie_descriptions(df)['description'].iloc[0])
+
+    assert doc['tags'] == ['virtual reality', 'cyberpunk', 'philosophy']
+    assert "Themes: virtual reality, cyberpunk." in doc['plot']
+    assert "cyberpunk, philosophy" in doc['plot']
+
+
 @patch("src.vector_database_setup.chromadb.PersistentClient")
 @patch("src.vector_database_setup.embedding_functions.SentenceTransformerEmbeddingFunction")
-@patch("src.vector_database_setup.SentenceTransformer")
-def test_create_vector_database(mock_model, mock_embed_func, mock_client, sample_movies_df):
+def test_create_vector_database(mock_embed_func, mock_client, sample_movies_df):
     # Add 'description' column just like prepare_movie_descriptions would
     sample_movies_df['description'] = sample_movies_df.apply(
         lambda row: f"Title: {row['clean_title']}. "
@@ -50,3 +63,34 @@ def test_create_vector_database(mock_model, mock_embed_func, mock_client, sample
     mock_client.return_value.create_collection.assert_called_once()
     mock_collection.add.assert_called_once()
     assert collection == mock_collection
+
+
+@patch("src.vector_database_setup.chromadb.PersistentClient")
+def test_create_vector_database_keeps_live_collection(mock_client, sample_movies_df, tmp_path):
+    from src.catalog_index import write_active_version
+    write_active_version(str(tmp_path), "movie_collection")
+
+    with pytest.raises(ValueError):
+        create_vector_database(sample_movies_df, path=str(tmp_path), embedding_function=MagicMock())
+    mock_client.return_value.delete_collection.assert_not_called()
+
+    sample_movies_df['description'] = ["The Matrix"]
+    create_vector_database(sample_movies_df, path=str(tmp_path), embedding_function=MagicMock(), replace_live=True)
+    mock_client.return_value.delete_collection.assert_called_once_with("movie_collection")
+
+
+def test_hnsw_metadata_skips_unset_values():
+    config = {"space": "cosine", "M": 32, "construction_ef": None, "search_ef": 64}
+    assert hnsw_metadata(config) == {"hnsw:space": "cosine", "hnsw:M": 32, "hnsw:search_ef": 64}
+    assert hnsw_metadata({"space": None, "M": None}) is None
+    with pytest.raises(ValueError):
+        hnsw_metadata({"space": "manhattan"})
+
+
+def test_index_config_from_env(monkeypatch):
+    monkeypatch.setenv("MOVIEMIND_HNSW_SPACE", "ip")
+    monkeypatch.setenv("MOVIEMIND_HNSW_SEARCH_EF", "128")
+    config = index_config_from_env()
+    assert config["space"] == "ip"
+    assert config["search_ef"] == 128
+    assert config["M"] is None